@@ -0,0 +1,367 @@
+# 基准测试
+#
+# 在 REPL 里运行 (会先初始化 Hitbox，需要接上 USB 主机)：
+#   import bench
+#   bench.run()              # 全部
+#   bench.run(tag="v1.2")    # 给结果打上标签，便于比较不同固件版本
+#   bench.bench_freq(hb, dwell_ms=10000)   # 各个 CPU 频率下的扫描耗时，每档停 10 秒读电流表
+#   bench.bench_hall((26, 27), (2, 3, 4))  # 磁轴采样耗时，会把这些引脚改成 ADC/输出，测完要重启
+#
+# 每个结果输出一行，以 "BENCH " 开头，后面是 JSON：
+#   name   测试项
+#   us     每次操作的微秒数 (已减去空循环开销)
+#   alloc  每次操作分配的字节数
+#   mhz    当前 CPU 频率
+# 用 tools/bench_compare.py 比较两份串口日志。
+import gc
+import json
+import os
+import time
+import machine
+from machine import mem32
+
+import scan_kernel
+from scan_kernel import ScanKernel, SIO_GPIO_IN
+from usb.device import core as usb_core
+
+_tag = ""
+
+
+def report(name: str, us_per_op: float, **extra) -> None:
+    extra["name"] = name
+    extra["us"] = round(us_per_op, 3)
+    extra["mhz"] = machine.freq() // 1000000
+    if _tag:
+        extra["tag"] = _tag
+    print("BENCH", json.dumps(extra))
+
+
+def _loop(fn, iterations: int):
+    # 返回 (总微秒, 总分配字节)，测量期间关闭自动 GC 保证 mem_alloc 差值准确
+    gc.collect()
+    gc.disable()
+    try:
+        a0 = gc.mem_alloc()
+        t0 = time.ticks_us()
+        for _ in range(iterations):
+            fn()
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        da = gc.mem_alloc() - a0
+    finally:
+        gc.enable()
+    return dt, da
+
+
+def _noop():
+    pass
+
+
+_overhead_us = None
+
+
+def measure(name: str, fn, iterations: int = 1000, **extra) -> None:
+    """测量无参函数 fn 每次调用的耗时和分配，扣除空函数调用的开销"""
+    global _overhead_us
+    if _overhead_us is None:
+        dt, _ = _loop(_noop, 1000)
+        _overhead_us = dt / 1000
+    dt, da = _loop(fn, iterations)
+    us = dt / iterations - _overhead_us
+    report(name, us if us > 0 else 0, alloc=round(da / iterations, 1), n=iterations, **extra)
+
+
+def bench_scan(iterations: int = 2000, keys: int = 14) -> None:
+    """比较各个扫描内核实现：固定快照 / 读取真实 GPIO / 每次都有变化"""
+    pins = list(range(keys))
+    masks = [1 << i for i in range(keys)]
+    buf = bytearray(3)
+    k = ScanKernel(pins, masks, buf, 1, 2)
+    table = k.table
+
+    idle = 0x3FFFFFFF
+    for name, fn in scan_kernel.available():
+        measure("scan.%s.idle" % name, lambda: fn(idle, table, buf), iterations, keys=keys)
+        measure("scan.%s.gpio" % name, lambda: fn(mem32[SIO_GPIO_IN], table, buf), iterations, keys=keys)
+
+        # 在两个快照之间来回切换，每次扫描都要写报告
+        state = [idle]
+
+        def toggle():
+            state[0] ^= 1
+            fn(state[0], table, buf)
+
+        measure("scan.%s.toggle" % name, toggle, iterations, keys=keys)
+
+
+def _hsv_to_rgb(h, brightness=1.0):
+    # 浮点 HSV 转换，板载灯改用预计算的调色板 (led_engine.build_hue_palette)
+    # 之前每次扫描都调用它，留在这里和查表对比
+    # h: 0.0 ~ 1.0
+    # brightness: 0.0 ~ 1.0
+
+    i = int(h * 6)
+    f = h * 6 - i
+    q = 1.0 - f
+    t = f
+    i = i % 6
+
+    if i == 0:
+        r, g, b = 1.0, t, 0.0
+    elif i == 1:
+        r, g, b = q, 1.0, 0.0
+    elif i == 2:
+        r, g, b = 0.0, 1.0, t
+    elif i == 3:
+        r, g, b = 0.0, q, 1.0
+    elif i == 4:
+        r, g, b = t, 0.0, 1.0
+    else:  # i == 5
+        r, g, b = 1.0, 0.0, q
+
+    # 统一亮度缩放
+    r = int(255 * r * brightness)
+    g = int(255 * g * brightness)
+    b = int(255 * b * brightness)
+
+    return r, g, b
+
+
+def bench_primitives(hb) -> None:
+    from board_led import BoardLED
+
+    measure("mem32.gpio_in", lambda: mem32[SIO_GPIO_IN], 5000)
+    # 非 GPIO 输入后端没有按键引脚
+    if hb.keys:
+        pin = hb.keys[0]
+        measure("pin.value", lambda: pin.value(), 5000)
+
+    measure("hsv_to_rgb", lambda: _hsv_to_rgb(0.3, 0.05), 2000)
+
+    # 颜色不变时直接跳过；不限速并且颜色每次都变时测的是真正的 WS2812 写入
+    BoardLED.on(1, 2, 3)
+    measure("board_led.on.same", lambda: BoardLED.on(1, 2, 3), 2000)
+    color = [0]
+
+    def led_change():
+        color[0] ^= 1
+        BoardLED.on(color[0], 0, 0)
+
+    BoardLED.set_max_fps(0)
+    measure("board_led.on.write", led_change, 500)
+    from hitbox import LED_MAX_FPS
+
+    BoardLED.set_max_fps(LED_MAX_FPS)
+
+    oled = hb.oled
+    measure("ssd1306.fill", lambda: oled.fill(0), 200)
+    measure("ssd1306.text", lambda: oled.text("Scan/s 12345", 0, 0), 500)
+    measure("ssd1306.show", oled.show, 20)
+    measure("ssd1306.show_rect.16x8", lambda: oled.show_rect(0, 0, 16, 8), 100)
+    hb.screen.invalidate()
+
+
+_EP_FIELDS = ("submitted", "completed", "failed", "short", "spins", "flight_min_us", "flight_max_us")
+
+
+def report_ep(name: str, ep_addr: int) -> None:
+    """把一个端点的传输统计 (usb.device.core.ep_stats) 输出成一行 BENCH"""
+    s = usb_core.ep_stats(ep_addr)
+    report(name, 0, ep=ep_addr, **{k: s[i] for i, k in enumerate(_EP_FIELDS)})
+
+
+def bench_usb(hb) -> None:
+    gp = hb.gamepad
+    if not gp.is_open():
+        print("BENCH-SKIP usb: gamepad not open")
+        return
+    # HID 手柄和 XInput 手柄的 IN 端点属性名不同
+    ep = getattr(gp, "_int_ep", None)
+    if ep is None:
+        ep = gp._in_ep
+
+    report_buf = gp.report
+
+    # 不等主机轮询：每次先在计时外等端点空闲，只测提交本身
+    iterations = 200
+    total = 0
+    for _ in range(iterations):
+        while gp.busy():
+            machine.idle()
+        t0 = time.ticks_us()
+        gp.send_report(report_buf)
+        total += time.ticks_diff(time.ticks_us(), t0)
+    report("hid.send_report.idle", total / iterations, n=iterations)
+
+    # 端点统计：飞行时间是主机轮询造成的等待，spins 是固件在 send_report 里空等的次数
+    usb_core.reset_ep_stats()
+
+    # 连续发送：每次都要等上一个报告被主机取走，测的是有效报告周期
+    measure("hid.send_report.polled", lambda: gp.send_report(report_buf), 200)
+    report_ep("usb.ep.polled", ep)
+
+    bit = [0]
+
+    def press():
+        bit[0] ^= 1
+        if bit[0]:
+            gp.press_button(1)
+        else:
+            gp.release_button(1)
+
+    measure("xbox.press_button", press, 200)
+    measure("xbox.set_state", lambda: gp.set_state(0), 200)
+    gp.release_all()
+
+
+def bench_input(hb, iterations: int = 500) -> None:
+    """当前输入后端读一次全部按键的耗时"""
+    src = hb.input
+    keys = getattr(src, "keys", len(hb.keys))
+    measure("input.%s.read" % src.name, src.read, iterations, keys=keys)
+
+
+def bench_hall(adc_pins, mux_pins=(), keys=None, oversamples=(1, 4, 8), iterations: int = 200) -> None:
+    """磁轴后端每次读取和每个键的采样耗时 (us_per_key)，不同过采样次数各测一次
+
+    会把 adc_pins 改成 ADC 输入、mux_pins 改成输出，不要接按键；测完重启
+    """
+    from hall import HallInput
+
+    for n in oversamples:
+        _bench_read(HallInput(adc_pins, mux_pins, keys, oversample=n), iterations, oversample=n)
+
+
+def _bench_read(src, iterations: int, **extra) -> None:
+    dt, da = _loop(src.read, iterations)
+    us = dt / iterations
+    report(
+        "input.%s.read" % src.name,
+        us,
+        alloc=round(da / iterations, 1),
+        n=iterations,
+        keys=src.keys,
+        us_per_key=round(us / src.keys, 2),
+        **extra
+    )
+
+
+def bench_shiftreg(spi_id, sck, miso, load, chips=(1, 2, 4), baudrate: int = 8_000_000, iterations: int = 500) -> None:
+    """74HC165 串联每次读取的耗时，按 8/16/32 个键 (1/2/4 片，32 个键实际用 30 个) 各测一次
+
+    片数不够也能测：没接的片读出来是 0xFF (最后一片的 SER 接高电平)，耗时一样
+    """
+    from shiftreg import ShiftRegInput
+
+    for n in chips:
+        _bench_read(ShiftRegInput(spi_id, sck, miso, load, chips=n, baudrate=baudrate), iterations, chips=n)
+
+
+def bench_mcp23017(i2c_id, scl, sda, addrs=(0x20, 0x21), freq: int = 1_000_000, iterations: int = 200) -> None:
+    """MCP23017 每次读取的耗时，按 8/16/32 个键 (1 片读 1 字节、1 片、2 片) 各测一次
+
+    addrs 至少要有 2 片才测 32 个键；芯片不应答时 readfrom_mem_into 抛 OSError
+    """
+    from mcp23017 import Mcp23017Input
+
+    for keys in (8, 16, 30):
+        if keys > len(addrs) * 16:
+            break
+        src = Mcp23017Input(i2c_id, scl, sda, addrs, keys=keys, freq=freq)
+        _bench_read(src, iterations, chips=(keys + 15) // 16, freq_khz=freq // 1000)
+
+
+def bench_matrix(gpios, layouts=((4, 4), (6, 6)), settle_us: int = 1, iterations: int = 500) -> None:
+    """整个矩阵扫描一次的耗时，每种布局 (行数, 列数) 分有/没有二极管各测一次
+
+    gpios 前面是行线、后面是列线，按最大的布局要够 行数 + 列数 个；列线连续时
+    取列快一些。会改这些引脚的方向和上拉，测完重启。6x6 只报告前 30 个键，但
+    整个矩阵都扫描
+    """
+    from matrix import MatrixInput
+
+    for nrows, ncols in layouts:
+        rows = gpios[:nrows]
+        cols = gpios[nrows : nrows + ncols]
+        for diodes in (True, False):
+            src = MatrixInput(rows, cols, diodes=diodes, settle_us=settle_us)
+            _bench_read(
+                src,
+                iterations,
+                layout="%dx%d" % (nrows, ncols),
+                diodes=diodes,
+                settle_us=settle_us,
+            )
+
+
+def bench_loop(hb, iterations: int = 2000) -> None:
+    measure("hitbox.loop", hb.step, iterations, kernel=hb.kernel.name)
+
+
+FREQS = (48_000_000, 80_000_000, 125_000_000, 200_000_000, 250_000_000)
+
+
+def bench_freq(hb, freqs=FREQS, iterations: int = 2000, dwell_ms: int = 0, current=None) -> None:
+    """在每个 CPU 频率下测扫描内核和整个循环的耗时
+
+    电流没法在片上测：dwell_ms 大于 0 时每档在空闲循环里停留这么久，打印
+    BENCH-DWELL 提示，方便用 USB 电流表读数；current 是可选的无参函数
+    (比如读 INA219)，返回毫安数，结果记在 ma 字段里。
+    超频档 (>133MHz) 不是每块板子都稳定，可以只传需要的频率。
+    """
+    global _overhead_us
+    gov = hb.governor
+    saved = machine.freq()
+    if gov is not None:
+        saved_boost, saved_idle = gov.boost_hz, gov.idle_hz
+    try:
+        for hz in freqs:
+            if gov is not None:
+                # 固定在这个频率，不让调节器在测量中途切换
+                gov.boost_hz = gov.idle_hz = hz
+                gov.set(hz)
+            else:
+                machine.freq(hz)
+            mhz = hz // 1000000
+            _overhead_us = None  # 空调用开销也随频率变化
+            name, fn = scan_kernel.available()[0]
+            buf = bytearray(3)
+            table = ScanKernel(list(range(14)), [1 << i for i in range(14)], buf, 1, 2).table
+            measure("freq.scan.%s" % name, lambda: fn(0x3FFFFFFF, table, buf), iterations, target_mhz=mhz)
+            measure("freq.hitbox.loop", hb.step, iterations, target_mhz=mhz)
+
+            if dwell_ms > 0 or current is not None:
+                print("BENCH-DWELL", json.dumps({"mhz": mhz, "ms": dwell_ms}))
+                t0 = time.ticks_ms()
+                while time.ticks_diff(time.ticks_ms(), t0) < dwell_ms:
+                    hb.step()
+                if current is not None:
+                    report("freq.current", 0, target_mhz=mhz, ma=current())
+    finally:
+        if gov is not None:
+            gov.boost_hz, gov.idle_hz = saved_boost, saved_idle
+            gov.set(saved)
+        else:
+            machine.freq(saved)
+
+
+def run(hb=None, tag: str = "") -> None:
+    global _tag
+    _tag = tag
+    print("BENCH-START", json.dumps({"release": os.uname().release, "tag": tag}))
+
+    if hb is None:
+        from hitbox import Hitbox
+
+        hb = Hitbox()
+        hb.start()
+
+    bench_scan()
+    bench_primitives(hb)
+    bench_usb(hb)
+    bench_input(hb)
+    bench_loop(hb)
+    print("BENCH-END")
+
+
+if __name__ == "__main__":
+    run()
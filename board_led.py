@@ -1,17 +1,62 @@
 from machine import Pin
 import neopixel
+import time
 
 # WS2812 在 GP16
 pin = Pin(16, Pin.OUT)
 np = neopixel.NeoPixel(pin, 1)
 
+# 每次 write() 都要阻塞地发送 24 位数据，所以只在颜色变化时写入，
+# 并且限制最高刷新率。被限速挡下的颜色先记下来，之后再补写。
+_color = [-1, -1, -1]  # 最后一次写到 LED 上的颜色，初始值保证第一次一定写入
+_want = [0, 0, 0]  # 最后一次请求的颜色
+_last_write = time.ticks_add(time.ticks_us(), -1000000)
+_min_interval_us = 1000000 // 100  # 默认最高 100 FPS
+
+
+def _write(now):
+    global _last_write
+    _color[0] = _want[0]
+    _color[1] = _want[1]
+    _color[2] = _want[2]
+    # 直接写 NeoPixel 的缓冲区，避免 np[0] = (r, g, b) 分配元组
+    buf = np.buf
+    order = np.ORDER
+    buf[order[0]] = _want[0]
+    buf[order[1]] = _want[1]
+    buf[order[2]] = _want[2]
+    np.write()
+    _last_write = now
+
+
 class BoardLED:
+    @staticmethod
+    def set_max_fps(fps: int):
+        """设置最高刷新率，0 表示不限速"""
+        global _min_interval_us
+        _min_interval_us = 1000000 // fps if fps > 0 else 0
+
     @staticmethod
     def on(r: int, g: int, b: int):
-        np[0] = (r, g, b)
-        np.write()
+        _want[0] = r
+        _want[1] = g
+        _want[2] = b
+        BoardLED.update()
+
+    @staticmethod
+    def update():
+        """如果有被限速挡下的颜色且已经到了可以写入的时间，就写入"""
+        if _want[0] == _color[0] and _want[1] == _color[1] and _want[2] == _color[2]:
+            return
+        now = time.ticks_us()
+        if time.ticks_diff(now, _last_write) >= _min_interval_us:
+            _write(now)
 
     @staticmethod
     def off():
-        np[0] = (0, 0, 0)
-        np.write()
+        # 熄灭不受限速影响，立即生效
+        _want[0] = 0
+        _want[1] = 0
+        _want[2] = 0
+        if _color[0] or _color[1] or _color[2]:
+            _write(time.ticks_us())
@@ -0,0 +1,126 @@
+# 不阻塞的调试日志
+#
+# log() 只把 (时间, 级别, 消息, 最多 3 个整数参数) 写进预分配的环形缓冲区，
+# 不格式化、不分配内存，可以在扫描路径和 USB 回调里调用。
+# drain() 在空闲时把记录格式化后 print 到 REPL (USB 串口或 UART)。
+#
+#   import dlog
+#   dlog.info("i2c addr 0x%02x", addr)    # 消息必须是常量字符串
+#   dlog.drain(4)                         # 主循环空闲时调用
+#
+# 缓冲区满时丢弃新记录并计数，输出时会补一行 "dropped N"。
+# 主循环和调度回调同时写入时，极少数情况下可能有一条记录被覆盖。
+from micropython import const
+from array import array
+import time
+
+DEBUG = const(0)
+INFO = const(1)
+WARN = const(2)
+ERROR = const(3)
+OFF = const(4)
+
+_NAMES = ("D", "I", "W", "E")
+
+_SIZE = const(32)  # 记录条数，必须是 2 的幂
+_MASK = const(2 * _SIZE - 1)
+_NARGS = const(3)  # 每条记录的整数参数个数
+
+_ticks = array("i", [0] * _SIZE)
+_levels = bytearray(_SIZE)
+_counts = bytearray(_SIZE)  # 实际传入的参数个数
+_msgs = [""] * _SIZE
+_args = array("i", [0] * (_SIZE * _NARGS))
+
+# 写入和读出位置，在 0 ~ 2*_SIZE-1 之间循环，两者之差是待输出的记录数
+# (和 usb.device.core.Buffer 一样，多一位用来区分满和空)
+_w = 0
+_r = 0
+
+level = INFO  # 低于这个级别的记录直接忽略
+dropped = 0
+
+
+def set_level(lvl: int) -> None:
+    global level
+    level = lvl
+
+
+def log(lvl: int, msg: str, n: int = 0, a: int = 0, b: int = 0, c: int = 0) -> None:
+    # n 是参数个数，一般用 debug()/info()/warn()/error() 代替
+    global _w, dropped
+    if lvl < level:
+        return
+    w = _w
+    if (w - _r) & _MASK >= _SIZE:
+        dropped += 1
+        return
+    i = w & (_SIZE - 1)
+    _ticks[i] = time.ticks_ms()
+    _levels[i] = lvl
+    _counts[i] = n
+    _msgs[i] = msg
+    j = i * _NARGS
+    _args[j] = a
+    _args[j + 1] = b
+    _args[j + 2] = c
+    _w = (w + 1) & _MASK
+
+
+# 各个级别的快捷函数。不用 *args，那样每次调用都会分配一个元组
+
+
+def debug(msg, a=None, b=None, c=None):
+    if DEBUG >= level:
+        log(DEBUG, msg, _nargs(a, b, c), a or 0, b or 0, c or 0)
+
+
+def info(msg, a=None, b=None, c=None):
+    if INFO >= level:
+        log(INFO, msg, _nargs(a, b, c), a or 0, b or 0, c or 0)
+
+
+def warn(msg, a=None, b=None, c=None):
+    if WARN >= level:
+        log(WARN, msg, _nargs(a, b, c), a or 0, b or 0, c or 0)
+
+
+def error(msg, a=None, b=None, c=None):
+    if ERROR >= level:
+        log(ERROR, msg, _nargs(a, b, c), a or 0, b or 0, c or 0)
+
+
+def _nargs(a, b, c):
+    if c is not None:
+        return 3
+    if b is not None:
+        return 2
+    if a is not None:
+        return 1
+    return 0
+
+
+def pending() -> int:
+    """缓冲区里待输出的记录数"""
+    return (_w - _r) & _MASK
+
+
+def drain(limit: int = 4) -> int:
+    """输出最多 limit 条记录，返回输出的条数。会格式化并 print，只在空闲时调用"""
+    global _r, dropped
+    count = 0
+    while _r != _w and count < limit:
+        i = _r & (_SIZE - 1)
+        msg = _msgs[i]
+        n = _counts[i]
+        if n:
+            j = i * _NARGS
+            msg = msg % tuple(_args[j : j + n])
+        print("[%d] %s %s" % (_ticks[i], _NAMES[_levels[i]], msg))
+        _msgs[i] = ""  # 不再引用消息字符串
+        _r = (_r + 1) & _MASK
+        count += 1
+    if dropped and _r == _w:
+        print("[%d] W dropped %d" % (time.ticks_ms(), dropped))
+        dropped = 0
+    return count
@@ -0,0 +1,66 @@
+# 计划垃圾回收
+#
+# 自动 GC 可能在任意一次分配时发生，暂停时间不可预测。这里把回收安排在
+# 空闲窗口里执行：刚提交完一个报告 (下一个报告要等主机轮询) 或者一段时间
+# 没有报告时。gc.threshold() 只作为兜底，正常情况下不会被触发。
+import gc
+import time
+
+
+class GcScheduler:
+    def __init__(self, threshold: int = 8192, quiet_ms: int = 200) -> None:
+        # threshold: 距上次回收分配了这么多字节后，在下一个空闲窗口回收
+        # quiet_ms: 这么久没有发送报告也视为空闲窗口
+        self.threshold = threshold
+        self.quiet_ms = quiet_ms
+
+        self.count = 0  # 计划回收次数
+        self.unscheduled = 0  # 兜底阈值或内存不足触发的回收次数
+        self.last_us = 0
+        self.max_us = 0
+        self.total_us = 0
+
+        self._base = 0
+        self._last_report = time.ticks_ms()
+
+    def start(self) -> None:
+        # 兜底阈值设为计划阈值的两倍，只有长时间没有空闲窗口时才会自动回收
+        gc.collect()
+        gc.threshold(self.threshold * 2)
+        self._base = gc.mem_alloc()
+
+    def allocated(self) -> int:
+        """距上次回收新分配的字节数"""
+        return gc.mem_alloc() - self._base
+
+    def poll(self, now_ms: int, reported: bool) -> bool:
+        """在扫描循环末尾调用，reported 表示本次扫描提交了报告，返回是否回收了"""
+        if reported:
+            self._last_report = now_ms
+
+        used = gc.mem_alloc()
+        if used < self._base:
+            # 不是我们发起的回收
+            self.unscheduled += 1
+            self._base = used
+            return False
+
+        if used - self._base < self.threshold:
+            return False
+        if not reported and time.ticks_diff(now_ms, self._last_report) < self.quiet_ms:
+            return False
+
+        self.collect()
+        return True
+
+    def collect(self) -> None:
+        t0 = time.ticks_us()
+        gc.collect()
+        dt = time.ticks_diff(time.ticks_us(), t0)
+
+        self.count += 1
+        self.last_us = dt
+        self.total_us += dt
+        if dt > self.max_us:
+            self.max_us = dt
+        self._base = gc.mem_alloc()
@@ -0,0 +1,48 @@
+# CPU 频率调节
+#
+# 有按键输入时切到 boost_hz (可以超频，扫描更快)，idle_ms 内没有输入就降到
+# idle_hz 省电。切换由扫描循环在提交完报告之后调用 poll() 完成，不会推迟
+# 第一个按键的报告。
+#
+# 换频率之后：
+#   - ticks_ms/ticks_us 不受影响
+#   - NeoPixel 每次发送都按当前频率计算时序，不用处理
+#   - I2C 的时钟分频是按切换前的外设时钟算的，需要重新初始化，
+#     由 on_change 回调处理
+#   - USB 用独立的 48MHz 时钟，不受影响，但 idle_hz 不要低于 48MHz
+import machine
+import time
+
+
+class ClockGovernor:
+    def __init__(self, boost_hz: int, idle_hz: int, idle_ms: int = 5000, on_change=None) -> None:
+        self.boost_hz = boost_hz
+        self.idle_hz = idle_hz
+        self.idle_ms = idle_ms
+        self.on_change = on_change  # on_change(hz)，频率切换后调用
+
+        self.hz = machine.freq()
+        self.switches = 0
+        self.last_switch_us = 0  # 最近一次切换 (含 on_change) 的耗时
+
+        self._last_active = time.ticks_ms()
+
+    def set(self, hz: int) -> None:
+        if hz == self.hz:
+            return
+        t0 = time.ticks_us()
+        machine.freq(hz)
+        self.hz = hz
+        if self.on_change is not None:
+            self.on_change(hz)
+        self.switches += 1
+        self.last_switch_us = time.ticks_diff(time.ticks_us(), t0)
+
+    def poll(self, now_ms: int, active: bool) -> None:
+        """在扫描循环末尾调用，active 表示本次循环有输入 (按键变化或按住)"""
+        if active:
+            self._last_active = now_ms
+            if self.hz != self.boost_hz:
+                self.set(self.boost_hz)
+        elif self.hz != self.idle_hz and time.ticks_diff(now_ms, self._last_active) >= self.idle_ms:
+            self.set(self.idle_hz)
@@ -0,0 +1,169 @@
+# 磁轴 (Hall 效应) 输入后端
+#
+# 每个键下面一个线性 Hall 传感器，输出电压随按下的深度变化。传感器接在 RP2040
+# 的 ADC 输入 (GPIO26~29) 上；键多的时候在 ADC 前面接模拟多路开关 (比如
+# CD74HC4067，4 根选择线切 16 路)，选择线一次写 SIO 的置位/清零寄存器切换。
+#
+# 按键编号：多路开关的第 ch 路、第 a 个 ADC 上的键是 ch * len(adc_pins) + a，
+# 同一路上的所有 ADC 连着采样，每一路只切一次开关。
+#
+# 每个键的处理：
+#   1. 采 oversample 次取平均
+#   2. 按校准值换成深度 0 (松开) ~ 255 (按到底)。静止读数 rest 在创建时
+#      calibrate() 测量 (这时不能按键)；从静止到按到底的读数变化 span 先用
+#      给定的值，读到更大的变化时自动扩大
+#   3. 快速触发 (rapid trigger)：第一次按到 actuate 深度时按下；之后只要
+#      从最深点往回抬 sensitivity 就松开，从最浅点再往下按 sensitivity 就
+#      又按下，不用回到固定的触发点。抬到 actuate 以上一律松开
+#
+# 每个键一次采样的耗时用 bench.bench_hall() 测。
+from micropython import const
+from machine import ADC, Pin, mem32
+from array import array
+import time
+
+_SIO_GPIO_OUT_SET = const(0xD0000014)
+_SIO_GPIO_OUT_CLR = const(0xD0000018)
+
+TRAVEL_MAX = const(255)
+# 抬到触发点以上多少才算回到触发点上方，防止在触发点附近的噪声来回触发
+_HYST = const(8)
+
+
+class HallInput:
+    name = "hall"
+
+    def __init__(
+        self,
+        adc_pins,
+        mux_pins=(),
+        keys: int | None = None,
+        oversample: int = 4,
+        actuate: int = 128,
+        sensitivity: int = 24,
+        span: int = 8000,
+        polarity: int = 1,
+        settle_us: int = 0,
+    ) -> None:
+        # adc_pins: 接传感器 (或多路开关输出) 的 GPIO；mux_pins: 多路开关的选择线，低位在前
+        # actuate/sensitivity 是深度 (0~255)，sensitivity 为 0 表示不用快速触发
+        # span: 从松开到按到底读数变化的初始值；polarity: 按下时读数变大为 1，变小为 -1
+        # settle_us: 切换多路开关后等待的时间
+        self._adcs = [ADC(Pin(gpio)) for gpio in adc_pins]
+        self._mux = [Pin(gpio, Pin.OUT, value=0) for gpio in mux_pins]
+        channels = 1 << len(mux_pins)
+        if keys is None:
+            keys = len(adc_pins) * channels
+        if not 0 < keys <= min(30, len(adc_pins) * channels):
+            raise ValueError("keys")
+        self.keys = keys
+
+        # 每一路对应的选择线置位/清零掩码
+        self._mux_set = array("I", [0] * channels)
+        self._mux_clr = array("I", [0] * channels)
+        for ch in range(channels):
+            for bit, gpio in enumerate(mux_pins):
+                if (ch >> bit) & 1:
+                    self._mux_set[ch] |= 1 << gpio
+                else:
+                    self._mux_clr[ch] |= 1 << gpio
+
+        self.oversample = oversample
+        self.actuate = actuate
+        self.sensitivity = sensitivity or TRAVEL_MAX + 1
+        self.polarity = polarity
+        self.settle_us = settle_us
+
+        self.rest = array("H", [0] * keys)  # 松开时的读数
+        self.span = array("H", [span] * keys)  # 从松开到按到底的读数变化
+        self.travel = bytearray(keys)  # 最近一次的深度
+        self._peak = bytearray(keys)  # 按下时是最深点，松开时是最浅点
+        self._pressed = 0
+        self._mask = (1 << keys) - 1
+        self.calibrate()
+
+    def setup(self, ids):
+        for k in ids:
+            if not 0 <= k < self.keys:
+                raise ValueError("hall key %d" % k)
+        # 传感器不能产生引脚中断，空闲时靠 lightsleep 超时轮询
+        return []
+
+    def _select(self, ch: int) -> None:
+        mem32[_SIO_GPIO_OUT_CLR] = self._mux_clr[ch]
+        mem32[_SIO_GPIO_OUT_SET] = self._mux_set[ch]
+        if self.settle_us:
+            time.sleep_us(self.settle_us)
+
+    def calibrate(self, samples: int = 16) -> None:
+        """记录每个键的静止读数，调用时不能按着键"""
+        nadc = len(self._adcs)
+        for k in range(self.keys):
+            if self._mux:
+                self._select(k // nadc)
+            adc = self._adcs[k % nadc]
+            s = 0
+            for _ in range(samples):
+                s += adc.read_u16()
+            self.rest[k] = s // samples
+        self._pressed = 0
+        for k in range(self.keys):
+            self.travel[k] = 0
+            self._peak[k] = 0
+
+    def read(self) -> int:
+        adcs = self._adcs
+        muxed = len(self._mux) > 0
+        over = self.oversample
+        pol = self.polarity
+        act = self.actuate
+        sens = self.sensitivity
+        rest = self.rest
+        span = self.span
+        travel = self.travel
+        peak = self._peak
+        pressed = self._pressed
+        nkeys = self.keys
+
+        k = 0
+        ch = 0
+        while k < nkeys:
+            if muxed:
+                self._select(ch)
+            for adc in adcs:
+                s = 0
+                i = over
+                while i:
+                    s += adc.read_u16()
+                    i -= 1
+                d = (s // over - rest[k]) * pol
+                if d <= 0:
+                    t = 0
+                else:
+                    if d > span[k]:
+                        span[k] = d if d < 0xFFFF else 0xFFFF
+                    t = d * TRAVEL_MAX // span[k]
+                travel[k] = t
+
+                bit = 1 << k
+                p = peak[k]
+                if pressed & bit:
+                    if t > p:
+                        peak[k] = t
+                    elif t < act - _HYST or t + sens <= p:
+                        pressed &= ~bit
+                        peak[k] = t
+                elif t < p:
+                    peak[k] = t
+                elif t >= act and (p < act or t >= p + sens):
+                    pressed |= bit
+                    peak[k] = t
+
+                k += 1
+                if k >= nkeys:
+                    break
+            ch += 1
+
+        self._pressed = pressed
+        # 和 GPIO_IN 一样按下为 0
+        return ~pressed & self._mask
@@ -0,0 +1,705 @@
+# I2C Scanner MicroPython
+from machine import Pin, I2C, mem32
+import machine
+from ssd1306 import SSD1306
+from oled_ui import Screen, Label, ButtonMap
+from board_led import BoardLED
+from led_engine import LedStrip, build_hue_palette
+from xbox import Xbox360Interface, KeyCode
+import usb.device
+import usblink
+from scan_kernel import ScanKernel, SIO_GPIO_IN
+from player import Player
+from inputs import GpioInput
+from perfstats import PerfStats, TELEMETRY_REPORT_ID
+from tuning import Tuning, SETTINGS_REPORT_ID
+from governor import ClockGovernor
+
+import gc
+import time
+from gc_sched import GcScheduler
+import dlog
+
+
+
+OLED_WIDTH: int = 128
+OLED_HEIGHT: int = 64
+
+# 扫描率/报告率的统计窗口，也是遥测特性报告的更新周期
+STATS_WINDOW_MS: int = 1000
+
+# 板载状态灯的最高刷新率
+LED_MAX_FPS: int = 60
+# 板载灯彩虹的亮度 (0 ~ 255)
+LED_BRIGHTNESS: int = 13
+# 彩虹每隔这么多毫秒换一级色相 (256 级转一圈)，按时间走，不随扫描率变化
+LED_HUE_MS: int = 10
+# 按键变化后板载灯至少显示这么久的按键颜色，短按也能看到；按着键时一直显示
+LED_PRESS_MS: int = 100
+
+# 以下几项运行时可以通过 HID 特性报告修改 (tools/tune.py)，这里是上电时的值
+# 扫描循环的最小周期，0 表示尽快循环
+SCAN_PERIOD_US: int = 0
+# 按键消抖窗口：电平变化立即生效，之后这么久内忽略同一个键的变化，0 表示不消抖
+DEBOUNCE_US: int = 0
+# OLED 最高刷新率，刷新屏幕会阻塞 I2C 总线，0 表示每次循环都刷新
+DISPLAY_FPS: int = 30
+
+# CPU 频率调节：有输入时切到 CPU_BOOST_HZ (可以超频)，CPU_IDLE_MS 内没有输入降到
+# CPU_IDLE_HZ。CPU_BOOST_HZ 为 None 时不调节，保持上电时的频率
+CPU_BOOST_HZ = 125_000_000
+CPU_IDLE_HZ: int = 48_000_000
+CPU_IDLE_MS: int = 5000
+
+# 空闲省电：IDLE_AFTER_MS 内没有输入就关掉屏幕和灯，用 machine.lightsleep 每次睡
+# IDLE_SLEEP_MS，任意按键的下降沿立即唤醒。None 表示不进入空闲
+IDLE_AFTER_MS = 60_000
+IDLE_SLEEP_MS: int = 10
+# 空闲时屏幕的对比度 (0 ~ 255)，None 表示关闭屏幕
+IDLE_CONTRAST = None
+# USB 挂起 (电脑睡眠) 时按键唤醒电脑。默认关闭：USB 规范要求主机允许后才能发
+# 远程唤醒，但读不到主机是否允许 (见 usblink.py)，打开后即使在电脑上关掉了
+# 这个设备的唤醒功能，按键也会唤醒电脑
+REMOTE_WAKEUP = False
+
+# 按键联动灯带，LED_STRIP_PIN 为 None 时不启用
+LED_STRIP_PIN = None
+LED_STRIP_FPS: int = 60
+
+# 垃圾回收只在空闲窗口里按计划执行：距上次回收分配超过 GC_THRESHOLD 字节后，
+# 在刚提交完报告或 GC_QUIET_MS 内没有报告时回收
+GC_THRESHOLD: int = 8 * 1024
+GC_QUIET_MS: int = 200
+
+# 检查扫描路径是否分配内存 (每次扫描比较 gc.mem_alloc())，
+# NOALLOC_STRICT 时一旦分配就抛出异常
+NOALLOC_CHECK: bool = False
+NOALLOC_STRICT: bool = False
+
+# 扫描循环出错时记录异常、松开所有按键后立即重新开始扫描 (USB 连接保持不变)，
+# RESTART_WINDOW_MS 内出错超过 RESTART_MAX 次才停下来显示错误画面
+RESTART_MAX: int = 3
+RESTART_WINDOW_MS: int = 10_000
+# 看门狗超时，循环卡住这么久就复位芯片 (RP2040 最长 8388ms)。None 表示不启用。
+# 只在 run() 里启用，单步运行和基准测试不受影响。默认不启用：RP2040 的看门狗
+# 启动后停不下来，REPL 里按 Ctrl-C 或者 mpremote 连接时打断 main.py 都会让 run()
+# 退出，之后板子就会被复位，没法开发和重新部署。"xinput" 模式没有 USB 串口
+# REPL，或者开发完成后再打开
+WDT_TIMEOUT_MS = None
+
+# 手柄模式："hid" 是通用 HID 手柄 (带 USB 串口)，"xinput" 是 Xbox 360 手柄协议
+# (Windows 原生 XInput，延迟更低，但没有 USB 串口 REPL)
+GAMEPAD_MODE = "hid"
+
+# 调试日志级别 (dlog.DEBUG / INFO / WARN / ERROR / OFF)，日志只在没有按键变化的
+# 循环里输出，每次最多 DLOG_DRAIN 条
+DLOG_LEVEL = dlog.INFO
+DLOG_DRAIN: int = 1
+
+# 扫描内核实现："viper" / "native" / "python"，None 表示自动选择最快的可用实现
+SCAN_KERNEL = None
+
+# 按键表：(GPIO, 按钮)，所有按键都是上拉输入，按下为低电平
+KEY_PINS = (
+    (28, KeyCode.UP),
+    (26, KeyCode.DOWN),
+    (27, KeyCode.LEFT),
+    (15, KeyCode.RIGHT),
+    (14, KeyCode.LS),
+    (13, KeyCode.RS),
+    (12, KeyCode.A),
+    (10, KeyCode.B),
+    (8, KeyCode.RT),
+    (6, KeyCode.LT),
+    (11, KeyCode.X),
+    (9, KeyCode.Y),
+    (7, KeyCode.RB),
+    (5, KeyCode.LB),
+)
+
+# 输入后端 (见 inputs.py)：None 表示按键直接接在 GPIO 上，KEY_PINS/PLAYERS 里是
+# GPIO 编号。其他后端用一个无参函数创建，这时编号是后端的按键编号，例如磁轴：
+#   def INPUT():
+#       from hall import HallInput
+#       return HallInput(adc_pins=(26, 27), mux_pins=(2, 3, 4))
+# 键多的时候用扩展芯片 (按键编号见各模块开头)：
+#   def INPUT():
+#       from shiftreg import ShiftRegInput
+#       return ShiftRegInput(spi_id=1, sck=10, miso=12, load=13, chips=4)
+#   def INPUT():
+#       from mcp23017 import Mcp23017Input
+#       return Mcp23017Input(i2c_id=1, scl=3, sda=2, addrs=(0x20, 0x21), int_pin=4)
+# 或者接成行列矩阵，10 个 GPIO 接 25 个键：
+#   def INPUT():
+#       from matrix import MatrixInput
+#       return MatrixInput(rows=(2, 3, 4, 5, 6), cols=(7, 8, 9, 10, 11))
+INPUT = None
+
+# 多人模式：每个玩家一张按键表，各自是 USB 复合设备里的一个独立手柄接口，
+# 所有玩家共用每次循环的同一个输入快照。None 表示只有 KEY_PINS 一个玩家。
+# 例如第二个玩家接在空闲的 GPIO 上：
+#   PLAYERS = (KEY_PINS, ((2, KeyCode.UP), (3, KeyCode.DOWN), (4, KeyCode.A)))
+PLAYERS = None
+
+_CONNECTING = ("Connecting.", "Connecting..", "Connecting...")
+
+
+def measure_text(s: str) -> tuple[int, int]:
+    return len(s) * 8, 8
+
+
+def cycle(arr):
+    while True:
+        for x in arr:
+            yield x
+
+
+# 空闲时按键中断置位，__idle_loop 看到它就不再睡，直接扫描
+_woken = False
+
+
+def _wake(pin):
+    # 硬中断里只置标志，扫描在主循环里做。按键落在空闲扫描和进入 lightsleep
+    # 之间时 lightsleep 不会被这次中断唤醒，要靠这个标志跳过睡眠
+    global _woken
+    _woken = True
+
+
+class Hitbox:
+    i2c: I2C
+    oled: SSD1306
+
+    keys: list[Pin]
+    buttons: int
+
+    gamepad: Xbox360Interface  # 或 XInputInterface，接口相同
+    direction: list[int]
+    kernel: ScanKernel
+    players: list[Player]
+    gc: GcScheduler
+
+    strip: LedStrip | None
+
+    screen: Screen
+    usb_label: Label
+    button_map: ButtonMap
+    scan_label: Label
+    report_label: Label
+    max_label: Label
+    gc_label: Label
+
+    def __init__(self) -> None:
+        dlog.set_level(DLOG_LEVEL)
+        BoardLED.set_max_fps(LED_MAX_FPS)
+        BoardLED.on(0, 255, 0)
+
+        self.buttons = 0
+        self.held = False  # 有玩家按着键
+        self.sent = False  # 最近一次扫描提交了报告
+
+        self.idle = False
+        self.last_input_ms = time.ticks_ms()
+
+        # USB 连接状态，由 __check_usb 每次循环更新
+        self.usb = usb.device.get()
+        self.usb_opens = 0  # 上次看到的 usb.opens
+        self.suspended = False
+
+        self.direction = [0, 0]
+
+        # 板载灯彩虹：整数色相索引查预计算的调色板，扫描循环里不做浮点运算
+        self.press_led_until = time.ticks_ms()
+        self.hue_palette = build_hue_palette(LED_BRIGHTNESS)
+
+        self.strip = None
+        if LED_STRIP_PIN is not None:
+            self.__init_strip()
+
+        self.gc = GcScheduler(GC_THRESHOLD, GC_QUIET_MS)
+        self.alloc_violations = 0
+
+        self.wdt = None
+        self.restarts = 0  # 扫描循环出错后重新开始的次数
+        self.last_error = None  # 最近一次出错的 traceback
+        self._crashes = 0  # 当前窗口内的出错次数
+        self._crash_window = 0
+
+        self.__init_i2c()
+        self.oled = SSD1306(OLED_WIDTH, OLED_HEIGHT, self.i2c)
+
+        self.governor = None
+        if CPU_BOOST_HZ is not None:
+            self.governor = ClockGovernor(CPU_BOOST_HZ, CPU_IDLE_HZ, CPU_IDLE_MS, self.__on_freq_change)
+
+        self.stats = PerfStats(STATS_WINDOW_MS)
+        self.tuning = Tuning(SCAN_PERIOD_US, DEBOUNCE_US, DISPLAY_FPS, LED_MAX_FPS, LED_STRIP_FPS)
+
+        self.__init_gp()
+        self.__init_ui()
+        self.__apply_settings()
+
+    def __init_strip(self):
+        # 灯珠按第一个玩家按键表的顺序排列，每颗灯跟随对应的按键
+        key_pins = (PLAYERS or (KEY_PINS,))[0]
+        self.strip = LedStrip(Pin(LED_STRIP_PIN, Pin.OUT), len(key_pins), fps=LED_STRIP_FPS)
+        for i, (_, code) in enumerate(key_pins):
+            self.strip.bind(i, code - 1)
+
+    def __init_ui(self):
+        self.screen = Screen(self.oled)
+        # Label 的宽度是前缀加值的字符数，一行 16 个字符
+        self.usb_label = self.screen.add(Label(0, 0, "USB ", 2))
+        self.max_label = self.screen.add(Label(0, 8, "Max us ", 9))
+        self.button_map = self.screen.add(ButtonMap(0, 16))
+        self.scan_label = self.screen.add(Label(0, 40, "Scan/s ", 9))
+        self.report_label = self.screen.add(Label(0, 48, "Rpt/s  ", 9))
+        self.gc_label = self.screen.add(Label(0, 56, "GC us  ", 9))
+
+        self.ui_period_ms = 0
+        self.ui_last = time.ticks_ms()
+
+
+    def __init_i2c(self):
+        self.__open_i2c()
+
+        devices = self.i2c.scan()
+
+        if len(devices) == 0:
+            dlog.warn("no i2c device")
+        else:
+            dlog.info("i2c devices found: %d", len(devices))
+
+            for device in devices:
+                dlog.info("i2c address: 0x%02x", device)
+
+    def __open_i2c(self):
+        self.i2c = I2C(scl=Pin(1), sda=Pin(0))
+
+    def __on_freq_change(self, hz: int):
+        # I2C 的分频按切换前的时钟算的，按当前时钟重新初始化
+        self.__open_i2c()
+        self.oled.i2c = self.i2c
+        on_freq_change = getattr(self.input, "on_freq_change", None)
+        if on_freq_change is not None:
+            on_freq_change(hz)
+        dlog.info("cpu %d MHz", hz // 1000000)
+
+    def __init_gp(self):
+        tables = PLAYERS or (KEY_PINS,)
+        if GAMEPAD_MODE == "xinput":
+            # 只在用到时导入
+            from xinput import XInputInterface
+
+            if len(tables) > 1:
+                raise ValueError("xinput mode supports one player")
+            gamepad_class = XInputInterface
+        else:
+            gamepad_class = Xbox360Interface
+
+        # GPIO 后端在扫描时直接读寄存器，省一次方法调用
+        if INPUT is None:
+            self.input = GpioInput()
+            self.read_input = None
+        else:
+            self.input = INPUT()
+            self.read_input = self.input.read
+        self.players = [
+            Player(i, pins, gamepad_class(), SCAN_KERNEL, self.input) for i, pins in enumerate(tables)
+        ]
+        gamepads = [p.gamepad for p in self.players]
+        if GAMEPAD_MODE != "xinput":
+            # HID 手柄通过特性报告提供遥测数据和运行时设置
+            for gp in gamepads:
+                gp.features[TELEMETRY_REPORT_ID] = self.stats
+                gp.features[SETTINGS_REPORT_ID] = self.tuning
+        self.usb.init(*gamepads, remote_wakeup=REMOTE_WAKEUP, **gamepad_class.USB_CONFIG)
+
+        # 第一个玩家的手柄和状态灯、界面、基准测试绑定
+        first = self.players[0]
+        self.gamepad = first.gamepad
+        self.kernel = first.kernel
+        self.keys = first.pins
+        dlog.info("scan kernel: " + self.kernel.name)
+        dlog.info("input: " + self.input.name)
+
+        count_of_dot = cycle(_CONNECTING)
+
+        while not self.__all_open():
+            self.oled.fill(0)
+            self.text_centered_xy(next(count_of_dot))
+            self.oled.show()
+
+            time.sleep_ms(100)
+        self.usb_opens = self.usb.opens
+
+    def __all_open(self) -> bool:
+        for p in self.players:
+            if not p.gamepad.is_open():
+                return False
+        return True
+
+    def start(self):
+        """进入扫描循环前的准备，run() 会调用；单步运行 (step()) 前需要手动调用"""
+        self.oled.fill(0)
+        self.text_centered_xy("HEllo!!")
+        self.oled.show()
+        time.sleep_ms(500)
+        self.screen.invalidate()
+
+        self.gc.start()
+
+    def step(self):
+        """执行一次扫描循环，用于主机模拟和基准测试"""
+        self.__loop()
+
+    def run(self):
+        self.start()
+        if WDT_TIMEOUT_MS is not None:
+            self.wdt = machine.WDT(timeout=WDT_TIMEOUT_MS)
+
+        while True:
+            try:
+                while True:
+                    self.__loop()
+            except Exception as e:
+                if not self.__recover(e):
+                    break
+
+        self.stop()
+
+    def __recover(self, e) -> bool:
+        """扫描循环出错后调用，返回 True 表示可以重新开始扫描"""
+        # 只有出错时才用到，不在启动时导入
+        import sys
+        from io import StringIO
+
+        buf = StringIO()
+        sys.print_exception(e, buf)
+        tb = buf.getvalue()
+        self.last_error = tb
+        dlog.error(tb)
+
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._crash_window) > RESTART_WINDOW_MS:
+            self._crash_window = now
+            self._crashes = 0
+        self._crashes += 1
+
+        if self._crashes > RESTART_MAX:
+            dlog.error("scan loop failed %d times, giving up", self._crashes)
+            for p in self.players:
+                p.gamepad.release_all()
+            self.__show_error(tb)
+            return False
+
+        # 主机上不能留下卡住的键，下次扫描把实际状态报告给主机
+        for p in self.players:
+            p.release()
+        if self.idle:
+            self.__exit_idle()
+        # 出错时可能正画到一半，全部控件下次重画 (不清屏，清屏要整屏传输)
+        for w in self.screen.widgets:
+            w.dirty = True
+        self.restarts += 1
+        dlog.warn("scan loop restarted (%d)", self.restarts)
+        return True
+
+    def __apply_settings(self):
+        t = self.tuning
+        for p in self.players:
+            p.debounce_us = t.debounce_us
+        BoardLED.set_max_fps(t.led_fps)
+        if self.strip is not None and t.strip_fps:
+            self.strip.set_fps(t.strip_fps)
+        self.ui_period_ms = 1000 // t.display_fps if t.display_fps else 0
+        dlog.info("settings applied: scan %d us, debounce %d us", t.scan_period_us, t.debounce_us)
+
+    def __loop(self):
+        if self.idle:
+            self.__idle_loop()
+            return
+
+        # 主机写入的新设置在两次扫描之间生效
+        if self.tuning.apply():
+            self.__apply_settings()
+
+        self.__check_usb()
+
+        t0 = time.ticks_us()
+
+        if NOALLOC_CHECK:
+            a0 = gc.mem_alloc()
+            btn_changed = self.__scan(t0)
+            self.__check_alloc(gc.mem_alloc() - a0)
+        else:
+            btn_changed = self.__scan(t0)
+
+        # 板载灯限速写入，每次扫描都请求当时该显示的颜色，写入时就是最新的
+        led_ms = time.ticks_ms()
+        if btn_changed:
+            self.press_led_until = time.ticks_add(led_ms, LED_PRESS_MS)
+        if self.held or time.ticks_diff(self.press_led_until, led_ms) > 0:
+            BoardLED.on(0, 0, 8)
+        else:
+            o = ((led_ms // LED_HUE_MS) & 0xFF) * 3
+            pal = self.hue_palette
+            BoardLED.on(pal[o], pal[o + 1], pal[o + 2])
+
+        if self.strip is not None:
+            if btn_changed:
+                self.strip.set_buttons(self.buttons)
+            self.strip.tick(t0)
+
+        self.__update_ui()
+
+        # 刚提交完报告时下一个报告要等主机轮询，正好用来回收 (按键变了但端点忙或
+        # 总线挂起时报告没提交，不算)
+        now_ms = time.ticks_ms()
+        self.gc.poll(now_ms, self.sent)
+        if self.wdt is not None:
+            self.wdt.feed()
+
+        # 报告已经提交，这时候换频率不会推迟按键的报告
+        active = btn_changed or self.held
+        if self.governor is not None:
+            self.governor.poll(now_ms, active)
+
+        # 主机挂起时不用等空闲超时
+        if active:
+            self.last_input_ms = now_ms
+        elif self.suspended or (
+            IDLE_AFTER_MS is not None and time.ticks_diff(now_ms, self.last_input_ms) >= IDLE_AFTER_MS
+        ):
+            self.__enter_idle()
+            return
+
+        if not btn_changed:
+            dlog.drain(DLOG_DRAIN)
+
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        self.stats.record_scan(dt)
+
+        period = self.tuning.scan_period_us
+        if period > dt:
+            time.sleep_us(period - dt)
+
+    def __enter_idle(self):
+        global _woken
+        self.idle = True
+        _woken = False
+        dlog.info("idle")
+        if IDLE_CONTRAST is None:
+            self.oled.poweroff()
+        else:
+            self.oled.contrast(IDLE_CONTRAST)
+        BoardLED.off()
+        if self.strip is not None:
+            self.strip.off()
+        for p in self.players:
+            for pin in p.pins:
+                pin.irq(_wake, Pin.IRQ_FALLING, hard=True)
+
+    def __exit_idle(self):
+        # 报告已经在 __idle_loop 里提交了，这里才恢复屏幕和灯
+        self.idle = False
+        self.last_input_ms = time.ticks_ms()
+        for p in self.players:
+            for pin in p.pins:
+                pin.irq(None)
+        # 屏幕关闭时显存内容还在，打开后由 __update_ui 按需刷新
+        if IDLE_CONTRAST is None:
+            self.oled.poweron()
+        else:
+            self.oled.contrast(0xFF)
+        dlog.info("wake")
+
+    def __idle_loop(self):
+        # 睡到超时或被按键中断唤醒，醒来先扫描并提交报告，有输入再恢复正常循环。
+        # 上一轮之后已经来过中断就不睡，否则要等到 IDLE_SLEEP_MS 超时才扫描
+        global _woken
+        if not _woken:
+            machine.lightsleep(IDLE_SLEEP_MS)
+
+        if self.tuning.apply():
+            self.__apply_settings()
+
+        # 主机恢复总线时也恢复屏幕
+        if self.__check_usb() and not self.suspended:
+            self.__exit_idle()
+            return
+
+        # 扫描读 GPIO 之前清标志：扫描过程中再来的按键会重新置位，下一轮不睡
+        _woken = False
+        if self.__scan(time.ticks_us()) or self.held:
+            self.__exit_idle()
+            return
+
+        now_ms = time.ticks_ms()
+        if self.stats.due(now_ms):
+            self.__publish_stats(now_ms)
+        self.gc.poll(now_ms, False)
+        if self.wdt is not None:
+            self.wdt.feed()
+        dlog.drain(DLOG_DRAIN)
+
+    def __check_usb(self) -> bool:
+        """跟踪主机的复位、重新配置和挂起，返回 True 表示挂起状态变了"""
+        dev = self.usb
+        if dev.opens != self.usb_opens:
+            # 重新配置后主机不知道当前的按键状态 (比如一直按着的键)，重发一次
+            self.usb_opens = dev.opens
+            for p in self.players:
+                p.pending = True
+            dlog.info("usb configured (resets %d)", dev.resets)
+
+        suspended = usblink.suspended()
+        if suspended == self.suspended:
+            return False
+        self.suspended = suspended
+        dlog.info("usb suspend" if suspended else "usb resume")
+        return True
+
+    def __scan(self, now_us: int) -> bool:
+        # 扫描路径：一次读取全部 GPIO，各玩家的内核完成映射、边沿检测并写入报告，不分配内存
+        read = self.read_input
+        raw = mem32[SIO_GPIO_IN] if read is None else read()
+        # 挂起时提交的报告要等主机恢复才发出，那时已经过时，所以只更新状态，
+        # 有按键变化并且启用了 REMOTE_WAKEUP 就请求远程唤醒，恢复后再提交最新状态
+        send = not self.suspended
+        changed = False
+        held = False
+        sent = False
+        for p in self.players:
+            if p.poll(raw, now_us, send):
+                changed = True
+            if p.sent:
+                sent = True
+            if p.buttons:
+                held = True
+        self.held = held
+        self.sent = sent
+        if changed:
+            self.buttons = self.players[0].buttons
+            if not send and REMOTE_WAKEUP and usblink.remote_wakeup():
+                dlog.info("remote wakeup")
+        return changed
+
+    def __check_alloc(self, allocated: int):
+        if allocated > 0:
+            self.alloc_violations += 1
+            if NOALLOC_STRICT:
+                raise MemoryError("scan allocated %d bytes" % allocated)
+
+    def __update_ui(self):
+        now = time.ticks_ms()
+        if self.stats.due(now):
+            self.__publish_stats(now)
+
+        if self.ui_period_ms:
+            if time.ticks_diff(now, self.ui_last) < self.ui_period_ms:
+                return
+            self.ui_last = now
+
+        if self.suspended:
+            self.usb_label.set("zz")
+        else:
+            self.usb_label.set("OK" if self.__all_open() else "--")
+        self.button_map.set(self.buttons)
+        # 按着键或者还有报告没提交时，下一次扫描随时可能要发报告，不刷新统计这类
+        # 不急的控件
+        busy = self.held
+        for p in self.players:
+            if p.pending:
+                busy = True
+        self.screen.refresh(busy)
+
+    def __publish_stats(self, now: int):
+        reports = 0
+        dropped = 0
+        for p in self.players:
+            reports += p.gamepad.report_count
+            dropped += p.dropped
+        stats = self.stats
+        stats.publish(now, reports, dropped, self.gc, len(self.players), self.kernel.name)
+
+        self.scan_label.set(stats.scan_hz)
+        self.report_label.set(stats.report_hz)
+        self.max_label.set(stats.window_max_us)
+        self.gc_label.set(self.gc.max_us)
+
+    def __show_error(self, error_traceback: str):
+        MAX_CHARS = 16
+        SCREEN_LINES = 8
+        PAUSE_FRAMES = 10
+        FRAME_DELAY = 0.15
+
+        # 1. 拆成每行 <=16 字符的 buffer
+        buffer = []
+        for text in error_traceback.splitlines():
+            while len(text) > MAX_CHARS:
+                buffer.append(text[:MAX_CHARS])
+                text = text[MAX_CHARS:]
+            buffer.append(text)
+
+        offset = 0
+        direction = 1  # 1 向下，-1 向上
+        pause = 0
+        err_led_state = True
+
+        # 2. 无限滚动显示
+        while True:
+            if self.wdt is not None:
+                self.wdt.feed()
+            BoardLED.on(255 if err_led_state else 0, 0, 0)
+            err_led_state = not err_led_state
+
+            self.oled.fill(0)
+
+            for i in range(SCREEN_LINES):
+                idx = offset + i
+                if idx >= len(buffer):
+                    break
+                self.oled.text(buffer[idx], 0, i * 8)
+
+            self.oled.show()
+
+            # 行数不够，不滚
+            if len(buffer) <= SCREEN_LINES:
+                time.sleep(FRAME_DELAY)
+                continue
+
+            # 首尾停留
+            if pause > 0:
+                pause -= 1
+                time.sleep(FRAME_DELAY)
+                continue
+
+            offset += direction
+
+            # 到底部
+            if offset >= len(buffer) - SCREEN_LINES:
+                offset = len(buffer) - SCREEN_LINES
+                direction = -1
+                pause = PAUSE_FRAMES
+
+            # 到顶部
+            elif offset <= 0:
+                offset = 0
+                direction = 1
+                pause = PAUSE_FRAMES
+
+            time.sleep(FRAME_DELAY)
+
+    def stop(self):
+        BoardLED.off()
+        if self.strip is not None:
+            self.strip.off()
+
+        print("finish")
+
+    def text_centered_xy(self, text: str):
+        w, h = measure_text(text)
+        x = (OLED_WIDTH - w) // 2
+        y = (OLED_HEIGHT - h) // 2
+        self.oled.text(text, x, y)
+
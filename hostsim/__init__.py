@@ -0,0 +1,118 @@
+# 主机端硬件模拟层
+#
+# 在桌面 CPython 上运行、剖析固件并做回归基准。只用于开发机，不要拷到板子上。
+#
+#   import hostsim
+#   hostsim.install()
+#   from hitbox import Hitbox
+#
+# install() 把 machine / neopixel / framebuf / micropython 的替身放进
+# sys.modules，并给 time、gc、sys 补上 MicroPython 特有的函数。
+# 命令行跑一段脚本化的输入：python -m hostsim --help
+import gc
+import sys
+import time
+import traceback
+import tracemalloc
+
+from . import clock
+
+_installed = False
+
+
+def _mem_alloc():
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+_gc_threshold = -1
+
+
+def _threshold(amount=None):
+    global _gc_threshold
+    if amount is None:
+        return _gc_threshold
+    _gc_threshold = amount
+    return None
+
+
+def _print_exception(exc, file=sys.stdout):
+    traceback.print_exception(type(exc), exc, exc.__traceback__, file=file)
+
+
+def install(poll_us=None):
+    """安装替身模块，poll_us 是主机轮询 IN 端点的间隔 (None 按描述符)"""
+    global _installed
+    from . import machine, micropython, neopixel, framebuf, usbhost
+
+    usbhost.host.poll_us = poll_us
+    if _installed:
+        return
+    _installed = True
+
+    sys.modules.setdefault("machine", machine)
+    sys.modules.setdefault("micropython", micropython)
+    sys.modules.setdefault("neopixel", neopixel)
+    sys.modules.setdefault("framebuf", framebuf)
+
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.ticks_cpu = clock.ticks_cpu
+    time.ticks_diff = clock.ticks_diff
+    time.ticks_add = clock.ticks_add
+    time.sleep_ms = clock.sleep_ms
+    time.sleep_us = clock.sleep_us
+
+    gc.mem_alloc = _mem_alloc
+    gc.mem_free = lambda: 200 * 1024 - _mem_alloc()
+    gc.threshold = _threshold
+
+    sys.print_exception = _print_exception
+
+
+def host():
+    """模拟的 USB 主机，见 usbhost.Host"""
+    from .usbhost import host
+
+    return host
+
+
+class Script:
+    """按时间施加输入的脚本：[(t_us, gpio, pressed), ...]，t_us 相对 start()
+
+    press/release 默认是 machine.press/release (接地的按键)，其他输入模型
+    (比如 hall.HallKeys) 传自己的函数，这时 gpio 是模型的按键编号
+    """
+
+    def __init__(self, events, press=None, release=None):
+        self.events = sorted(events)
+        self._press = press
+        self._release = release
+        self.applied = []  # [(实际施加的时刻, gpio, pressed), ...]
+        self._i = 0
+        self._t0 = None
+        clock.add_hook(self._tick)
+
+    def start(self):
+        self._t0 = clock.now_us()
+        self._i = 0
+
+    def done(self):
+        return self._i >= len(self.events)
+
+    def _tick(self, now):
+        from . import machine
+
+        if self._t0 is None:
+            return
+        while self._i < len(self.events):
+            t, gpio, pressed = self.events[self._i]
+            if now - self._t0 < t:
+                break
+            if pressed:
+                (self._press or machine.press)(gpio)
+            else:
+                (self._release or machine.release)(gpio)
+            self.applied.append((now, gpio, pressed))
+            self._i += 1
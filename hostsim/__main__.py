@@ -0,0 +1,304 @@
+# 在 CPython 上运行 Hitbox，用随机的脚本化按键序列做回归基准
+#
+#   python -m hostsim                      # 默认跑 2 秒模拟时间
+#   python -m hostsim --duration-ms 5000 --poll-us 125
+#   python -m hostsim --profile            # 附带 cProfile 热点
+#   python -m hostsim --mode xinput        # XInput 模式
+#   python -m hostsim --players 3 --keys 8 # 3 个玩家，每人 8 个键
+#   python -m hostsim --input hall         # 磁轴：2 个 ADC x 8 路多路开关，延迟从触发深度算起
+#   python -m hostsim --input shiftreg     # 4 片 74HC165 (SPI1)
+#   python -m hostsim --input mcp23017     # 2 片 MCP23017 (I2C1)
+#   python -m hostsim --input matrix       # 4x4 矩阵，加 --no-diodes 模拟没有二极管 (鬼键)
+#   python -m hostsim --json               # 只输出一行 JSON，便于比较不同版本
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+
+def _percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+def make_events(gpios, duration_us, interval_us, seed):
+    """大约每隔 interval_us 随机切换一个按键，同一个键两次切换至少间隔 3 个周期
+
+    每个事件在自己的周期内随机抖动，避免和主机轮询固定相位对齐
+    """
+    rnd = random.Random(seed)
+    pressed = {g: False for g in gpios}
+    last = {g: -(1 << 60) for g in gpios}
+    events = []
+    t = interval_us
+    while t < duration_us:
+        candidates = [g for g in gpios if t - last[g] >= 4 * interval_us]
+        if candidates:
+            g = rnd.choice(candidates)
+            pressed[g] = not pressed[g]
+            last[g] = t
+            events.append((t + rnd.randrange(interval_us), g, pressed[g]))
+        t += interval_us
+    # 最后全部松开
+    for g in gpios:
+        if pressed[g]:
+            t += interval_us
+            events.append((t, g, False))
+    return events
+
+
+# I2C (GPIO0/1) 和板载灯 (GPIO16) 占用的引脚，模拟多个玩家时不分配
+_RESERVED_GPIOS = (0, 1, 16)
+
+
+def player_tables(firmware, players, keys, free=None):
+    """把空闲的 GPIO (或 free 里的按键编号) 分给每个玩家，按钮沿用 KEY_PINS 的前 keys 个"""
+    if free is None:
+        reserved = set(_RESERVED_GPIOS)
+        if firmware.LED_STRIP_PIN is not None:
+            reserved.add(firmware.LED_STRIP_PIN)
+        free = [g for g in range(30) if g not in reserved]
+    if players * keys > len(free):
+        raise SystemExit("not enough GPIOs for %d players x %d keys" % (players, keys))
+    codes = [code for _, code in firmware.KEY_PINS[:keys]]
+    return tuple(
+        tuple(zip(free[i * keys : (i + 1) * keys], codes)) for i in range(players)
+    )
+
+
+# --input hall 的接法：GPIO26/27 (ADC0/1) 各接一个 8 路多路开关，选择线 GPIO2~4
+_HALL_ADC_PINS = (26, 27)
+_HALL_MUX_PINS = (2, 3, 4)
+_HALL_KEYS = 16
+
+# --input shiftreg：SPI1 (SCK GPIO10、MISO GPIO12)，SH/LD 接 GPIO13，4 片
+_SR_SPI = (1, 10, 12, 13)
+_SR_CHIPS = 4
+# --input mcp23017：I2C1 (SCL GPIO3、SDA GPIO2)，地址 0x20/0x21，INTA 接 GPIO4
+_MCP_I2C = (1, 3, 2)
+_MCP_ADDRS = (0x20, 0x21)
+_MCP_INT = 4
+# --input matrix：4x4，行线 GPIO2~5，列线 GPIO6~9
+_MATRIX_ROWS = (2, 3, 4, 5)
+_MATRIX_COLS = (6, 7, 8, 9)
+
+
+def _in_ep(gamepad):
+    # HID 手柄和 XInput 手柄的 IN 端点属性名不同
+    ep = getattr(gamepad, "_int_ep", None)
+    return ep if ep is not None else gamepad._in_ep
+
+
+def _ep_stats(ep):
+    from usb.device import core
+
+    s = core.ep_stats(ep)
+    return {
+        "submitted": s[core.EP_SUBMITTED],
+        "completed": s[core.EP_COMPLETED],
+        "failed": s[core.EP_FAILED],
+        "short": s[core.EP_SHORT],
+        "spins": s[core.EP_SPINS],
+        "flight_us_min": s[core.EP_FLIGHT_MIN_US],
+        "flight_us_max": s[core.EP_FLIGHT_MAX_US],
+    }
+
+
+def input_latencies(applied, reports, masks, offset, size):
+    """每个输入事件到主机收到反映该状态的报告之间的模拟时间"""
+    out = []
+    j = 0
+    for t, gpio, pressed in applied:
+        while j < len(reports) and reports[j][0] < t:
+            j += 1
+        mask = masks[gpio]
+        for t_r, data in reports[j:]:
+            buttons = int.from_bytes(data[offset : offset + size], "little")
+            if bool(buttons & mask) == pressed:
+                out.append(t_r - t)
+                break
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m hostsim")
+    parser.add_argument("--duration-ms", type=int, default=2000, help="脚本输入的模拟时长")
+    parser.add_argument("--interval-ms", type=float, default=8, help="两次按键变化的间隔")
+    parser.add_argument("--poll-us", type=int, default=None, help="主机轮询间隔，默认按 bInterval")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=("hid", "xinput"), default=None, help="覆盖 GAMEPAD_MODE")
+    parser.add_argument("--players", type=int, default=None, help="玩家数，覆盖 PLAYERS")
+    parser.add_argument("--keys", type=int, default=None, help="每个玩家的按键数 (配合 --players)")
+    parser.add_argument(
+        "--input", choices=("gpio", "hall", "shiftreg", "mcp23017", "matrix"), default="gpio", help="输入后端"
+    )
+    parser.add_argument("--no-diodes", action="store_true", help="--input matrix 时矩阵没有二极管，构成矩形的新按键会被挡住")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    # --json 时 stdout 上只有结果那一行，固件的 print 和日志改到 stderr
+    out = sys.stdout
+    if args.json:
+        sys.stdout = sys.stderr
+    try:
+        _run(args, out)
+    finally:
+        sys.stdout = out
+
+
+def _run(args, out):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import hostsim
+
+    hostsim.install(args.poll_us)
+
+    import board_led
+    import hitbox as firmware
+
+    if args.mode:
+        firmware.GAMEPAD_MODE = args.mode
+    hall_keys = None
+    press = release = None  # 非 GPIO 后端的按键模型
+    nkeys = 0
+    if args.input == "hall":
+        from hall import HallInput
+        from hostsim.hall import HallKeys
+
+        # 模型要在固件校准静止读数之前就位
+        hall_keys = HallKeys(_HALL_ADC_PINS, _HALL_MUX_PINS, _HALL_KEYS)
+        firmware.INPUT = lambda: HallInput(_HALL_ADC_PINS, _HALL_MUX_PINS, _HALL_KEYS)
+        press, release, nkeys = hall_keys.press, hall_keys.release, _HALL_KEYS
+    elif args.input == "shiftreg":
+        from shiftreg import ShiftRegInput
+        from hostsim.expanders import ShiftRegChain
+
+        chain = ShiftRegChain(_SR_SPI[0], _SR_SPI[3], _SR_CHIPS)
+        firmware.INPUT = lambda: ShiftRegInput(*_SR_SPI, chips=_SR_CHIPS)
+        press, release, nkeys = chain.press, chain.release, min(30, chain.keys)
+    elif args.input == "mcp23017":
+        from mcp23017 import Mcp23017Input
+        from hostsim.expanders import Mcp23017
+
+        chips = [Mcp23017(_MCP_I2C[0], addr, _MCP_INT) for addr in _MCP_ADDRS]
+        firmware.INPUT = lambda: Mcp23017Input(*_MCP_I2C, addrs=_MCP_ADDRS, int_pin=_MCP_INT)
+        press = lambda k: chips[k // 16].press(k % 16)
+        release = lambda k: chips[k // 16].release(k % 16)
+        nkeys = min(30, 16 * len(chips))
+    elif args.input == "matrix":
+        from matrix import MatrixInput
+        from hostsim.matrix import MatrixKeys
+
+        diodes = not args.no_diodes
+        mat = MatrixKeys(_MATRIX_ROWS, _MATRIX_COLS, diodes)
+        firmware.INPUT = lambda: MatrixInput(_MATRIX_ROWS, _MATRIX_COLS, diodes)
+        press, release, nkeys = mat.press, mat.release, mat.keys
+    if press is not None:
+        players = args.players or 1
+        keys = args.keys or min(len(firmware.KEY_PINS), nkeys // players)
+        firmware.PLAYERS = player_tables(firmware, players, keys, list(range(nkeys)))
+    elif args.players:
+        keys = args.keys or min(len(firmware.KEY_PINS), (30 - len(_RESERVED_GPIOS)) // args.players)
+        firmware.PLAYERS = player_tables(firmware, args.players, keys)
+    hb = firmware.Hitbox()
+    hb.start()
+
+    # 每个玩家各自一串随机输入 (同样的间隔，不同的种子)
+    events = []
+    for p in hb.players:
+        gpios = [gpio for gpio, _ in p.key_pins]
+        events += make_events(
+            gpios, args.duration_ms * 1000, int(args.interval_ms * 1000), args.seed + p.index
+        )
+    if press is not None:
+        script = hostsim.Script(events, press, release)
+    else:
+        script = hostsim.Script(events)
+
+    i2c_before = hb.i2c.bytes_written
+    led_before = board_led.np.writes
+
+    def loop():
+        scans = 0
+        script.start()
+        deadline = None
+        while True:
+            hb.step()
+            scans += 1
+            if script.done():
+                # 最后一个事件之后再跑 20ms，让报告发出去
+                now = hostsim.clock.now_us()
+                if deadline is None:
+                    deadline = now + 20000
+                elif now >= deadline:
+                    return scans
+
+    t0 = time.perf_counter()
+    v0 = hostsim.clock.now_us()
+    if args.profile:
+        import cProfile
+        import pstats
+
+        prof = cProfile.Profile()
+        scans = prof.runcall(loop)
+    else:
+        scans = loop()
+    real_s = time.perf_counter() - t0
+    virtual_us = hostsim.clock.now_us() - v0
+
+    reports = hostsim.host().reports()
+    applied = script.applied
+    if hall_keys is not None:
+        # 磁轴的延迟从键实际走到触发深度算起：按下是 actuate，从底部抬起是
+        # sensitivity (快速触发)，键本身的行程时间不算固件延迟
+        src = hb.input
+        t_press = hall_keys.travel_us * src.actuate // 255
+        t_release = hall_keys.travel_us * src.sensitivity // 255
+        applied = [(t + (t_press if p else t_release), k, p) for t, k, p in applied]
+    lat = []
+    lat_by_player = []
+    for p in hb.players:
+        gp = p.gamepad
+        masks = {gpio: gp.key_mask(code) for gpio, code in p.key_pins}
+        mine = [e for e in applied if e[1] in masks]
+        pl = input_latencies(
+            mine, hostsim.host().reports(_in_ep(gp)), masks, gp.BUTTONS_OFFSET, gp.BUTTONS_SIZE
+        )
+        lat += pl
+        lat_by_player.append(pl)
+    result = {
+        "scans": scans,
+        "host_us_per_scan": round(real_s * 1e6 / scans, 2),
+        "virtual_us_per_scan": round(virtual_us / scans, 2),
+        "events": len(script.applied),
+        "reports": len(reports),
+        "latency_us_mean": round(sum(lat) / len(lat)) if lat else 0,
+        "latency_us_p99": _percentile(lat, 99),
+        "latency_us_max": max(lat) if lat else 0,
+        "missed_events": len(script.applied) - len(lat),
+        "i2c_bytes": hb.i2c.bytes_written - i2c_before,
+        "led_writes": board_led.np.writes - led_before,
+        "kernel": hb.kernel.name,
+        "mode": firmware.GAMEPAD_MODE,
+        "input": hb.input.name,
+        "players": len(hb.players),
+        "latency_us_mean_by_player": [round(sum(pl) / len(pl)) if pl else 0 for pl in lat_by_player],
+        "latency_us_p99_by_player": [_percentile(pl, 99) for pl in lat_by_player],
+        "usb_in_by_player": [_ep_stats(_in_ep(p.gamepad)) for p in hb.players],
+    }
+
+    if args.json:
+        print(json.dumps(result), file=out)
+    else:
+        for k, v in result.items():
+            print("%-22s %s" % (k, v))
+    if args.profile:
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# 模拟时钟
+#
+# 时间 = 真实流逝的时间 + 模拟的硬件耗时 (I2C 传输、WS2812 发送、sleep 等)。
+# 硬件操作不真的等待，而是把耗时加到时钟上，这样 CPython 上的剖析结果里
+# 只有固件自己的 Python 代码耗时，而扫描/报告时序仍然接近真实硬件。
+import time as _time
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+_start_ns = _time.perf_counter_ns()
+_offset_us = 0
+# 真实流逝时间折算成模拟时间的倍数，模拟 CPU 频率变化 (见 machine.freq)
+_scale = 1.0
+
+# 每次读取时钟时调用的钩子 (USB 主机轮询、输入脚本)，模拟中断/调度器
+_hooks = []
+_in_hooks = False
+
+
+def now_us() -> int:
+    return int((_time.perf_counter_ns() - _start_ns) * _scale) // 1000 + _offset_us
+
+
+def set_cpu_scale(scale: float) -> None:
+    """之后真实流逝的时间乘以 scale 计入模拟时钟，之前的时间不变"""
+    global _start_ns, _offset_us, _scale
+    now = now_us()
+    _start_ns = _time.perf_counter_ns()
+    _offset_us = now
+    _scale = scale
+
+
+def advance(us: int) -> None:
+    """把模拟的硬件耗时加到时钟上"""
+    global _offset_us
+    if us > 0:
+        _offset_us += int(us)
+
+
+def add_hook(fn) -> None:
+    _hooks.append(fn)
+
+
+def service() -> None:
+    """运行所有钩子，钩子里再读时钟不会重入"""
+    global _in_hooks
+    if _in_hooks:
+        return
+    _in_hooks = True
+    try:
+        now = now_us()
+        for fn in _hooks:
+            fn(now)
+    finally:
+        _in_hooks = False
+
+
+# MicroPython time 模块的 ticks_* 接口
+
+def ticks_us() -> int:
+    service()
+    return now_us() & _TICKS_MAX
+
+
+def ticks_ms() -> int:
+    service()
+    return (now_us() // 1000) & _TICKS_MAX
+
+
+def ticks_cpu() -> int:
+    return ticks_us()
+
+
+def ticks_diff(a: int, b: int) -> int:
+    return ((a - b + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def ticks_add(t: int, delta: int) -> int:
+    return (t + delta) & _TICKS_MAX
+
+
+def sleep_us(us: int) -> None:
+    advance(us)
+    service()
+
+
+def sleep_ms(ms: int) -> None:
+    advance(ms * 1000)
+    service()
@@ -0,0 +1,101 @@
+# 按键扩展芯片的模拟：74HC165 串联和 MCP23017
+#
+# 和 firmware 的 shiftreg.ShiftRegInput、mcp23017.Mcp23017Input 对应，按键编号
+# 的规则也一样。press()/release() 改的是芯片输入脚的电平 (按下接地)。
+from . import machine
+
+
+class ShiftRegChain:
+    """SPI 总线 spi_id 上的 chips 片 74HC165，SH/LD 接 load_gpio"""
+
+    def __init__(self, spi_id, load_gpio, chips=1):
+        self.chips = chips
+        self.keys = chips * 8
+        self._inputs = (1 << self.keys) - 1  # 上拉，全部松开
+        self._shift = self._inputs
+        self.loads = 0
+        machine.watch(load_gpio, self._on_load)
+        machine.attach_spi(spi_id, self)
+
+    def press(self, k):
+        self._inputs &= ~(1 << k)
+
+    def release(self, k):
+        self._inputs |= 1 << k
+
+    def _on_load(self, level):
+        # SH/LD 为低时移位寄存器跟随并行输入，拉高时锁住
+        if not level:
+            self._shift = self._inputs
+            self.loads += 1
+
+    def transfer(self, buf, write):
+        # 每个时钟移出一位，最后一片的 SER 接高电平，移空后读到的是 1
+        for i in range(len(buf)):
+            buf[i] = self._shift & 0xFF
+            self._shift = (self._shift >> 8) | (0xFF << (self.keys - 8))
+
+
+class Mcp23017:
+    """I2C 总线 i2c_id 上地址为 addr 的 MCP23017；int_gpio 是 INTA 接到的 GPIO"""
+
+    _IODIRA = 0x00
+    _GPINTENA = 0x04
+    _IOCON = 0x0A
+    _GPPUA = 0x0C
+    _INTFA = 0x0E
+    _GPIOA = 0x12
+
+    def __init__(self, i2c_id, addr=0x20, int_gpio=None):
+        self.keys = 16
+        self.regs = bytearray(0x16)
+        self.regs[self._IODIRA] = self.regs[self._IODIRA + 1] = 0xFF
+        self._grounded = 0  # 按下的输入
+        self._int_gpio = int_gpio
+        self.reads = 0
+        machine.attach_i2c(i2c_id, addr, self)
+
+    def _reg16(self, reg):
+        return self.regs[reg] | (self.regs[reg + 1] << 8)
+
+    def levels(self):
+        # 没开上拉的输入悬空，这里按读到 0 处理，固件漏配 GPPU 时所有键都像按着
+        return self._reg16(self._GPPUA) & ~self._grounded & 0xFFFF
+
+    def press(self, k):
+        self._change(self._grounded | (1 << k))
+
+    def release(self, k):
+        self._change(self._grounded & ~(1 << k))
+
+    def _change(self, grounded):
+        changed = (self._grounded ^ grounded) & self._reg16(self._GPINTENA)
+        self._grounded = grounded
+        if changed:
+            self.regs[self._INTFA] |= changed & 0xFF
+            self.regs[self._INTFA + 1] |= changed >> 8
+            self._set_int(True)
+
+    def _set_int(self, active):
+        if self._int_gpio is not None:
+            # INT 开漏，有中断时拉低，没有时交给上拉
+            machine.set_level(self._int_gpio, 0 if active else None)
+
+    def read_mem(self, memaddr, n):
+        out = bytearray(n)
+        levels = self.levels()
+        for i in range(n):
+            reg = (memaddr + i) % len(self.regs)
+            if reg in (self._GPIOA, self._GPIOA + 1):
+                out[i] = (levels >> (8 * (reg - self._GPIOA))) & 0xFF
+                # 读 GPIO 清中断
+                self.regs[self._INTFA] = self.regs[self._INTFA + 1] = 0
+                self._set_int(False)
+            else:
+                out[i] = self.regs[reg]
+        self.reads += 1
+        return out
+
+    def write_mem(self, memaddr, data):
+        for i, b in enumerate(data):
+            self.regs[(memaddr + i) % len(self.regs)] = b
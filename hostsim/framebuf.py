@@ -0,0 +1,69 @@
+# framebuf 模块的替身，只实现 MONO_VLSB 格式 (SSD1306 使用的格式)
+#
+# 没有字库，text() 把每个字符画成由字符编码决定的 8 列位图，足以让
+# 局部刷新、脏矩形之类的逻辑在主机上看到真实的缓冲区变化。
+
+MONO_VLSB = 0
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, format=MONO_VLSB, stride=None):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.texts = []  # 最近画过的文字，便于检查
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None if c is not None else 0
+        index = (y >> 3) * self.width + x
+        bit = 1 << (y & 7)
+        if c is None:
+            return 1 if self.buf[index] & bit else 0
+        if c:
+            self.buf[index] |= bit
+        else:
+            self.buf[index] &= ~bit & 0xFF
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        for i in range((self.height // 8) * self.width):
+            self.buf[i] = v
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self.pixel(xx, yy, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def text(self, s, x, y, c=1):
+        self.texts.append((s, x, y))
+        del self.texts[:-32]
+        for i, ch in enumerate(s):
+            code = ord(ch)
+            for col in range(8):
+                bits = code if col & 1 else (code >> 1) | 0x80
+                for row in range(8):
+                    if bits & (1 << row):
+                        self.pixel(x + i * 8 + col, y + row, c)
+
+    def scroll(self, dx, dy):
+        pass
+
+
+def FrameBuffer1(buf, width, height, stride=None):
+    return FrameBuffer(buf, width, height, MONO_VLSB, stride)
@@ -0,0 +1,64 @@
+# 磁轴按键的模拟
+#
+# 每个键的深度在 press()/release() 之后按 travel_us 线性走完全程，换算成 Hall
+# 传感器的读数写到 machine.set_analog()，和 firmware 的 hall.HallInput 对应。
+from . import clock, machine
+
+
+class HallKeys:
+    """接法和 hall.HallInput 的参数一样：adc_pins 是 ADC 的 GPIO，mux_pins 是多路开关的选择线"""
+
+    def __init__(self, adc_pins, mux_pins=(), keys=None, rest=20000, span=10000, travel_us=4000):
+        channels = [gpio - 26 for gpio in adc_pins]
+        if keys is None:
+            keys = len(channels) << len(mux_pins)
+        if mux_pins:
+            for channel in channels:
+                machine.attach_mux(channel, mux_pins)
+        self.layout = layout(channels, len(mux_pins), keys)
+        self.rest = rest
+        self.span = span
+        self.travel_us = travel_us
+        # 按键编号 -> (起点深度, 终点深度, 开始时间)，深度 0.0 ~ 1.0
+        self._moves = {k: (0.0, 0.0, 0) for k in self.layout}
+        for k in self.layout:
+            self._write(k, 0.0)
+        clock.add_hook(self._tick)
+
+    def depth(self, k, now=None):
+        start, end, t0 = self._moves[k]
+        if now is None:
+            now = clock.now_us()
+        frac = min(1.0, (now - t0) / self.travel_us) if self.travel_us else 1.0
+        return start + (end - start) * frac
+
+    def _move(self, k, end):
+        self._moves[k] = (self.depth(k), end, clock.now_us())
+
+    def press(self, k):
+        self._move(k, 1.0)
+
+    def release(self, k):
+        self._move(k, 0.0)
+
+    def _write(self, k, depth):
+        channel, mux = self.layout[k]
+        machine.set_analog(channel, int(self.rest + self.span * depth), mux)
+
+    def _tick(self, now):
+        for k, (start, end, t0) in self._moves.items():
+            if start == end:
+                continue
+            depth = self.depth(k, now)
+            self._write(k, depth)
+            if depth == end:
+                self._moves[k] = (end, end, t0)
+
+
+def layout(adc_channels, mux_bits, keys):
+    """按键编号 -> (ADC 通道, 多路开关输入或 None)
+
+    和 hall.HallInput 一样：第 ch 路、第 a 个 ADC 上的键是 ch * len(adc_channels) + a
+    """
+    n = len(adc_channels)
+    return {k: (adc_channels[k % n], (k // n) if mux_bits else None) for k in range(keys)}
@@ -0,0 +1,460 @@
+# machine 模块的替身
+#
+# - Pin：输入电平可以由脚本设置 (set_level/press/release)，支持上拉和边沿中断
+# - mem32：模拟 RP2040 SIO 的 GPIO 寄存器，GPIO_IN 由各引脚电平合成，
+#   GPIO_OUT/OE 的置位/清零写到已经创建的 Pin 上；
+#   USB 控制器的 SIE_STATUS (挂起位) 和 SIE_CTRL (远程唤醒) 对应模拟主机
+# - I2C：记录写入的字节，并按总线速率把传输时间加到时钟上
+# - WDT：按模拟时钟计时，超时调用 reset() (抛出 SystemExit)
+# - SPI/I2C：可以挂外部芯片的模型 (attach_spi/attach_i2c，见 expanders.py)，
+#   按总线速率把传输时间加到时钟上
+# - watch()：输出引脚电平变化时通知外部芯片模型 (比如 74HC165 的装入脚)
+# - attach_net()：引脚的外部电平由电路模型按当时的状态算出 (比如按键矩阵)
+# - ADC：读数由 set_analog() 设置，可以挂一个多路开关 (attach_mux)，
+#   按选择线的电平决定读哪一路
+# - USBDevice：见 usbhost.py
+from . import clock
+from .usbhost import USBDevice, host as _usb_host  # noqa: F401
+
+_SIO_BASE = 0xD0000000
+_SIO_GPIO_IN = _SIO_BASE + 0x004
+_SIO_GPIO_OUT = _SIO_BASE + 0x010
+_SIO_GPIO_OUT_SET = _SIO_BASE + 0x014
+_SIO_GPIO_OUT_CLR = _SIO_BASE + 0x018
+_SIO_GPIO_OE = _SIO_BASE + 0x020
+_SIO_GPIO_OE_SET = _SIO_BASE + 0x024
+_SIO_GPIO_OE_CLR = _SIO_BASE + 0x028
+
+_NUM_GPIO = 30
+
+_USBCTRL_SIE_CTRL_SET = 0x50110000 + 0x4C + 0x2000
+_USBCTRL_SIE_STATUS = 0x50110000 + 0x50
+_SIE_CTRL_RESUME = 1 << 12
+_SIE_STATUS_SUSPENDED = 1 << 4
+
+# 外部施加的电平：None 表示悬空 (由上拉/下拉决定)
+_external = [None] * _NUM_GPIO
+_pins = {}  # gpio -> Pin
+
+# 有引脚中断触发过，lightsleep 用来判断是否唤醒
+_irq_fired = False
+
+# gpio -> [fn(level), ...]，引脚电平被固件改变时调用
+_watchers = {}
+# gpio -> fn(gpio)，外部电路模型决定的电平 (0/1/None)，比如按键矩阵的列线
+_nets = {}
+
+
+def watch(gpio: int, fn) -> None:
+    """外部芯片模型接口：gpio 的电平被固件改变 (输出或 SIO 写) 时调用 fn(level)"""
+    _watchers.setdefault(gpio, []).append(fn)
+
+
+def _notify(gpio: int, level: int) -> None:
+    for fn in _watchers.get(gpio, ()):
+        fn(level)
+
+
+def attach_net(gpios, fn) -> None:
+    """外部电路模型接口：这些 gpio 的外部电平每次读取时由 fn(gpio) 给出，None 表示悬空"""
+    for gpio in gpios:
+        _nets[gpio] = fn
+
+
+def drive(change, gpios) -> None:
+    """外部电路模型接口：执行 change() 改变电路状态，电平因此变化的 gpio 触发中断"""
+    before = [_resolve(gpio) for gpio in gpios]
+    change()
+    for gpio, b in zip(gpios, before):
+        after = _resolve(gpio)
+        pin = _pins.get(gpio)
+        if pin is not None and after != b:
+            pin._edge(after)
+
+
+def _resolve(gpio: int) -> int:
+    pin = _pins.get(gpio)
+    if pin is not None and pin._mode in (Pin.OUT, Pin.OPEN_DRAIN) and pin._out is not None:
+        if pin._mode == Pin.OUT or pin._out == 0:
+            return pin._out
+    level = _external[gpio]
+    if level is None and gpio in _nets:
+        level = _nets[gpio](gpio)
+    if level is not None:
+        return level
+    if pin is not None and pin._pull == Pin.PULL_DOWN:
+        return 0
+    if pin is not None and pin._pull == Pin.PULL_UP:
+        return 1
+    return 0
+
+
+def set_level(gpio: int, level) -> None:
+    """脚本接口：给引脚施加外部电平，None 表示释放"""
+    before = _resolve(gpio)
+    _external[gpio] = level
+    after = _resolve(gpio)
+    pin = _pins.get(gpio)
+    if pin is not None and before != after:
+        pin._edge(after)
+
+
+def press(gpio: int) -> None:
+    """按下接到 GND 的按键"""
+    set_level(gpio, 0)
+
+
+def release(gpio: int) -> None:
+    set_level(gpio, None)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._mode = self.IN
+        self._pull = None
+        self._out = None
+        self._irq = None
+        self._trigger = 0
+        self.init(mode, pull, value)
+        _pins[id] = self
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self._mode = mode
+        if pull != -1:
+            self._pull = pull
+        if value is not None:
+            self._out = 1 if value else 0
+
+    def value(self, v=None):
+        if v is None:
+            return _resolve(self.id)
+        before = _resolve(self.id)
+        self._out = 1 if v else 0
+        after = _resolve(self.id)
+        if before != after:
+            _notify(self.id, after)
+        return None
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._irq = handler
+        self._trigger = trigger if handler else 0
+
+    def _edge(self, level):
+        global _irq_fired
+        if self._irq is None:
+            return
+        if (level == 0 and self._trigger & self.IRQ_FALLING) or (
+            level == 1 and self._trigger & self.IRQ_RISING
+        ):
+            _irq_fired = True
+            self._irq(self)
+
+
+class _Mem:
+    # 只模拟用到的寄存器，其余地址当普通内存
+    def __init__(self):
+        self._regs = {}
+
+    def __getitem__(self, addr):
+        clock.service()
+        if addr == _SIO_GPIO_IN:
+            v = 0
+            for gpio in range(_NUM_GPIO):
+                if _resolve(gpio):
+                    v |= 1 << gpio
+            return v
+        if addr == _USBCTRL_SIE_STATUS:
+            return _SIE_STATUS_SUSPENDED if _usb_host.suspended else 0
+        return self._regs.get(addr, 0)
+
+    def __setitem__(self, addr, value):
+        if addr == _USBCTRL_SIE_CTRL_SET:
+            if value & _SIE_CTRL_RESUME:
+                _usb_host.remote_wakeup()
+            return
+        if addr in _SIO_WRITES:
+            _sio_write(addr, value)
+            return
+        self._regs[addr] = value
+
+
+_SIO_WRITES = (_SIO_GPIO_OUT_SET, _SIO_GPIO_OUT_CLR, _SIO_GPIO_OE_SET, _SIO_GPIO_OE_CLR)
+
+
+def _sio_write(addr, value):
+    clock.service()
+    for gpio in range(_NUM_GPIO):
+        if not (value >> gpio) & 1:
+            continue
+        pin = _pins.get(gpio)
+        if pin is None:
+            continue
+        before = _resolve(gpio)
+        if addr == _SIO_GPIO_OUT_SET:
+            pin._out = 1
+        elif addr == _SIO_GPIO_OUT_CLR:
+            pin._out = 0
+        elif addr == _SIO_GPIO_OE_SET:
+            pin._mode = Pin.OUT
+            if pin._out is None:
+                pin._out = 0
+        else:
+            pin._mode = Pin.IN
+        after = _resolve(gpio)
+        if before != after:
+            pin._edge(after)
+            _notify(gpio, after)
+
+
+mem32 = _Mem()
+mem16 = mem32
+mem8 = mem32
+
+
+_i2c_models = {}  # (总线, 地址) -> 模型
+_spi_models = {}  # 总线 -> 模型
+
+
+def attach_i2c(bus: int, addr: int, model) -> None:
+    """在 I2C 总线上挂一个芯片模型，模型提供 read_mem(memaddr, n) 和 write_mem(memaddr, data)"""
+    _i2c_models[(bus, addr)] = model
+
+
+def attach_spi(bus: int, model) -> None:
+    """在 SPI 总线上挂一个芯片模型，模型提供 transfer(buf, write)，把读到的数据写进 buf"""
+    _spi_models[bus] = model
+
+
+class I2C:
+    # 总线上默认挂一个 SSD1306
+    devices = [0x3C]
+
+    def __init__(self, id=-1, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+        self.bytes_written = 0
+        self.transactions = 0
+
+    def _bus_time(self, nbytes):
+        # 每字节 9 个时钟 (含 ACK)，加上地址字节和起止条件
+        clock.advance((nbytes + 2) * 9 * 1000000 // self.freq)
+        self.transactions += 1
+
+    def scan(self):
+        models = [addr for bus, addr in _i2c_models if bus == self.id]
+        return sorted(set(self.devices) | set(models)) if self.id in (-1, 0) else models
+
+    def writeto(self, addr, buf, stop=True):
+        self.bytes_written += len(buf)
+        self._bus_time(len(buf))
+        return 1
+
+    def writevto(self, addr, vector, stop=True):
+        n = sum(len(b) for b in vector)
+        self.bytes_written += n
+        self._bus_time(n)
+        return len(vector)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self._bus_time(len(buf))
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        # 写寄存器地址、重复起始、再读：两个地址字节 + 寄存器地址 + 数据
+        self._bus_time(len(buf) + 2)
+        model = _i2c_models.get((self.id, addr))
+        if model is not None:
+            buf[:] = model.read_mem(memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.bytes_written += len(buf) + 1
+        self._bus_time(len(buf) + 1)
+        model = _i2c_models.get((self.id, addr))
+        if model is not None:
+            model.write_mem(memaddr, bytes(buf))
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id=0, baudrate=1000000, polarity=0, phase=0, bits=8, firstbit=0,
+                 sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+        self.transfers = 0
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def _bus_time(self, nbytes):
+        clock.advance(nbytes * 8 * 1000000 // self.baudrate)
+        self.transfers += 1
+
+    def readinto(self, buf, write=0x00):
+        self._bus_time(len(buf))
+        model = _spi_models.get(self.id)
+        if model is not None:
+            model.transfer(buf, write)
+        else:
+            for i in range(len(buf)):
+                buf[i] = 0xFF  # MISO 没接东西时被上拉
+
+    def read(self, nbytes, write=0x00):
+        buf = bytearray(nbytes)
+        self.readinto(buf, write)
+        return bytes(buf)
+
+    def write(self, buf):
+        self._bus_time(len(buf))
+
+
+def bitstream(pin, encoding, timing, buf):
+    # WS2812：每位 1.25us，加 50us 复位
+    clock.advance(len(buf) * 10 + 50)
+
+
+# 主机上的 Python 执行速度当作 125MHz 时的速度，换频率时按比例缩放模拟时钟
+_REF_FREQ = 125_000_000
+_freq = _REF_FREQ
+freq_changes = 0
+
+
+def freq(hz=None):
+    global _freq, freq_changes
+    if hz is None:
+        return _freq
+    _freq = hz
+    freq_changes += 1
+    clock.set_cpu_scale(_REF_FREQ / hz)
+    return None
+
+
+def idle():
+    clock.service()
+
+
+lightsleeps = 0
+lightsleep_us = 0  # 累计睡眠时间
+
+
+def lightsleep(ms=None):
+    """按 100us 步进推进模拟时钟 (期间输入脚本和 USB 主机照常运行)，
+    到时间或有引脚中断时返回"""
+    global _irq_fired, lightsleeps, lightsleep_us
+    _irq_fired = False
+    lightsleeps += 1
+    start = clock.now_us()
+    end = start + (ms if ms is not None else 1 << 20) * 1000
+    while not _irq_fired:
+        now = clock.now_us()
+        if now >= end:
+            break
+        clock.advance(min(100, end - now))
+        clock.service()
+    lightsleep_us += clock.now_us() - start
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def unique_id():
+    return b"hostsim1"
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+class WDT:
+    """看门狗：按模拟时钟计时，timeout 毫秒内没有 feed() 就调用 reset()"""
+
+    def __init__(self, id=0, timeout=5000):
+        self.timeout_us = timeout * 1000
+        self.feeds = 0
+        self._last = clock.now_us()
+        clock.add_hook(self._check)
+
+    def feed(self):
+        self._last = clock.now_us()
+        self.feeds += 1
+
+    def _check(self, now):
+        if now - self._last > self.timeout_us:
+            reset()
+
+
+# ADC：(通道, 多路开关的输入编号或 None) -> read_u16 的读数
+_analog = {}
+_adc_mux = {}  # 通道 -> 多路开关选择线的 GPIO 列表，低位在前
+adc_noise = 0  # 每次读数叠加的均匀噪声幅度 (LSB)
+_adc_rng = None
+
+
+def set_analog(channel: int, value: int, mux_input=None) -> None:
+    """脚本接口：设置 ADC 通道 (或其上多路开关的某一路) 的读数"""
+    _analog[(channel, mux_input)] = value
+
+
+def attach_mux(channel: int, select_gpios) -> None:
+    """在 ADC 通道前面接一个多路开关，选择线就是这些 GPIO 的输出电平"""
+    _adc_mux[channel] = tuple(select_gpios)
+
+
+class ADC:
+    CORE_TEMP = 4
+    CONVERSION_US = 2  # RP2040 的 ADC 500ksps
+
+    def __init__(self, id):
+        if isinstance(id, Pin):
+            id = id.id
+        self.channel = id - 26 if id >= 26 else id
+        self.reads = 0
+
+    def read_u16(self):
+        global _adc_rng
+        clock.advance(self.CONVERSION_US)
+        clock.service()
+        self.reads += 1
+        mux = None
+        select = _adc_mux.get(self.channel)
+        if select:
+            mux = 0
+            for bit, gpio in enumerate(select):
+                mux |= _resolve(gpio) << bit
+        v = _analog.get((self.channel, mux), 0x8000)
+        if adc_noise:
+            if _adc_rng is None:
+                import random
+
+                _adc_rng = random.Random(0)
+            v += _adc_rng.randint(-adc_noise, adc_noise)
+        return min(0xFFFF, max(0, v))
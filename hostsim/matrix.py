@@ -0,0 +1,55 @@
+# 按键矩阵的模拟
+#
+# 和 firmware 的 matrix.MatrixInput 对应，按键编号也一样 (r * len(cols) + c)。
+# 列线的电平在每次读取时按当时驱动成低电平的行线和按下的键算出来；没有二极管
+# 时电流可以经过按下的键在行列之间绕行，会出现鬼键。
+from . import machine
+
+
+class MatrixKeys:
+    """rows/cols 是行线、列线的 GPIO，diodes=False 模拟没有二极管的矩阵"""
+
+    def __init__(self, rows, cols, diodes=True):
+        self.rows = tuple(rows)
+        self.cols = tuple(cols)
+        self.diodes = diodes
+        self.keys = len(rows) * len(cols)
+        self._pressed = set()  # (行, 列)
+        self._col_index = {gpio: c for c, gpio in enumerate(self.cols)}
+        machine.attach_net(self.cols, self._level)
+
+    def press(self, k):
+        machine.drive(lambda: self._pressed.add(divmod(k, len(self.cols))), self.cols)
+
+    def release(self, k):
+        machine.drive(lambda: self._pressed.discard(divmod(k, len(self.cols))), self.cols)
+
+    def _driven_rows(self):
+        out = set()
+        for r, gpio in enumerate(self.rows):
+            pin = machine._pins.get(gpio)
+            if pin is not None and pin._mode == machine.Pin.OUT and pin._out == 0:
+                out.add(r)
+        return out
+
+    def _level(self, gpio):
+        c = self._col_index[gpio]
+        rows = self._driven_rows()
+        if not rows:
+            return None
+        if self.diodes:
+            return 0 if any((r, c) in self._pressed for r in rows) else None
+        # 没有二极管：从被拉低的行出发，沿按下的键在行列之间走，能到的列都是低电平
+        cols = set()
+        todo = list(rows)
+        while todo:
+            r = todo.pop()
+            for r2, c2 in self._pressed:
+                if r2 != r or c2 in cols:
+                    continue
+                cols.add(c2)
+                for r3, c3 in self._pressed:
+                    if c3 == c2 and r3 not in rows:
+                        rows.add(r3)
+                        todo.append(r3)
+        return 0 if c in cols else None
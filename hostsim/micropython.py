@@ -0,0 +1,25 @@
+# micropython 模块的替身
+#
+# 故意不提供 native/viper 装饰器，所以 scan_kernel 会退回到纯 Python 实现，
+# 和没有代码发射器的固件行为一致。
+
+
+def const(x):
+    return x
+
+
+def opt_level(level=None):
+    return 0
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    print("mem_info: not available on host")
+
+
+def schedule(fn, arg):
+    fn(arg)
+    return True
@@ -0,0 +1,222 @@
+# machine.USBDevice 的替身和一个模拟的 USB 主机
+#
+# active(True) 后主机立即枚举：复位、按配置描述符对每个 (非内建) 接口调用
+# open_itf_cb。IN 端点上提交的传输在下一个轮询时刻完成 (轮询间隔可配置)，
+# 完成时记录主机收到的数据并调用 xfer_cb，和真实硬件上调度器回调的时机类似。
+#
+# suspend()/resume() 模拟主机挂起和恢复总线，挂起状态通过 machine.mem32 的
+# SIE_STATUS 寄存器读到；设备写 SIE_CTRL.RESUME 请求远程唤醒后，主机在
+# wakeup_us 之后恢复总线。
+import struct
+
+from . import clock
+
+_DESC_CONFIG = 0x02
+_DESC_INTERFACE = 0x04
+_DESC_ENDPOINT = 0x05
+_DESC_IAD = 0x0B
+
+STAGE_SETUP = 1
+STAGE_DATA = 2
+STAGE_ACK = 3
+
+XFER_SUCCESS = 0
+
+
+class _BuiltinDriver:
+    def __init__(self, itf_max, ep_max, str_max, desc_cfg):
+        self.itf_max = itf_max
+        self.ep_max = ep_max
+        self.str_max = str_max
+        self.desc_cfg = desc_cfg
+        self.desc_dev = struct.pack(
+            "<BBHBBBBHHHBBBB", 18, 1, 0x0200, 0xEF, 2, 1, 64, 0x2E8A, 0x0005, 0x0100, 1, 2, 3, 1
+        )
+
+
+class Host:
+    """模拟主机。poll_us 是主机轮询 IN 端点的间隔，None 表示按端点的 bInterval"""
+
+    def __init__(self):
+        self.poll_us = None
+        self.device = None
+        self.suspended = False
+        self.wakeup_us = 20_000  # 收到远程唤醒到恢复总线的时间
+        self.remote_wakeups = 0
+        self._resume_at = None
+        self.received = {}  # ep -> [(t_us, bytes), ...]
+        self.latency_us = {}  # ep -> [提交到完成的耗时, ...]
+        self.keep = 10000  # 每个端点最多保留的记录数
+        self._intervals = {}
+        clock.add_hook(self.service)
+
+    def attach(self, device):
+        self.device = device
+
+    def enumerate(self):
+        dev = self.device
+        self.suspended = False
+        if dev._reset_cb:
+            dev._reset_cb()
+        desc = dev._desc_cfg
+        self._intervals = {}
+
+        # 把配置描述符切成每个接口一段 (从接口描述符到下一个接口/IAD)，
+        # core._open_itf_cb 会把同一个对象的 on_open() 推迟到最后一个接口
+        bounds = []  # [(偏移, 是否接口描述符), ...]
+        offs = 0
+        while offs + 1 < len(desc) and desc[offs]:
+            dt = desc[offs + 1]
+            if dt == _DESC_INTERFACE and desc[offs + 3] == 0:
+                bounds.append((offs, True))
+            elif dt == _DESC_IAD:
+                bounds.append((offs, False))
+            elif dt == _DESC_ENDPOINT:
+                self._intervals[desc[offs + 2]] = max(1, desc[offs + 6])
+            offs += desc[offs]
+        bounds.append((len(desc), False))
+
+        builtin = dev.builtin_driver.itf_max
+        for i in range(len(bounds) - 1):
+            start, is_itf = bounds[i]
+            if is_itf and desc[start + 2] >= builtin and dev._open_itf_cb:
+                dev._open_itf_cb(memoryview(desc)[start : bounds[i + 1][0]])
+
+    def suspend(self):
+        self.suspended = True
+
+    def resume(self):
+        self.suspended = False
+        self._resume_at = None
+
+    def remote_wakeup(self):
+        """设备发出远程唤醒信号 (machine.mem32 写 SIE_CTRL.RESUME 时调用)"""
+        if self.suspended and self._resume_at is None:
+            self.remote_wakeups += 1
+            self._resume_at = clock.now_us() + self.wakeup_us
+
+    def _period_us(self, ep):
+        if self.poll_us is not None:
+            return self.poll_us
+        return self._intervals.get(ep, 1) * 1000
+
+    def service(self, now):
+        dev = self.device
+        if self._resume_at is not None and now >= self._resume_at:
+            self.resume()
+        if dev is None or not dev._active or self.suspended:
+            return
+        for ep in list(dev._pending):
+            if not ep & 0x80:
+                continue  # OUT 传输等 send_out() 完成
+            buf, t_submit = dev._pending[ep]
+            period = self._period_us(ep)
+            due = (t_submit // period + 1) * period
+            if now < due:
+                continue
+            del dev._pending[ep]
+            log = self.received.setdefault(ep, [])
+            log.append((due, bytes(buf)))
+            del log[:-self.keep]
+            lat = self.latency_us.setdefault(ep, [])
+            lat.append(due - t_submit)
+            del lat[:-self.keep]
+            if dev._xfer_cb:
+                dev._xfer_cb(ep, XFER_SUCCESS, len(buf))
+
+    def send_out(self, ep, data):
+        """主机向 OUT 端点发送数据，端点上必须有等待中的传输"""
+        dev = self.device
+        buf, _ = dev._pending.pop(ep)
+        n = min(len(buf), len(data))
+        buf[:n] = data[:n]
+        if dev._xfer_cb:
+            dev._xfer_cb(ep, XFER_SUCCESS, n)
+
+    def control(self, bmRequestType, bRequest, wValue=0, wIndex=0, wLength=0, data=None):
+        """执行一次控制传输，返回设备提供的数据；设备 STALL 时抛出 OSError"""
+        dev = self.device
+        request = bytearray(struct.pack("<BBHHH", bmRequestType, bRequest, wValue, wIndex, wLength))
+        result = dev._control_xfer_cb(STAGE_SETUP, memoryview(request))
+        if result is False or result is None:
+            raise OSError("STALL")
+        out = None
+        if result is not True:
+            if bmRequestType & 0x80:
+                out = bytes(result[:wLength])
+            elif data is not None:
+                n = min(len(result), len(data))
+                result[:n] = data[:n]
+        dev._control_xfer_cb(STAGE_DATA, memoryview(request))
+        dev._control_xfer_cb(STAGE_ACK, memoryview(request))
+        return out
+
+    def reports(self, ep=None):
+        if ep is None:
+            out = []
+            for log in self.received.values():
+                out.extend(log)
+            return sorted(out)
+        return self.received.get(ep, [])
+
+
+host = Host()
+
+
+class USBDevice:
+    BUILTIN_NONE = _BuiltinDriver(0, 0, 4, b"")
+    # 默认内建驱动是 CDC (2 个接口，端点 1~2)，这里只模拟配置描述符头
+    BUILTIN_DEFAULT = _BuiltinDriver(2, 3, 4, bytes((9, _DESC_CONFIG, 9, 0, 2, 1, 0, 0x80, 0x32)))
+    BUILTIN_CDC = BUILTIN_DEFAULT
+
+    def __init__(self):
+        self.builtin_driver = self.BUILTIN_DEFAULT
+        self._active = False
+        self._desc_dev = None
+        self._desc_cfg = b""
+        self._strs = None
+        self._open_itf_cb = None
+        self._reset_cb = None
+        self._control_xfer_cb = None
+        self._xfer_cb = None
+        self._pending = {}
+        self.submitted = 0
+        # RP2040 在提交时就把 IN 数据拷进 USB 双口 RAM；设为 False 模拟在传输
+        # 完成时才读缓冲区的控制器 (DMA)，这时提交后改缓冲区会改到在途的报告
+        self.copy_on_submit = True
+        host.attach(self)
+
+    def config(self, desc_dev, desc_cfg, desc_strs=None, open_itf_cb=None,
+               reset_cb=None, control_xfer_cb=None, xfer_cb=None):
+        self._desc_dev = bytes(desc_dev)
+        self._desc_cfg = bytes(desc_cfg)
+        self._strs = desc_strs
+        self._open_itf_cb = open_itf_cb
+        self._reset_cb = reset_cb
+        self._control_xfer_cb = control_xfer_cb
+        self._xfer_cb = xfer_cb
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        value = bool(value)
+        if value and not self._active:
+            self._active = True
+            self._pending = {}
+            host.enumerate()
+        elif not value:
+            self._active = False
+            self._pending = {}
+        return None
+
+    def submit_xfer(self, ep, buffer):
+        if not self._active:
+            return False
+        if ep & 0x80 and self.copy_on_submit:
+            buffer = bytes(buffer)
+        self._pending[ep] = (buffer, clock.now_us())
+        self.submitted += 1
+        return True
+
+    def stall(self, ep, *args):
+        return False
@@ -0,0 +1,67 @@
+# 启动时的导入统计
+#
+# 替换 builtins.__import__，记录每个新加载模块的耗时和堆内存增量。耗时包含
+# 它导入的子模块 (输出里按层级缩进)。内存增量为负说明导入期间发生了 GC。
+#
+#   import import_trace
+#   import_trace.install()
+#   ...  # 其余导入
+#   import_trace.report()
+#
+# 每个模块输出一行 "IMPORT {json}"，最后一行 "IMPORT-TOTAL {json}"。
+import builtins
+import gc
+import json
+import sys
+import time
+
+_records = []  # [[depth, name, us, alloc], ...]
+_orig_import = None
+_depth = 0
+
+
+def _import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    loaded = len(sys.modules)
+    # 先占位，保证父模块排在它导入的子模块前面
+    rec = [_depth, ("." * level) + (name or ",".join(fromlist or ())), 0, 0]
+    idx = len(_records)
+    _records.append(rec)
+    _depth += 1
+    a0 = gc.mem_alloc()
+    t0 = time.ticks_us()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        rec[2] = time.ticks_diff(time.ticks_us(), t0)
+        rec[3] = gc.mem_alloc() - a0
+        _depth -= 1
+        if len(sys.modules) == loaded and idx == len(_records) - 1:
+            # 没有加载新模块 (已经导入过)，不记录
+            _records.pop()
+
+
+def install():
+    global _orig_import
+    if _orig_import is None:
+        _orig_import = builtins.__import__
+        builtins.__import__ = _import
+
+
+def uninstall():
+    global _orig_import
+    if _orig_import is not None:
+        builtins.__import__ = _orig_import
+        _orig_import = None
+
+
+def report():
+    uninstall()
+    total_us = 0
+    total_alloc = 0
+    for depth, name, us, alloc in _records:
+        if depth == 0:
+            total_us += us
+            total_alloc += alloc
+        print("IMPORT", json.dumps({"name": name, "depth": depth, "us": us, "alloc": alloc}))
+    print("IMPORT-TOTAL", json.dumps({"us": total_us, "alloc": total_alloc, "free": gc.mem_free()}))
@@ -0,0 +1,37 @@
+# 输入后端
+#
+# 后端把所有按键读成一个整数，格式和 RP2040 的 GPIO_IN 寄存器一样：第 n 位对应
+# 编号 n 的按键，按下为 0 (上拉输入的电平)。扫描内核、消抖和报告都只看这个
+# 整数，所以换后端时只要把 KEY_PINS/PLAYERS 里的编号换成后端的按键编号。
+#
+# 后端要提供：
+#   name        名字，用于日志和基准测试
+#   setup(ids)  准备这些编号的按键，返回能用引脚中断唤醒 lightsleep 的 Pin 列表
+#               (空闲模式用；没有的返回空列表，空闲时靠 lightsleep 超时轮询)
+#   read()      读一次全部按键，不分配内存
+# 可选：
+#   on_freq_change(hz)  CPU 调频后调用，自己开 SPI/I2C 总线的后端在这里重新
+#                       初始化总线 (分频是按原来的时钟算的)
+#
+# 编号必须小于 30，结果才是小整数 (大整数每次运算都会分配)。
+#
+# 现有的后端：
+#   GpioInput   本文件，按键直接接 GPIO
+#   HallInput   hall.py，磁轴 (Hall 传感器 + ADC)
+#   ShiftRegInput   shiftreg.py，74HC165 移位寄存器串联，硬件 SPI 读
+#   Mcp23017Input   mcp23017.py，MCP23017 I2C 扩展芯片
+#   MatrixInput     matrix.py，行列矩阵 (有或没有二极管)
+from machine import Pin, mem32
+from scan_kernel import SIO_GPIO_IN
+
+
+class GpioInput:
+    """按键直接接在 GPIO 上 (上拉输入，按下接地)，编号就是 GPIO 编号"""
+
+    name = "gpio"
+
+    def setup(self, ids):
+        return [Pin(gpio, Pin.IN, Pin.PULL_UP) for gpio in ids]
+
+    def read(self) -> int:
+        return mem32[SIO_GPIO_IN]
@@ -0,0 +1,168 @@
+# 多灯珠 WS2812 灯效引擎
+#
+# 色相和亮度都用整数查表：调色板在启动时一次性算好放进 bytearray，
+# 每帧渲染只做整数乘法和移位，不分配内存。像素数据双缓冲，渲染完整的
+# 一帧后再交换给 NeoPixel 发送。帧率固定，与按键扫描循环无关。
+from micropython import const
+import neopixel
+import time
+
+HUES = const(256)
+NO_BUTTON = const(0xFF)
+
+
+def build_hue_palette(brightness: int = 255) -> bytearray:
+    """预计算 256 级色相的 RGB 调色板，每项 3 字节 (r, g, b)
+
+    brightness: 0 ~ 255
+    """
+    pal = bytearray(HUES * 3)
+    for h in range(HUES):
+        region = h * 6 // HUES
+        t = h * 6 - region * HUES  # 区间内的位置 0 ~ 255
+        q = 255 - t
+
+        if region == 0:
+            r, g, b = 255, t, 0
+        elif region == 1:
+            r, g, b = q, 255, 0
+        elif region == 2:
+            r, g, b = 0, 255, t
+        elif region == 3:
+            r, g, b = 0, q, 255
+        elif region == 4:
+            r, g, b = t, 0, 255
+        else:  # region == 5
+            r, g, b = 255, 0, q
+
+        pal[h * 3] = r * brightness // 255
+        pal[h * 3 + 1] = g * brightness // 255
+        pal[h * 3 + 2] = b * brightness // 255
+    return pal
+
+
+def build_level_table() -> bytearray:
+    """亮度等级 0 ~ 255 到输出系数的查找表 (近似 gamma 2)"""
+    table = bytearray(256)
+    for i in range(256):
+        table[i] = (i * i + 254) // 255
+    return table
+
+
+class LedStrip:
+    """按键联动的彩虹灯带
+
+    每个像素可以绑定到一个按钮位：按下时点亮到最大亮度，松开后逐帧衰减
+    到底色亮度。底色是随时间流动的彩虹。
+    """
+
+    def __init__(self, pin, count: int, fps: int = 60, brightness: int = 255,
+                 idle_level: int = 48, decay: int = 16, spread: int = 8, speed: int = 1) -> None:
+        self.np = neopixel.NeoPixel(pin, count)
+        self.count = count
+
+        self.palette = build_hue_palette(brightness)
+        self.levels = build_level_table()
+
+        # NeoPixel 的字节顺序 (WS2812 是 GRB)
+        order = self.np.ORDER
+        self._ro = order[0]
+        self._go = order[1]
+        self._bo = order[2]
+        self._bpp = self.np.bpp
+
+        # 双缓冲：_front 正在被 NeoPixel 发送，_back 用于渲染下一帧
+        self._front = self.np.buf
+        self._back = bytearray(len(self._front))
+
+        self.level = bytearray(count)  # 每个像素当前的按键亮度
+        self.bits = bytearray(count)  # 每个像素绑定的按钮位
+        for i in range(count):
+            self.bits[i] = NO_BUTTON
+
+        self.idle_level = idle_level
+        self.decay = decay
+        self.spread = spread
+        self.speed = speed
+        self.phase = 0
+        self.mask = 0
+
+        self.period_us = 1000000 // fps
+        self.next_frame = time.ticks_us()
+
+    def bind(self, pixel: int, bit: int) -> None:
+        """把像素绑定到按钮位 (按钮 n 对应第 n-1 位)"""
+        self.bits[pixel] = bit
+
+    def set_buttons(self, mask: int) -> None:
+        """记录当前按钮状态，在下一帧渲染时生效"""
+        self.mask = mask
+
+    def set_fps(self, fps: int) -> None:
+        self.period_us = 1000000 // fps
+
+    def tick(self, now: int) -> bool:
+        """在扫描循环中调用，到了下一帧的时间才渲染并发送，返回是否刷新"""
+        if time.ticks_diff(now, self.next_frame) < 0:
+            return False
+
+        self.next_frame = time.ticks_add(self.next_frame, self.period_us)
+        if time.ticks_diff(now, self.next_frame) >= 0:
+            # 落后超过一帧时不追帧，从现在重新计时
+            self.next_frame = time.ticks_add(now, self.period_us)
+
+        self.render()
+        self.show()
+        return True
+
+    def render(self) -> None:
+        pal = self.palette
+        levels = self.levels
+        level = self.level
+        bits = self.bits
+        back = self._back
+        mask = self.mask
+        idle = self.idle_level
+        decay = self.decay
+        ro = self._ro
+        go = self._go
+        bo = self._bo
+
+        hue = self.phase
+        o = 0
+        for i in range(self.count):
+            b = bits[i]
+            lv = level[i]
+            if b != NO_BUTTON and (mask >> b) & 1:
+                lv = 255
+            elif lv > decay:
+                lv -= decay
+            else:
+                lv = 0
+            level[i] = lv
+
+            if lv < idle:
+                lv = idle
+            v = levels[lv] + 1
+            h = (hue & 0xFF) * 3
+            back[o + ro] = (pal[h] * v) >> 8
+            back[o + go] = (pal[h + 1] * v) >> 8
+            back[o + bo] = (pal[h + 2] * v) >> 8
+
+            hue += self.spread
+            o += self._bpp
+
+        self.phase = (self.phase + self.speed) & 0xFF
+
+    def show(self) -> None:
+        """交换前后缓冲并发送完整的一帧"""
+        front = self._back
+        self._back = self._front
+        self._front = front
+        self.np.buf = front
+        self.np.write()
+
+    def off(self) -> None:
+        for i in range(len(self._back)):
+            self._back[i] = 0
+        self.show()
@@ -0,0 +1,34 @@
+# 把固件模块冻结进 MicroPython 固件，启动时直接从 flash 执行字节码
+#
+#   cd micropython/ports/rp2
+#   make BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/py-hitbox/manifest.py
+#
+# 冻结后板子的文件系统里只需要 main.py (或者什么都不放，在 REPL 里导入)。
+# 文件系统里的同名 .py 会覆盖冻结的模块，调试时可以只拷改过的文件。
+include("$(PORT_DIR)/boards/manifest.py")
+
+module("hitbox.py")
+module("xbox.py")
+module("ssd1306.py")
+module("oled_ui.py")
+module("board_led.py")
+module("led_engine.py")
+module("gc_sched.py")
+module("scan_kernel.py")
+module("scan_viper.py")
+module("scan_native.py")
+module("dlog.py")
+module("player.py")
+module("usblink.py")
+module("xinput.py")
+module("perfstats.py")
+module("tuning.py")
+module("governor.py")
+module("inputs.py")
+module("hall.py")
+module("shiftreg.py")
+module("mcp23017.py")
+module("matrix.py")
+module("import_trace.py")
+module("bench.py")
+package("usb")
@@ -0,0 +1,151 @@
+# 行列矩阵输入后端
+#
+# 按键接在行线和列线的交叉点上，r 行 c 列只用 r + c 个 GPIO。列线是上拉输入；
+# 行线平时高阻，扫描到哪一行就把它驱动成低电平 (写 SIO 的 OE 置位/清零寄存器，
+# 输出值预先清零)，等 settle_us 让列线稳定，读一次 GPIO_IN 快照得到这一行按下
+# 的所有列。有二极管时方向是列到行 (阴极接行线)。
+#
+# 行线的上下拉要关掉：RP2040 上电时每个引脚都开着下拉，不指定 pull 时
+# MicroPython 不改它。没选中的行要是留着约 50k 的下拉，这一行上按着的键会把
+# 列线拉到中间电平 (1.7~2.0V，不高于 VIH)，选中的行就会读到并不存在的按键，
+# 有没有二极管都一样。
+#
+# 按键编号：第 r 行第 c 列 (rows[r]、cols[c]) 是 r * len(cols) + c。结果要是小
+# 整数，最多用 30 个键：6x6 时整个矩阵照样全部扫描 (防鬼键要用到)，只是编号
+# 30~35 的键不报告。
+#
+# 没有二极管的矩阵 (diodes=False) 会出鬼键：同时按下矩形的三个角时，电流从第
+# 四个角绕过去，它看起来也按下了。两行有两个以上相同的列按下时，没法分辨这些键
+# 哪个是真的，它们保持上一次的状态 (已经按着的继续按着，新按下的不报告)，直到
+# 矩形拆开。有二极管时不做这个检查。
+#
+# 扫描完把所有行都驱动成低电平，任何键按下都会拉低列线，空闲模式用列线的中断
+# 唤醒 lightsleep。下一次扫描先把所有行放开，第一行同样等 settle_us。
+#
+# 整个矩阵扫描一次的耗时用 bench.bench_matrix() 测。
+from micropython import const
+from machine import Pin, mem32
+from array import array
+import time
+
+from scan_kernel import SIO_GPIO_IN
+
+_SIO_GPIO_OUT_CLR = const(0xD0000018)
+_SIO_GPIO_OE_SET = const(0xD0000024)
+_SIO_GPIO_OE_CLR = const(0xD0000028)
+
+
+class MatrixInput:
+    name = "matrix"
+
+    def __init__(
+        self,
+        rows,
+        cols,
+        diodes: bool = True,
+        settle_us: int = 1,
+        keys: int | None = None,
+    ) -> None:
+        # rows/cols: 行线、列线的 GPIO；settle_us: 选中一行后到读列线的等待时间，
+        # 线长、上拉弱的时候要加大 (列线从低电平回升靠上拉)
+        nrows = len(rows)
+        ncols = len(cols)
+        if keys is None:
+            keys = min(30, nrows * ncols)
+        if not 0 < keys <= min(30, nrows * ncols):
+            raise ValueError("keys")
+        self.keys = keys
+        self.diodes = diodes
+        self.settle_us = settle_us
+        self._ncols = ncols
+
+        # pull 传 None 关掉上下拉 (见开头)
+        self._row_pins = [Pin(gpio, Pin.IN, None) for gpio in rows]
+        self._col_pins = [Pin(gpio, Pin.IN, Pin.PULL_UP) for gpio in cols]
+        self._row_bits = array("I", [1 << gpio for gpio in rows])
+        self._rows_all = 0
+        for gpio in rows:
+            self._rows_all |= 1 << gpio
+        mem32[_SIO_GPIO_OUT_CLR] = self._rows_all
+
+        # 列线是连续的 GPIO 时一次移位取出所有列，否则逐列取
+        cols = tuple(cols)
+        if cols == tuple(range(cols[0], cols[0] + ncols)):
+            self._col_shift = cols[0]
+        else:
+            self._col_shift = -1
+        self._col_bits = array("I", [1 << gpio for gpio in cols])
+        self._col_mask = (1 << ncols) - 1
+
+        # 每行按下的列 (第 c 位是第 c 列)：_raw 是这次读到的，_state 是防鬼键之后的
+        self._raw = array("I", [0] * nrows)
+        self._state = array("I", [0] * nrows)
+        # 每行在结果里的掩码，编号超过 keys 的键不报告
+        self._row_keys = array("I", [0] * nrows)
+        for r in range(nrows):
+            n = keys - r * ncols
+            if n > 0:
+                self._row_keys[r] = (1 << min(n, ncols)) - 1
+        self._mask = (1 << keys) - 1
+        mem32[_SIO_GPIO_OE_SET] = self._rows_all
+
+    def setup(self, ids):
+        for k in ids:
+            if not 0 <= k < self.keys:
+                raise ValueError("matrix key %d" % k)
+        return self._col_pins
+
+    def read(self) -> int:
+        row_bits = self._row_bits
+        raw = self._raw
+        shift = self._col_shift
+        col_mask = self._col_mask
+        col_bits = self._col_bits
+        settle = self.settle_us
+        nrows = len(row_bits)
+
+        mem32[_SIO_GPIO_OE_CLR] = self._rows_all
+        for r in range(nrows):
+            bit = row_bits[r]
+            mem32[_SIO_GPIO_OE_SET] = bit
+            if settle:
+                time.sleep_us(settle)
+            low = ~mem32[SIO_GPIO_IN]
+            mem32[_SIO_GPIO_OE_CLR] = bit
+            if shift >= 0:
+                raw[r] = (low >> shift) & col_mask
+            else:
+                v = 0
+                for c in range(len(col_bits)):
+                    if low & col_bits[c]:
+                        v |= 1 << c
+                raw[r] = v
+        mem32[_SIO_GPIO_OE_SET] = self._rows_all
+
+        state = self._state
+        if self.diodes:
+            for r in range(nrows):
+                state[r] = raw[r]
+        else:
+            self._deghost(raw, state, nrows)
+
+        row_keys = self._row_keys
+        ncols = self._ncols
+        pressed = 0
+        for r in range(nrows):
+            pressed |= (state[r] & row_keys[r]) << (r * ncols)
+        # 和 GPIO_IN 一样按下为 0
+        return ~pressed & self._mask
+
+    def _deghost(self, raw, state, nrows: int) -> None:
+        for i in range(nrows):
+            ri = raw[i]
+            amb = 0
+            # 一行里至少两个键才可能是矩形的一条边
+            if ri & (ri - 1):
+                for j in range(nrows):
+                    if j != i:
+                        common = ri & raw[j]
+                        if common & (common - 1):
+                            amb |= common
+            state[i] = (ri & ~amb) | (state[i] & amb)
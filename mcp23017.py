@@ -0,0 +1,100 @@
+# MCP23017 I2C 扩展芯片输入后端
+#
+# 每片 16 个输入 (GPA0~7、GPB0~7)，地址 0x20~0x27，一条 I2C 总线最多 8 片。
+# 按键接输入和地之间，用芯片内部的上拉 (GPPU)。读一次：每片一次
+# readfrom_mem_into()，从 GPIOA 连续读两个字节 (IOCON.SEQOP 默认打开)，只用
+# GPA 的片只读一个字节。
+#
+# 按键编号：第 c 片 (addrs[c]) 的 GPA_b 是 c * 16 + b，GPB_b 是 c * 16 + 8 + b。
+# 结果要是小整数，最多用 30 个键。
+#
+# 不要和 OLED 共用 I2C 总线：刷新屏幕会占住总线几毫秒，这期间读不到按键。
+# 1MHz 下读一片 (两个字节) 约 50us，用 bench.bench_mcp23017() 测。
+#
+# 接了 int_pin (各片的 INTA 线与在一起，开漏) 时，任何输入变化都会拉低这根
+# 线，空闲模式用它的中断唤醒 lightsleep。
+from micropython import const
+from machine import I2C, Pin
+
+_IODIRA = const(0x00)
+_GPINTENA = const(0x04)
+_IOCON = const(0x0A)
+_GPPUA = const(0x0C)
+_GPIOA = const(0x12)
+
+# IOCON：INTA/INTB 合并 (MIRROR)，INT 开漏输出 (ODR)
+_IOCON_MIRROR = const(0x40)
+_IOCON_ODR = const(0x04)
+
+
+class Mcp23017Input:
+    name = "mcp23017"
+
+    def __init__(
+        self,
+        i2c_id: int,
+        scl: int,
+        sda: int,
+        addrs=(0x20,),
+        keys: int | None = None,
+        freq: int = 1_000_000,
+        int_pin: int | None = None,
+    ) -> None:
+        if keys is None:
+            keys = min(30, len(addrs) * 16)
+        if not 0 < keys <= min(30, len(addrs) * 16):
+            raise ValueError("keys")
+        self.keys = keys
+        self.freq = freq
+        self._i2c_id = i2c_id
+        self._scl = scl
+        self._sda = sda
+        self._int_pin = int_pin
+        # 只读用到的片，每片读 1 或 2 个字节
+        nchips = (keys + 15) // 16
+        self._addrs = tuple(addrs[:nchips])
+        self._bufs = []
+        self._masks = []
+        for c in range(nchips):
+            n = min(16, keys - c * 16)
+            self._bufs.append(bytearray(1 if n <= 8 else 2))
+            self._masks.append((1 << n) - 1)
+        self._open()
+        for addr in self._addrs:
+            self._configure(addr)
+
+    def _open(self) -> None:
+        self.i2c = I2C(self._i2c_id, scl=Pin(self._scl), sda=Pin(self._sda), freq=self.freq)
+
+    def _configure(self, addr: int) -> None:
+        self.i2c.writeto_mem(addr, _IODIRA, b"\xff\xff")
+        self.i2c.writeto_mem(addr, _GPPUA, b"\xff\xff")
+        if self._int_pin is not None:
+            self.i2c.writeto_mem(addr, _IOCON, bytes((_IOCON_MIRROR | _IOCON_ODR,)))
+            self.i2c.writeto_mem(addr, _GPINTENA, b"\xff\xff")
+
+    def on_freq_change(self, hz: int) -> None:
+        # I2C 的分频按切换前的时钟算的，重新初始化
+        self._open()
+
+    def setup(self, ids):
+        for k in ids:
+            if not 0 <= k < self.keys:
+                raise ValueError("mcp23017 key %d" % k)
+        if self._int_pin is None:
+            return []
+        return [Pin(self._int_pin, Pin.IN, Pin.PULL_UP)]
+
+    def read(self) -> int:
+        i2c = self.i2c
+        addrs = self._addrs
+        bufs = self._bufs
+        masks = self._masks
+        raw = 0
+        for c in range(len(addrs)):
+            buf = bufs[c]
+            # 读 GPIO 同时清掉芯片的中断
+            i2c.readfrom_mem_into(addrs[c], _GPIOA, buf)
+            v = buf[0] | (buf[1] << 8) if len(buf) > 1 else buf[0]
+            raw |= (v & masks[c]) << (c * 16)
+        return raw
@@ -0,0 +1,106 @@
+# OLED 保留模式界面
+#
+# 每个控件绑定一个值，只有值发生变化时才重绘，并且只把自己所在的矩形
+# 刷新到屏幕上。刷新一个控件要在 I2C 上阻塞几毫秒，所以每次 refresh() 最多
+# 刷新一个脏控件 (轮流)，有按键按着时只刷新实时控件 (按钮图)，其余的等松开后
+# 再刷新。这样在游戏过程中显示实时状态几乎不占用扫描时间。
+
+CHAR_W = 8
+CHAR_H = 8
+
+
+class Widget:
+    """控件基类：记录所在矩形、当前绑定的值和脏标记"""
+
+    def __init__(self, x: int, y: int, w: int, h: int) -> None:
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.value = None
+        self.dirty = True
+        # 实时控件在有按键按着时也刷新
+        self.live = False
+
+    def set(self, value) -> None:
+        """更新绑定的值，只有变化时才标记为脏"""
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def draw(self, oled) -> None:
+        raise NotImplementedError
+
+
+class Label(Widget):
+    """固定宽度的文本控件：前缀 + 最多 chars 个字符的值，超出的部分截掉"""
+
+    def __init__(self, x: int, y: int, prefix: str, chars: int) -> None:
+        super().__init__(x, y, (len(prefix) + chars) * CHAR_W, CHAR_H)
+        self.prefix = prefix
+        self.chars = chars
+
+    def draw(self, oled) -> None:
+        oled.fill_rect(self.x, self.y, self.w, self.h, 0)
+        oled.text(self.prefix, self.x, self.y)
+        if self.value is not None:
+            oled.text(str(self.value)[: self.chars], self.x + len(self.prefix) * CHAR_W, self.y)
+
+
+class ButtonMap(Widget):
+    """按钮状态图：每一位对应一个格子，按下时填充"""
+
+    def __init__(self, x: int, y: int, cols: int = 8, rows: int = 2, cell: int = 8) -> None:
+        super().__init__(x, y, cols * cell, rows * cell)
+        self.cols = cols
+        self.rows = rows
+        self.cell = cell
+        self.value = 0
+        self.live = True
+
+    def draw(self, oled) -> None:
+        oled.fill_rect(self.x, self.y, self.w, self.h, 0)
+        mask = self.value
+        size = self.cell - 2
+        for i in range(self.cols * self.rows):
+            cx = self.x + (i % self.cols) * self.cell + 1
+            cy = self.y + (i // self.cols) * self.cell + 1
+            if mask & (1 << i):
+                oled.fill_rect(cx, cy, size, size, 1)
+            else:
+                oled.rect(cx, cy, size, size, 1)
+
+
+class Screen:
+    """控件容器，refresh() 每次重绘并刷新一个脏控件"""
+
+    def __init__(self, oled) -> None:
+        self.oled = oled
+        self.widgets: list[Widget] = []
+        self._next = 0  # 下一次从这个控件开始找，轮流刷新不会饿死后面的控件
+
+    def add(self, widget: Widget) -> Widget:
+        self.widgets.append(widget)
+        return widget
+
+    def invalidate(self) -> None:
+        """屏幕被其他代码整体改写后调用，下一次 refresh() 全部重绘"""
+        self.oled.fill(0)
+        self.oled.show()
+        for w in self.widgets:
+            w.dirty = True
+
+    def refresh(self, busy: bool = False) -> bool:
+        """刷新一个脏控件，返回是否刷新了；busy 为 True 时只考虑实时控件"""
+        widgets = self.widgets
+        n = len(widgets)
+        for k in range(n):
+            i = (self._next + k) % n
+            w = widgets[i]
+            if w.dirty and (w.live or not busy):
+                w.dirty = False
+                w.draw(self.oled)
+                self.oled.show_rect(w.x, w.y, w.w, w.h)
+                self._next = i + 1
+                return True
+        return False
@@ -0,0 +1,137 @@
+# 运行统计和遥测特性报告
+#
+# 扫描循环每次调用 record_scan() 记下本次耗时 (只做一次数组自增)。每个统计
+# 窗口结束时 publish() 算出扫描率、报告率和 p99 等，打包进特性报告缓冲区。
+# 报告缓冲区有两个，写好一个之后才切换，主机 GET_REPORT 读到的总是完整的一份，
+# 读取时不用再计算或分配。
+#
+# 报告格式 (小端，共 REPORT_SIZE 字节)，tools/telemetry.py 按同样的格式解码：
+#   B  report_id     TELEMETRY_REPORT_ID
+#   B  version       REPORT_VERSION
+#   I  scan_hz       每秒扫描次数
+#   H  report_hz     每秒提交的报告数 (所有玩家)
+#   I  dropped       没来得及发送就被新状态覆盖的报告累计数
+#   H  scan_p99_us   扫描循环耗时的 p99 (按 BUCKET_US 取整)
+#   H  scan_max_us   扫描循环耗时的最大值
+#   H  gc_count      计划 GC 次数
+#   H  gc_max_us     最长 GC 暂停
+#   H  gc_last_us    最近一次 GC 暂停
+#   H  gc_unscheduled 计划外 GC 次数
+#   I  mem_free      空闲堆内存
+#   H  seq           窗口序号，主机用来判断数据是否更新
+#   B  players       玩家数
+#   B  kernel        扫描内核：0 viper，1 native，2 python
+from micropython import const
+from array import array
+import gc
+import struct
+import time
+
+TELEMETRY_REPORT_ID = const(5)
+REPORT_VERSION = const(1)
+REPORT_SIZE = const(32)
+REPORT_FORMAT = "<BBIHIHHHHHHIHBB"
+
+BUCKET_US = const(8)  # 直方图每格的宽度
+_BUCKETS = const(128)  # 超过 BUCKET_US*_BUCKETS 的都计入最后一格
+
+KERNELS = ("viper", "native", "python")
+
+
+def _u16(v):
+    return v if v < 0xFFFF else 0xFFFF
+
+
+class PerfStats:
+    def __init__(self, window_ms: int = 1000) -> None:
+        self.window_ms = window_ms
+
+        self.hist = array("I", [0] * _BUCKETS)
+        self.scans = 0
+        self.max_us = 0
+
+        # 最近一个窗口的结果
+        self.scan_hz = 0
+        self.report_hz = 0
+        self.p99_us = 0
+        self.window_max_us = 0
+        self.seq = 0
+
+        self._start = time.ticks_ms()
+        self._reports = 0
+
+        self._bufs = (bytearray(REPORT_SIZE), bytearray(REPORT_SIZE))
+        self._back = 1
+        # 主机读取的报告 (最近一次 publish() 的结果)
+        self.report = self._bufs[0]
+        self.report[0] = TELEMETRY_REPORT_ID
+        self.report[1] = REPORT_VERSION
+
+    def record_scan(self, dt_us: int) -> None:
+        b = dt_us // BUCKET_US
+        if b >= _BUCKETS:
+            b = _BUCKETS - 1
+        self.hist[b] += 1
+        self.scans += 1
+        if dt_us > self.max_us:
+            self.max_us = dt_us
+
+    def due(self, now_ms: int) -> bool:
+        return time.ticks_diff(now_ms, self._start) >= self.window_ms
+
+    def _percentile_us(self, pct: int) -> int:
+        limit = self.scans * pct // 100
+        acc = 0
+        hist = self.hist
+        for i in range(_BUCKETS):
+            acc += hist[i]
+            if acc > limit:
+                return (i + 1) * BUCKET_US
+        return _BUCKETS * BUCKET_US
+
+    def publish(self, now_ms: int, reports: int, dropped: int, gcs, players: int, kernel: str) -> None:
+        """结束当前窗口：计算统计值并打包进报告缓冲区，然后开始新窗口
+
+        reports / dropped 是累计值，gcs 是 GcScheduler
+        """
+        elapsed = time.ticks_diff(now_ms, self._start)
+        if elapsed <= 0:
+            elapsed = 1
+        self.scan_hz = self.scans * 1000 // elapsed
+        self.report_hz = (reports - self._reports) * 1000 // elapsed
+        self.p99_us = self._percentile_us(99)
+        self.window_max_us = self.max_us
+        self.seq = (self.seq + 1) & 0xFFFF
+
+        buf = self._bufs[self._back]
+        struct.pack_into(
+            REPORT_FORMAT,
+            buf,
+            0,
+            TELEMETRY_REPORT_ID,
+            REPORT_VERSION,
+            self.scan_hz,
+            _u16(self.report_hz),
+            dropped,
+            _u16(self.p99_us),
+            _u16(self.window_max_us),
+            _u16(gcs.count),
+            _u16(gcs.max_us),
+            _u16(gcs.last_us),
+            _u16(gcs.unscheduled),
+            gc.mem_free(),
+            self.seq,
+            players,
+            KERNELS.index(kernel) if kernel in KERNELS else 0xFF,
+        )
+        # 写完再切换，GET_REPORT 回调不会读到写了一半的数据
+        self.report = buf
+        self._back ^= 1
+
+        hist = self.hist
+        for i in range(_BUCKETS):
+            hist[i] = 0
+        self.scans = 0
+        self.max_us = 0
+        self._reports = reports
+        self._start = now_ms
@@ -0,0 +1,112 @@
+# 玩家
+#
+# 一个玩家就是一张按键表、一个扫描内核和一个手柄接口。多个玩家的手柄接口
+# 注册成同一个 USB 复合设备，每个接口有自己的端点，报告互不等待。
+from array import array
+import time
+from scan_kernel import ScanKernel
+from inputs import GpioInput
+
+
+class Player:
+    """一个玩家：自己的按键表、扫描状态和报告提交"""
+
+    def __init__(self, index: int, key_pins, gamepad, impl: str | None = None, source=None) -> None:
+        # key_pins: [(按键编号, 按钮), ...]，编号的含义由输入后端 source 决定 (见
+        # inputs.py)，默认的 GPIO 后端就是 GPIO 编号，上拉输入，按下为低电平
+        self.index = index
+        self.key_pins = key_pins
+        if source is None:
+            source = GpioInput()
+        # 能唤醒空闲模式的引脚
+        self.pins = source.setup([gpio for gpio, _ in key_pins])
+        self.gamepad = gamepad
+
+        # 内核直接把按钮位写进手柄的报告缓冲区
+        self.kernel = ScanKernel(
+            [gpio for gpio, _ in key_pins],
+            [gamepad.key_mask(code) for _, code in key_pins],
+            gamepad.report,
+            gamepad.BUTTONS_OFFSET,
+            gamepad.BUTTONS_SIZE,
+            impl,
+        )
+
+        self.buttons = 0
+        # 报告已经更新但还没能提交 (端点忙或未连接)
+        self.pending = False
+        # 还没提交就被新状态覆盖的报告数
+        self.dropped = 0
+        # 最近一次 poll 提交了报告
+        self.sent = False
+
+        # 消抖：引脚电平变化后立即生效，之后 debounce_us 内忽略这个引脚的变化
+        self.debounce_us = 0
+        self._gpios = tuple(gpio for gpio, _ in key_pins)
+        self._pin_mask = 0
+        for gpio in self._gpios:
+            self._pin_mask |= 1 << gpio
+        self._last_raw = self._pin_mask  # 上拉输入，全部松开时为高
+        self._locked = 0
+        self._until = array("i", [0] * 32)  # 每个 GPIO 的锁定截止时间
+
+    def _debounce(self, raw: int, now_us: int) -> int:
+        gpios = self._gpios
+        until = self._until
+        locked = self._locked
+        if locked:
+            for gpio in gpios:
+                if (locked >> gpio) & 1 and time.ticks_diff(now_us, until[gpio]) >= 0:
+                    locked &= ~(1 << gpio)
+
+        last = self._last_raw
+        raw = (raw & ~locked) | (last & locked)
+        changed = (raw ^ last) & self._pin_mask
+        if changed:
+            deadline = time.ticks_add(now_us, self.debounce_us)
+            for gpio in gpios:
+                if (changed >> gpio) & 1:
+                    until[gpio] = deadline
+            locked |= changed
+
+        self._last_raw = raw
+        self._locked = locked
+        return raw
+
+    def release(self) -> None:
+        """松开所有按钮，报告在下次 poll 时提交
+
+        按钮状态就在报告缓冲区里，清零后下次扫描会重新读出还按着的键，
+        所以主机收到的是实际状态：按着的键不会被松开再按下，其余的都松开。
+        """
+        gp = self.gamepad
+        report = gp.report
+        for i in range(gp.BUTTONS_OFFSET, gp.BUTTONS_OFFSET + gp.BUTTONS_SIZE):
+            report[i] = 0
+        self.buttons = 0
+        self._last_raw = self._pin_mask
+        self._locked = 0
+        self.pending = True
+
+    def poll(self, raw: int, now_us: int = 0, send: bool = True) -> int:
+        """用一次 GPIO 快照扫描并提交报告，返回 1 表示按钮状态变了
+
+        端点忙时不等待，下次调用再提交最新状态，这样一个玩家的报告不会
+        拖住其他玩家的扫描。send 为 False 时 (USB 挂起) 只更新状态，
+        报告留到恢复后提交。
+        """
+        gp = self.gamepad
+        if self.debounce_us:
+            raw = self._debounce(raw, now_us)
+        changed = self.kernel.scan(raw)
+        if changed:
+            self.buttons = gp.buttons()
+            if self.pending:
+                self.dropped += 1
+            self.pending = True
+        self.sent = False
+        if self.pending and send and not gp.busy():
+            if gp.send_report(gp.report, 0):
+                self.pending = False
+                self.sent = True
+        return changed
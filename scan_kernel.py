@@ -0,0 +1,153 @@
+# 扫描-打包内核
+#
+# 一次扫描要做的事：拿到 GPIO 快照，按映射表把按下的引脚换成报告里的按钮位，
+# 和报告里当前的按钮状态比较，有变化就直接写回报告缓冲区。
+#
+# 同一个算法有三个实现，按 viper > native > 纯 Python 的顺序自动选择：
+#   - scan_viper.py   @micropython.viper，用 ptr32/ptr8 直接读写缓冲区
+#   - scan_native.py  @micropython.native
+#   - 本文件的 scan_py()
+# 固件没有对应的代码发射器时，导入会失败，自动退回到下一个实现。
+#
+# 所有实现的参数都一样 (viper 函数最多只能有 4 个参数，所以配置都放在表里)：
+#   raw    GPIO 快照，上拉输入，按下为 0
+#   table  array('I')：[n, offset, nbytes, keep, pin0, mask0, pin1, mask1, ...]
+#          offset/nbytes 是按钮字段在报告里的位置和字节数 (小端)，
+#          keep 是不由内核管理、需要原样保留的位
+#   report 报告缓冲区
+# 返回 1 表示按钮状态变了并且已经写入报告，0 表示没有变化。
+from micropython import const
+from array import array
+
+SIO_GPIO_IN = const(0xD0000004)  # RP2040 SIO GPIO_IN 寄存器
+
+T_N = const(0)
+T_OFFSET = const(1)
+T_NBYTES = const(2)
+T_KEEP = const(3)
+T_PINS = const(4)
+
+
+def scan_py(raw, table, report):
+    n = table[T_N]
+    off = table[T_OFFSET]
+    nbytes = table[T_NBYTES]
+
+    pressed = 0
+    i = T_PINS
+    end = T_PINS + 2 * n
+    while i < end:
+        if (raw >> table[i]) & 1 == 0:
+            pressed |= table[i + 1]
+        i += 2
+
+    old = 0
+    j = 0
+    while j < nbytes:
+        old |= report[off + j] << (8 * j)
+        j += 1
+
+    new = (old & table[T_KEEP]) | pressed
+    if new == old:
+        return 0
+
+    j = 0
+    while j < nbytes:
+        report[off + j] = (new >> (8 * j)) & 0xFF
+        j += 1
+    return 1
+
+
+def _load():
+    kernels = []
+    try:
+        from scan_viper import scan
+
+        kernels.append(("viper", scan))
+    except (ImportError, SyntaxError, AttributeError):
+        pass
+    try:
+        from scan_native import scan
+
+        kernels.append(("native", scan))
+    except (ImportError, SyntaxError, AttributeError):
+        pass
+    kernels.append(("python", scan_py))
+    return kernels
+
+
+def _self_test(fn) -> bool:
+    # 用一个已知输入和纯 Python 实现对比，防止发射器可用但行为不对
+    table = array("I", [2, 1, 2, 0xFFFF0000, 3, 0x0001, 20, 0x8000])
+    raw = 0x3FFFFFFF & ~(1 << 20)
+    expect = bytearray(3)
+    got = bytearray(3)
+    try:
+        ok = fn(raw, table, got) == scan_py(raw, table, expect)
+    except Exception:
+        return False
+    return ok and got == expect
+
+
+_kernels = None
+
+
+def available():
+    """返回可用并通过自检的实现 [(名字, 函数), ...]，最快的在前"""
+    global _kernels
+    if _kernels is None:
+        _kernels = [(name, fn) for name, fn in _load() if fn is scan_py or _self_test(fn)]
+    return _kernels
+
+
+def _build_table(pins, masks, offset: int, nbytes: int):
+    n = len(pins)
+    table = array("I", [0] * (T_PINS + 2 * n))
+    table[T_N] = n
+    table[T_OFFSET] = offset
+    table[T_NBYTES] = nbytes
+
+    owned = 0
+    for i in range(n):
+        table[T_PINS + 2 * i] = pins[i]
+        table[T_PINS + 2 * i + 1] = masks[i]
+        owned |= masks[i]
+    table[T_KEEP] = ((1 << (8 * nbytes)) - 1) & ~owned
+    return table
+
+
+class ScanKernel:
+    """把一组引脚映射到报告里的一个按钮字段"""
+
+    def __init__(self, pins, masks, report, offset: int, nbytes: int, impl: str | None = None) -> None:
+        # pins: GPIO 编号列表；masks: 每个引脚按下时在按钮字段里置位的掩码
+        kernels = available()
+        self.name, self.fn = kernels[0]
+        if impl is not None:
+            for name, fn in kernels:
+                if name == impl:
+                    self.name, self.fn = name, fn
+                    break
+
+        self.report = report
+        self._hi = None
+        if nbytes > 3 and self.name != "viper":
+            # 超过 30 位的值在 MicroPython 里是大整数，每次运算都会分配。
+            # viper 用机器字没有这个问题，其他实现把字段拆成高低两半分别扫描
+            lo_pins, lo_masks, hi_pins, hi_masks = [], [], [], []
+            for pin, mask in zip(pins, masks):
+                if mask & 0xFFFF:
+                    lo_pins.append(pin)
+                    lo_masks.append(mask & 0xFFFF)
+                if mask >> 16:
+                    hi_pins.append(pin)
+                    hi_masks.append(mask >> 16)
+            self.table = _build_table(lo_pins, lo_masks, offset, 2)
+            self._hi = _build_table(hi_pins, hi_masks, offset + 2, nbytes - 2)
+        else:
+            self.table = _build_table(pins, masks, offset, nbytes)
+
+    def scan(self, raw: int) -> int:
+        if self._hi is None:
+            return self.fn(raw, self.table, self.report)
+        return self.fn(raw, self.table, self.report) | self.fn(raw, self._hi, self.report)
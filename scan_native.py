@@ -0,0 +1,33 @@
+# 扫描-打包内核的 native 实现，参数和返回值见 scan_kernel.py
+import micropython
+
+
+@micropython.native
+def scan(raw, table, report):
+    n = table[0]
+    off = table[1]
+    nbytes = table[2]
+
+    pressed = 0
+    i = 4
+    end = 4 + 2 * n
+    while i < end:
+        if (raw >> table[i]) & 1 == 0:
+            pressed |= table[i + 1]
+        i += 2
+
+    old = 0
+    j = 0
+    while j < nbytes:
+        old |= report[off + j] << (8 * j)
+        j += 1
+
+    new = (old & table[3]) | pressed
+    if new == old:
+        return 0
+
+    j = 0
+    while j < nbytes:
+        report[off + j] = (new >> (8 * j)) & 0xFF
+        j += 1
+    return 1
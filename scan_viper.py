@@ -0,0 +1,35 @@
+# 扫描-打包内核的 viper 实现，参数和返回值见 scan_kernel.py
+import micropython
+
+
+@micropython.viper
+def scan(raw: int, table, report) -> int:
+    t = ptr32(table)
+    r = ptr8(report)
+    n = t[0]
+    off = t[1]
+    nbytes = t[2]
+
+    pressed = 0
+    i = 4
+    end = 4 + 2 * n
+    while i < end:
+        if (raw >> t[i]) & 1 == 0:
+            pressed |= t[i + 1]
+        i += 2
+
+    old = 0
+    j = 0
+    while j < nbytes:
+        old |= r[off + j] << (8 * j)
+        j += 1
+
+    new = (old & t[3]) | pressed
+    if new == old:
+        return 0
+
+    j = 0
+    while j < nbytes:
+        r[off + j] = new >> (8 * j)
+        j += 1
+    return 1
@@ -0,0 +1,84 @@
+# 74HC165 移位寄存器输入后端
+#
+# 每片 74HC165 接 8 个键 (上拉，按下接地)，多片串联：前一片的 QH 接 MCU 的
+# MISO，后一片的 QH 接前一片的 SER，最后一片的 SER 接高电平。读一次：
+#   1. SH/LD 拉低再拉高，所有片同时锁存输入 (写 SIO 的清零/置位寄存器)
+#   2. 硬件 SPI 读 chips 个字节，第 0 个字节是离 MCU 最近的那片
+# 每个字节最高位先出来，是该片的 H 输入 (D7)，所以字节的第 b 位就是 D_b。
+#
+# 按键编号：第 c 片的 D_b 是 c * 8 + b。结果要是小整数，最多用 30 个键，
+# 4 片时最后一片的 D6/D7 不用。
+#
+# 74HC165 在 3.3V 下时钟能到 20MHz 以上，SPI 默认 8MHz，读 4 片约 4us 加上
+# 调用开销，用 bench.bench_shiftreg() 测。没有中断输出，空闲时靠 lightsleep
+# 超时轮询。
+from micropython import const
+from machine import SPI, Pin, mem32
+
+_SIO_GPIO_OUT_SET = const(0xD0000014)
+_SIO_GPIO_OUT_CLR = const(0xD0000018)
+
+
+class ShiftRegInput:
+    name = "shiftreg"
+
+    def __init__(
+        self,
+        spi_id: int,
+        sck: int,
+        miso: int,
+        load: int,
+        chips: int = 1,
+        keys: int | None = None,
+        baudrate: int = 8_000_000,
+    ) -> None:
+        # spi_id/sck/miso: 硬件 SPI 和引脚 (74HC165 的 CLK、QH)；load: SH/LD 引脚
+        if keys is None:
+            keys = min(30, chips * 8)
+        if not 0 < keys <= min(30, chips * 8):
+            raise ValueError("keys")
+        self.keys = keys
+        self.chips = chips
+        self.baudrate = baudrate
+        self._spi_id = spi_id
+        self._sck = sck
+        self._miso = miso
+        self._load = Pin(load, Pin.OUT, value=1)
+        self._load_mask = 1 << load
+        # 只移出用到的字节，后面的片不读
+        self._nbytes = (keys + 7) // 8
+        self._buf = bytearray(self._nbytes)
+        self._top_mask = (1 << (keys - (self._nbytes - 1) * 8)) - 1
+        self._open()
+
+    def _open(self) -> None:
+        self._spi = SPI(
+            self._spi_id,
+            baudrate=self.baudrate,
+            polarity=0,
+            phase=0,
+            sck=Pin(self._sck),
+            miso=Pin(self._miso),
+        )
+
+    def on_freq_change(self, hz: int) -> None:
+        # SPI 的分频按切换前的时钟算的，重新初始化
+        self._open()
+
+    def setup(self, ids):
+        for k in ids:
+            if not 0 <= k < self.keys:
+                raise ValueError("shiftreg key %d" % k)
+        return []
+
+    def read(self) -> int:
+        mem32[_SIO_GPIO_OUT_CLR] = self._load_mask
+        mem32[_SIO_GPIO_OUT_SET] = self._load_mask
+        buf = self._buf
+        self._spi.readinto(buf, 0xFF)
+        i = self._nbytes - 1
+        raw = buf[i] & self._top_mask
+        while i:
+            i -= 1
+            raw = (raw << 8) | buf[i]
+        return raw
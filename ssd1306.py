@@ -35,9 +35,10 @@ class SSD1306:
         # buffer).
         self.buffer = bytearray(((height // 8) * width) + 1)
         self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
-        self.framebuf = framebuf.FrameBuffer1(
-            memoryview(self.buffer)[1:], width, height
-        )
+        self._mv = memoryview(self.buffer)
+        self.framebuf = framebuf.FrameBuffer1(self._mv[1:], width, height)
+        # 局部刷新时每页单独发送，需要在数据前补上 Co=0, D/C=1 控制字节
+        self._data_prefix = b"\x40"
 
         self.width = width
         self.height = height
@@ -60,7 +61,7 @@ class SSD1306:
         self.i2c.writeto(self.addr, self.buffer)
 
     def poweron(self):
-        pass
+        self.write_cmd(SET_DISP | 0x01)
 
     def init_display(self):
         for cmd in (
@@ -124,9 +125,37 @@ class SSD1306:
         self.write_cmd(self.pages - 1)
         self.write_framebuf()
 
+    def show_rect(self, x, y, w, h):
+        # 只把覆盖 (x, y, w, h) 的列和页发送到屏幕，用于局部刷新
+        x0 = max(0, x)
+        x1 = min(self.width, x + w) - 1
+        p0 = max(0, y) // 8
+        p1 = (min(self.height, y + h) - 1) // 8
+        if x1 < x0 or p1 < p0:
+            return
+        offset = 32 if self.width == 64 else 0
+        self.write_cmd(SET_COL_ADDR)
+        self.write_cmd(x0 + offset)
+        self.write_cmd(x1 + offset)
+        self.write_cmd(SET_PAGE_ADDR)
+        self.write_cmd(p0)
+        self.write_cmd(p1)
+        # 水平寻址模式下写完一页的窗口后自动换到下一页
+        for page in range(p0, p1 + 1):
+            start = 1 + page * self.width + x0
+            self.i2c.writevto(
+                self.addr, (self._data_prefix, self._mv[start : start + x1 - x0 + 1])
+            )
+
     def fill(self, col):
         self.framebuf.fill(col)
 
+    def fill_rect(self, x, y, w, h, col):
+        self.framebuf.fill_rect(x, y, w, h, col)
+
+    def rect(self, x, y, w, h, col):
+        self.framebuf.rect(x, y, w, h, col)
+
     def pixel(self, x, y, col):
         self.framebuf.pixel(x, y, col)
 
@@ -0,0 +1,76 @@
+# 空闲模式的唤醒延迟：按键落在空闲扫描和进入 lightsleep 之间时，也要在一个
+# bInterval 内提交报告，不能等到 IDLE_SLEEP_MS 超时
+#
+#   python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hostsim
+
+hostsim.install()
+
+import machine  # noqa: E402
+import hitbox  # noqa: E402
+from hostsim import clock, usbhost  # noqa: E402
+
+# 端点的 bInterval (us)：HID 8ms，XInput 1ms
+B_INTERVAL_US = {"hid": 8000, "xinput": 1000}
+
+
+def _wake_to_submit_us(mode):
+    hitbox.GAMEPAD_MODE = mode
+    hitbox.IDLE_AFTER_MS = 20
+    hb = hitbox.Hitbox()
+    hb.start()
+    for _ in range(100_000):
+        if hb.idle:
+            break
+        hb.step()
+    assert hb.idle
+
+    gpio = hb.players[0].key_pins[0][0]
+    pressed_at = []
+    submits = []
+
+    # 空闲扫描没看到输入之后、下一次 lightsleep 之前按下
+    scan = hb._Hitbox__scan
+
+    def scan_then_press(now_us):
+        r = scan(now_us)
+        if not pressed_at:
+            machine.press(gpio)
+            pressed_at.append(clock.now_us())
+        return r
+
+    hb._Hitbox__scan = scan_then_press
+
+    dev = usbhost.host.device
+    submit = dev.submit_xfer
+
+    def record_submit(ep, buf):
+        if ep & 0x80:
+            submits.append(clock.now_us())
+        return submit(ep, buf)
+
+    dev.submit_xfer = record_submit
+    try:
+        for _ in range(1000):
+            if submits:
+                break
+            hb.step()
+    finally:
+        del dev.submit_xfer
+        del hb._Hitbox__scan
+        machine.release(gpio)
+    assert submits
+    return submits[0] - pressed_at[0]
+
+
+def test_idle_wake_hid():
+    assert _wake_to_submit_us("hid") < B_INTERVAL_US["hid"]
+
+
+def test_idle_wake_xinput():
+    assert _wake_to_submit_us("xinput") < B_INTERVAL_US["xinput"]
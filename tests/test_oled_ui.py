@@ -0,0 +1,79 @@
+# oled_ui 的主机端测试：控件画的像素都在 show_rect 刷新的矩形里
+#
+#   python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hostsim
+
+hostsim.install()
+
+import framebuf  # noqa: E402
+from oled_ui import ButtonMap, Label, Screen  # noqa: E402
+
+W = 128
+H = 64
+
+
+class FakeOled(framebuf.FrameBuffer):
+    """只记录 show_rect() 刷新的矩形"""
+
+    def __init__(self):
+        super().__init__(bytearray(W * H // 8), W, H, framebuf.MONO_VLSB)
+        self.shown = []
+
+    def show_rect(self, x, y, w, h):
+        self.shown.append((x, y, w, h))
+
+    def lit(self):
+        return {(x, y) for y in range(H) for x in range(W) if self.pixel(x, y)}
+
+
+def _inside(pixels, rect):
+    x, y, w, h = rect
+    return all(x <= px < x + w and y <= py < y + h for px, py in pixels)
+
+
+def _render(widget, values):
+    oled = FakeOled()
+    screen = Screen(oled)
+    screen.add(widget)
+    for v in values:
+        widget.set(v)
+        assert screen.refresh()
+        assert oled.shown[-1] == (widget.x, widget.y, widget.w, widget.h)
+        assert oled.lit() and _inside(oled.lit(), oled.shown[-1])
+    return oled
+
+
+def test_label_value_inside_rect():
+    label = Label(0, 0, "USB ", 2)
+    oled = _render(label, ["OK", "--", "zz"])
+    # 值画在前缀后面并且在刷新的矩形里，旧值被清掉
+    assert oled.texts[-1] == ("zz", 4 * 8, 0)
+    assert label.w == 6 * 8
+
+
+def test_label_truncates_long_value():
+    label = Label(0, 8, "Max us ", 3)
+    oled = _render(label, [123456])
+    assert oled.texts[-1][0] == "123"
+
+
+def test_button_map_inside_rect():
+    _render(ButtonMap(0, 16), [0, 0x8001, 0xFFFF])
+
+
+def test_hitbox_layout_fits_screen():
+    import hitbox
+
+    hb = hitbox.Hitbox()
+    hb.start()
+    rects = []
+    for w in hb.screen.widgets:
+        assert w.x + w.w <= W and w.y + w.h <= H
+        for x, y, ww, hh in rects:
+            assert w.x >= x + ww or x >= w.x + w.w or w.y >= y + hh or y >= w.y + w.h
+        rects.append((w.x, w.y, w.w, w.h))
@@ -0,0 +1,57 @@
+# 特性报告的 ID 和长度：报告描述符、固件和主机端工具 (tools/) 要一致
+#
+#   python -m pytest tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import hostsim
+
+hostsim.install()
+
+import perfstats  # noqa: E402
+import telemetry  # noqa: E402
+import tune  # noqa: E402
+import tuning  # noqa: E402
+import xbox  # noqa: E402
+
+
+def _feature_reports(desc):
+    """从报告描述符里取出 {Report ID: 特性报告字节数 (含 ID)}"""
+    out = {}
+    report_id = size = count = None
+    i = 0
+    while i < len(desc):
+        prefix = desc[i]
+        n = (0, 1, 2, 4)[prefix & 3]
+        value = int.from_bytes(desc[i + 1 : i + 1 + n], "little")
+        tag = prefix & 0xFC
+        if tag == 0x84:
+            report_id = value
+        elif tag == 0x74:
+            size = value
+        elif tag == 0x94:
+            count = value
+        elif tag == 0xB0:
+            out[report_id] = out.get(report_id, 1) + size * count // 8
+        i += 1 + n
+    return out
+
+
+def test_descriptor_matches_firmware():
+    features = _feature_reports(xbox._GAMEPAD_REPORT_DESC)
+    assert features == {
+        perfstats.TELEMETRY_REPORT_ID: perfstats.REPORT_SIZE,
+        tuning.SETTINGS_REPORT_ID: tuning.REPORT_SIZE,
+    }
+
+
+def test_tools_match_firmware():
+    assert telemetry.TELEMETRY_REPORT_ID == perfstats.TELEMETRY_REPORT_ID
+    assert telemetry.REPORT_SIZE == perfstats.REPORT_SIZE
+    assert tune.SETTINGS_REPORT_ID == tuning.SETTINGS_REPORT_ID
+    assert tune.REPORT_SIZE == tuning.REPORT_SIZE
+    assert tune.REPORT_VERSION == tuning.REPORT_VERSION
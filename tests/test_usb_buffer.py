@@ -0,0 +1,78 @@
+# usb.device.core.Buffer 的主机端测试：环绕、满/空判断
+#
+#   python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hostsim
+
+hostsim.install()
+
+from usb.device.core import Buffer  # noqa: E402
+
+
+def test_empty_and_full():
+    b = Buffer(8)
+    assert b.readable() == 0 and b.writable() == 8
+    assert len(b.pend_read()) == 0
+    assert b.write(bytes(range(8))) == 8
+    assert b.readable() == 8 and b.writable() == 0
+    assert len(b.pend_write()) == 0
+    assert b.write(b"x") == 0
+
+
+def test_wrap_around():
+    b = Buffer(8)
+    out = bytearray(8)
+    # 把读写位置推到 bytearray 末尾附近
+    assert b.write(b"abcdef") == 6
+    assert b.readinto(memoryview(out)[:6]) == 6
+    assert b.readable() == 0 and b.writable() == 8
+
+    # 可写区域跨过末尾：只 pend 第一段，write() 两段都写
+    assert b.write_offset() == 6
+    assert b.pend_write_len() == 2
+    assert len(b.pend_write(1)) == 1
+    assert b.write(b"0123456") == 7
+    assert b.readable() == 7 and b.writable() == 1
+    assert b.read_offset() == 6 and b.pend_read_len() == 2
+    assert bytes(b.pend_read()) == b"01"
+
+    assert b.readinto(out) == 7
+    assert bytes(out[:7]) == b"0123456"
+    assert b.readable() == 0
+
+
+def test_indices_cycle():
+    # 读写位置在 0 ~ 2*len-1 之间循环，多次绕过之后满/空仍然分得清
+    b = Buffer(5)
+    out = bytearray(5)
+    for i in range(40):
+        data = bytes((i + k) & 0xFF for k in range(i % 6))
+        n = b.write(data)
+        assert n == min(len(data), 5)
+        assert b.readable() == n
+        if n == 5:
+            assert b.writable() == 0
+        assert b.readinto(out) == n
+        assert bytes(out[:n]) == data[:n]
+        assert b.readable() == 0 and b.writable() == 5
+
+
+def test_zero_copy_path():
+    b = Buffer(4)
+    b.write(b"abc")
+    b.readinto(bytearray(3))
+    # 直接在 .buf 上读写
+    off = b.write_offset()
+    n = b.pend_write_len()
+    assert (off, n) == (3, 1)
+    b.buf[off] = ord("z")
+    b.finish_write(1)
+    assert b.write(b"yx") == 2
+    assert b.read_offset() == 3 and b.pend_read_len() == 1
+    assert b.buf[b.read_offset()] == ord("z")
+    b.finish_read(1)
+    assert bytes(b.pend_read()) == b"yx"
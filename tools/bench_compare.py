@@ -0,0 +1,48 @@
+# 比较两份基准测试串口日志 (bench.run() 的输出)
+#
+#   python tools/bench_compare.py old.log new.log
+import json
+import sys
+
+
+def load(path):
+    results = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("BENCH "):
+                r = json.loads(line[len("BENCH "):])
+                results[r["name"]] = r
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: bench_compare.py OLD.log NEW.log")
+        return 2
+
+    old, new = load(argv[0]), load(argv[1])
+    print("%-28s %10s %10s %8s %8s %8s" % ("name", "old us", "new us", "change", "old B", "new B"))
+    for name in sorted(set(old) | set(new)):
+        o = old.get(name)
+        n = new.get(name)
+        ou = o["us"] if o else None
+        nu = n["us"] if n else None
+        change = "%+.1f%%" % ((nu - ou) * 100 / ou) if ou and nu is not None else "-"
+        print(
+            "%-28s %10s %10s %8s %8s %8s"
+            % (
+                name,
+                "-" if ou is None else ou,
+                "-" if nu is None else nu,
+                change,
+                o.get("alloc", "-") if o else "-",
+                n.get("alloc", "-") if n else "-",
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
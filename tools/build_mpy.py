@@ -0,0 +1,75 @@
+# 把固件模块预编译成 .mpy，板子上启动时不用再编译源码
+#
+#   python tools/build_mpy.py                  # 输出到 build/
+#   python tools/build_mpy.py --no-bench -O 1
+#   mpremote cp -r build/* :                   # 拷到板子上
+#
+# 需要 mpy-cross (pip install mpy-cross)，版本要和固件的 MicroPython 对应。
+# main.py 保持源码 (运行时只会执行 main.py，不会加载 main.mpy)。
+# 如果要把模块冻结进固件，见仓库根目录的 manifest.py。
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只在开发机上用，不拷到板子上
+EXCLUDE_DIRS = {"hostsim", "tools", "build", "__pycache__"}
+SOURCE_ONLY = {"main.py"}
+# 不是固件模块：manifest.py 是冻结固件时 make 执行的脚本
+EXCLUDE_FILES = {"manifest.py"}
+BENCH = {"bench.py"}
+
+
+def firmware_modules(include_bench=True):
+    """返回需要编译的 (相对路径) 列表，包括 usb 包"""
+    out = []
+    for name in sorted(os.listdir(ROOT)):
+        if name.endswith(".py") and name not in SOURCE_ONLY and name not in EXCLUDE_FILES:
+            if include_bench or name not in BENCH:
+                out.append(name)
+    for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, "usb")):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDE_DIRS)
+        for name in sorted(filenames):
+            if name.endswith(".py"):
+                out.append(os.path.relpath(os.path.join(dirpath, name), ROOT))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="build_mpy.py")
+    parser.add_argument("--out", default=os.path.join(ROOT, "build"))
+    parser.add_argument("--mpy-cross", default="mpy-cross")
+    parser.add_argument("--march", default="armv6m", help="RP2040 是 armv6m，native/viper 代码需要")
+    parser.add_argument("-O", dest="opt", type=int, default=2, help="优化级别，>=1 时去掉 assert")
+    parser.add_argument("--no-bench", action="store_true", help="不包含 bench.py")
+    args = parser.parse_args(argv)
+
+    shutil.rmtree(args.out, ignore_errors=True)
+    os.makedirs(args.out)
+
+    for rel in firmware_modules(not args.no_bench):
+        src = os.path.join(ROOT, rel)
+        dst = os.path.join(args.out, rel[:-3] + ".mpy")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        cmd = [args.mpy_cross, "-march=" + args.march, "-O%d" % args.opt, "-s", rel, "-o", dst, src]
+        try:
+            subprocess.run(cmd, check=True)
+        except FileNotFoundError:
+            print("mpy-cross not found, install it with: pip install mpy-cross")
+            return 1
+        except subprocess.CalledProcessError as e:
+            print("failed: %s" % rel)
+            return e.returncode or 1
+        print("%-28s -> %s" % (rel, os.path.relpath(dst, ROOT)))
+
+    for name in SOURCE_ONLY:
+        shutil.copy(os.path.join(ROOT, name), os.path.join(args.out, name))
+        print("%-28s (source)" % name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# 通过 HID 特性报告读取手柄的运行统计 (格式见 perfstats.py)
+#
+#   pip install hidapi
+#   python tools/telemetry.py                  # 每秒打印一次
+#   python tools/telemetry.py --json --count 10
+#   python tools/telemetry.py --vid 0x2e8a --pid 0x0005
+#
+# 不需要串口，手柄正常工作时也可以读。XInput 模式没有 HID 接口，不支持。
+import argparse
+import json
+import struct
+import sys
+import time
+
+# 和固件的 perfstats.TELEMETRY_REPORT_ID 一致 (tests/test_report_ids.py 检查)
+TELEMETRY_REPORT_ID = 5
+REPORT_SIZE = 32
+REPORT_FORMAT = "<BBIHIHHHHHHIHBB"
+FIELDS = (
+    "report_id",
+    "version",
+    "scan_hz",
+    "report_hz",
+    "dropped",
+    "scan_p99_us",
+    "scan_max_us",
+    "gc_count",
+    "gc_max_us",
+    "gc_last_us",
+    "gc_unscheduled",
+    "mem_free",
+    "seq",
+    "players",
+    "kernel",
+)
+KERNELS = ("viper", "native", "python")
+
+
+def decode(data):
+    """把特性报告 (含 Report ID) 解码成 dict"""
+    data = bytes(data)
+    if len(data) < REPORT_SIZE or data[0] != TELEMETRY_REPORT_ID:
+        raise ValueError("not a telemetry report: %r" % data[:4])
+    values = dict(zip(FIELDS, struct.unpack_from(REPORT_FORMAT, data)))
+    k = values["kernel"]
+    values["kernel"] = KERNELS[k] if k < len(KERNELS) else k
+    return values
+
+
+def open_device(vid, pid):
+    try:
+        import hid
+    except ImportError:
+        raise SystemExit("hidapi not installed: pip install hidapi")
+
+    # 多人模式下每个玩家是一个 HID 接口，都能读到同一份统计，取第一个
+    for info in hid.enumerate(vid, pid):
+        dev = hid.device()
+        try:
+            dev.open_path(info["path"])
+        except OSError:
+            continue
+        try:
+            dev.get_feature_report(TELEMETRY_REPORT_ID, REPORT_SIZE)
+        except OSError:
+            dev.close()
+            continue
+        return dev
+    raise SystemExit("no device %04x:%04x with telemetry report" % (vid, pid))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="telemetry.py")
+    parser.add_argument("--vid", type=lambda v: int(v, 0), default=0x2E8A)
+    parser.add_argument("--pid", type=lambda v: int(v, 0), default=0x0005)
+    parser.add_argument("--interval", type=float, default=1.0, help="读取间隔 (秒)")
+    parser.add_argument("--count", type=int, default=0, help="读取次数，0 表示一直读")
+    parser.add_argument("--json", action="store_true", help="每次输出一行 JSON")
+    args = parser.parse_args(argv)
+
+    dev = open_device(args.vid, args.pid)
+    n = 0
+    last_seq = None
+    try:
+        while True:
+            values = decode(dev.get_feature_report(TELEMETRY_REPORT_ID, REPORT_SIZE))
+            if values["seq"] != last_seq:
+                last_seq = values["seq"]
+                if args.json:
+                    print(json.dumps(values))
+                else:
+                    print(
+                        "scan %(scan_hz)7d/s  p99 %(scan_p99_us)4d us  max %(scan_max_us)5d us  "
+                        "rpt %(report_hz)4d/s  dropped %(dropped)d  "
+                        "gc %(gc_count)d (max %(gc_max_us)d us, unsched %(gc_unscheduled)d)  "
+                        "free %(mem_free)d" % values
+                    )
+                sys.stdout.flush()
+            n += 1
+            if args.count and n >= args.count:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        dev.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
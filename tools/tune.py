@@ -0,0 +1,129 @@
+# 通过 HID 特性报告读写手柄的运行时设置 (格式见 tuning.py)
+#
+#   pip install hidapi
+#   python tools/tune.py get
+#   python tools/tune.py set display_fps=15 debounce_us=2000
+#   python tools/tune.py sweep display_fps 0,10,30,60 --settle 3
+#
+# sweep 依次设置每个值，等设置生效并经过 settle 秒后读一次遥测
+# (tools/telemetry.py)，打印对比表，最后恢复原来的设置。
+import argparse
+import json
+import struct
+import sys
+import time
+
+from telemetry import TELEMETRY_REPORT_ID, REPORT_SIZE as TELEMETRY_SIZE, decode, open_device
+
+# 和固件的 tuning.SETTINGS_REPORT_ID 一致 (tests/test_report_ids.py 检查)
+SETTINGS_REPORT_ID = 6
+REPORT_VERSION = 1
+REPORT_SIZE = 16
+REPORT_FORMAT = "<BBHHHHHHH"
+FIELDS = ("scan_period_us", "debounce_us", "display_fps", "led_fps", "strip_fps")
+
+
+def read_settings(dev):
+    data = bytes(dev.get_feature_report(SETTINGS_REPORT_ID, REPORT_SIZE))
+    values = struct.unpack_from(REPORT_FORMAT, data)
+    if values[0] != SETTINGS_REPORT_ID or values[1] != REPORT_VERSION:
+        raise SystemExit("unexpected settings report: %s" % data.hex())
+    return dict(zip(FIELDS, values[2:7]))
+
+
+def write_settings(dev, settings):
+    data = struct.pack(
+        REPORT_FORMAT,
+        SETTINGS_REPORT_ID,
+        REPORT_VERSION,
+        *[settings[name] for name in FIELDS],
+        0,
+        0,
+    )
+    dev.send_feature_report(data)
+
+
+def wait_applied(dev, settings, timeout=1.0):
+    # 设置在下一次扫描时生效，读回一致就说明已经生效
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if read_settings(dev) == settings:
+            return
+        time.sleep(0.01)
+    raise SystemExit("settings not applied: %r" % settings)
+
+
+def read_telemetry(dev, settle):
+    # 等两个完整的统计窗口更新，保证读到的窗口完全在新设置下
+    seq = decode(dev.get_feature_report(TELEMETRY_REPORT_ID, TELEMETRY_SIZE))["seq"]
+    deadline = time.monotonic() + settle
+    values = None
+    while True:
+        values = decode(dev.get_feature_report(TELEMETRY_REPORT_ID, TELEMETRY_SIZE))
+        if (values["seq"] - seq) & 0xFFFF >= 2 and time.monotonic() >= deadline:
+            return values
+        time.sleep(0.05)
+
+
+def parse_assignments(items):
+    out = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in FIELDS or not value:
+            raise SystemExit("expected NAME=VALUE with NAME one of %s" % ", ".join(FIELDS))
+        out[name] = int(value, 0)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tune.py")
+    parser.add_argument("--vid", type=lambda v: int(v, 0), default=0x2E8A)
+    parser.add_argument("--pid", type=lambda v: int(v, 0), default=0x0005)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("get")
+    p_set = sub.add_parser("set")
+    p_set.add_argument("assignments", nargs="+", metavar="NAME=VALUE")
+    p_sweep = sub.add_parser("sweep")
+    p_sweep.add_argument("name", choices=FIELDS)
+    p_sweep.add_argument("values", help="逗号分隔的取值")
+    p_sweep.add_argument("--settle", type=float, default=2.0, help="每个取值至少运行的秒数")
+    p_sweep.add_argument("--json", action="store_true", help="每个取值输出一行 JSON")
+    args = parser.parse_args(argv)
+
+    dev = open_device(args.vid, args.pid)
+    try:
+        current = read_settings(dev)
+        if args.cmd == "get":
+            print(json.dumps(current))
+        elif args.cmd == "set":
+            current.update(parse_assignments(args.assignments))
+            write_settings(dev, current)
+            wait_applied(dev, current)
+            print(json.dumps(current))
+        else:
+            original = dict(current)
+            if not args.json:
+                print("%-14s %9s %8s %8s %8s %8s" % (args.name, "scan/s", "p99 us", "max us", "rpt/s", "dropped"))
+            try:
+                for value in [int(v, 0) for v in args.values.split(",")]:
+                    settings = dict(original, **{args.name: value})
+                    write_settings(dev, settings)
+                    wait_applied(dev, settings)
+                    t = read_telemetry(dev, args.settle)
+                    if args.json:
+                        print(json.dumps({"setting": args.name, "value": value, **t}))
+                    else:
+                        print(
+                            "%-14d %9d %8d %8d %8d %8d"
+                            % (value, t["scan_hz"], t["scan_p99_us"], t["scan_max_us"], t["report_hz"], t["dropped"])
+                        )
+                    sys.stdout.flush()
+            finally:
+                write_settings(dev, original)
+    finally:
+        dev.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# 运行时调参
+#
+# 主机用 HID 特性报告 SET_REPORT 写入新设置，GET_REPORT 读回当前设置
+# (tools/tune.py)。USB 回调里只把数据拷进待生效缓冲区，扫描循环在两次扫描
+# 之间调用 apply() 一次性生效，不会出现一次扫描用了一半新设置的情况。
+#
+# 报告格式 (小端，共 REPORT_SIZE 字节)：
+#   B  report_id       SETTINGS_REPORT_ID
+#   B  version         REPORT_VERSION
+#   H  scan_period_us  扫描循环的最小周期，0 表示不限
+#   H  debounce_us     按键消抖窗口，0 表示不消抖
+#   H  display_fps     OLED 最高刷新率，0 表示每次循环都刷新
+#   H  led_fps         板载灯最高刷新率，0 表示不限
+#   H  strip_fps       灯带帧率
+#   H  reserved
+#   H  reserved
+from micropython import const
+import struct
+
+SETTINGS_REPORT_ID = const(6)
+REPORT_VERSION = const(1)
+REPORT_SIZE = const(16)
+REPORT_FORMAT = "<BBHHHHHHH"
+
+FIELDS = ("scan_period_us", "debounce_us", "display_fps", "led_fps", "strip_fps")
+
+
+class Tuning:
+    def __init__(self, scan_period_us=0, debounce_us=0, display_fps=0, led_fps=60, strip_fps=60) -> None:
+        self.scan_period_us = scan_period_us
+        self.debounce_us = debounce_us
+        self.display_fps = display_fps
+        self.led_fps = led_fps
+        self.strip_fps = strip_fps
+
+        # 当前设置，GET_REPORT 直接返回这个缓冲区
+        self.report = bytearray(REPORT_SIZE)
+        self._pack()
+
+        self._pending = bytearray(REPORT_SIZE)
+        self._dirty = False
+        self.changes = 0  # 生效的次数
+
+    def _pack(self):
+        struct.pack_into(
+            REPORT_FORMAT,
+            self.report,
+            0,
+            SETTINGS_REPORT_ID,
+            REPORT_VERSION,
+            self.scan_period_us,
+            self.debounce_us,
+            self.display_fps,
+            self.led_fps,
+            self.strip_fps,
+            0,
+            0,
+        )
+
+    def receive(self, data) -> bool:
+        """在 USB 回调里调用：检查并暂存主机写入的设置，返回是否接受"""
+        if len(data) < REPORT_SIZE or data[0] != SETTINGS_REPORT_ID or data[1] != REPORT_VERSION:
+            return False
+        pending = self._pending
+        for i in range(REPORT_SIZE):
+            pending[i] = data[i]
+        self._dirty = True
+        return True
+
+    def apply(self) -> bool:
+        """在两次扫描之间调用：有新设置时生效并返回 True"""
+        if not self._dirty:
+            return False
+        self._dirty = False
+        (
+            _,
+            _,
+            self.scan_period_us,
+            self.debounce_us,
+            self.display_fps,
+            self.led_fps,
+            self.strip_fps,
+            _,
+            _,
+        ) = struct.unpack_from(REPORT_FORMAT, self._pending)
+        self._pack()
+        self.changes += 1
+        return True
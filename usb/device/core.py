@@ -5,8 +5,10 @@
 #
 # MIT license; Copyright (c) 2022-2024 Angus Gratton
 from micropython import const
+from array import array
 import machine
 import struct
+import time
 
 try:
     from _thread import get_ident
@@ -18,6 +20,9 @@ except ImportError:
 
 _EP_IN_FLAG = const(1 << 7)
 
+# Number of endpoint slots: 16 endpoint numbers x 2 directions
+_EP_SLOTS = const(32)
+
 # USB descriptor types
 _STD_DESC_DEV_TYPE = const(0x1)
 _STD_DESC_CONFIG_TYPE = const(0x2)
@@ -62,6 +67,53 @@ _MP_EINVAL = const(22)
 
 _dev = None  # Singleton _Device instance
 
+# Per-endpoint "transfer pending" flags, indexed by ep_slot(). Non-zero while a
+# transfer is queued on the endpoint. Interfaces can read this directly in a
+# busy loop instead of calling xfer_pending(). Only ever modified in place.
+ep_pending = bytearray(_EP_SLOTS)
+
+
+# Per-endpoint transfer statistics, EP_STATS counters for each ep_slot() in
+# one flat array so updating them never allocates. Read with ep_stats().
+EP_SUBMITTED = const(0)  # Transfers queued
+EP_COMPLETED = const(1)  # Transfers completed, with any result
+EP_FAILED = const(2)  # Submits rejected by the DCD, plus transfers completed with an error
+EP_SHORT = const(3)  # Transfers completed with fewer bytes than submitted
+EP_SPINS = const(4)  # Busy-wait iterations of send_report() waiting for the endpoint
+EP_FLIGHT_MIN_US = const(5)  # Shortest time from submit to completion
+EP_FLIGHT_MAX_US = const(6)  # Longest time from submit to completion
+EP_STATS = const(7)  # Number of counters per endpoint
+
+_XFER_RESULT_SUCCESS = const(0)
+
+ep_stats_data = array("I", bytes(4 * _EP_SLOTS * EP_STATS))
+_ep_len = array("H", bytes(2 * _EP_SLOTS))  # Length of the pending transfer
+_ep_t0 = array("I", bytes(4 * _EP_SLOTS))  # time.ticks_us() when it was submitted
+
+
+def ep_stats(ep_addr, out=None):
+    # Copy the statistics of an endpoint into 'out' (indexed by the EP_
+    # constants, allocated if None) and return it.
+    #
+    # Doesn't allocate if 'out' is given, so it can be polled under load.
+    if out is None:
+        out = array("I", bytes(4 * EP_STATS))
+    base = ep_slot(ep_addr) * EP_STATS
+    for i in range(EP_STATS):
+        out[i] = ep_stats_data[base + i]
+    return out
+
+
+def reset_ep_stats():
+    for i in range(_EP_SLOTS * EP_STATS):
+        ep_stats_data[i] = 0
+
+
+def ep_slot(ep_addr):
+    # Index of an endpoint address in the per-endpoint tables: the endpoint
+    # number in bits 0-3 and the IN direction flag in bit 4.
+    return (ep_addr & 0x0F) | ((ep_addr >> 3) & 0x10)
+
 
 def get():
     # Getter to access the singleton instance of the
@@ -82,10 +134,16 @@ class _Device:
     # function usb.device.get(), never directly.
     def __init__(self):
         self._itfs = {}  # Mapping from interface number to interface object, set by init()
-        self._eps = {}  # Mapping from endpoint address to interface object, set by _open_cb()
-        self._ep_cbs = {}  # Mapping from endpoint address to Optional[xfer callback]
+        # Per-endpoint tables indexed by ep_slot(ep_addr), see also ep_pending
+        self._ep_itfs = [None] * _EP_SLOTS  # Interface object owning the endpoint, set by _open_cb()
+        self._ep_cbs = [None] * _EP_SLOTS  # Optional[xfer callback] of the pending transfer
         self._cb_thread = None  # Thread currently running endpoint callback
         self._cb_ep = None  # Endpoint number currently running callback
+        self._cfg = None  # (key, desc_dev, desc_cfg, strs, itfs) from the last config() call
+        # Event counters, so the application can notice a host reset or
+        # re-configuration by comparing against the last value it saw.
+        self.resets = 0  # Bus resets by the host
+        self.opens = 0  # Interfaces opened (Set Configuration) by the host
         self._usbd = machine.USBDevice()  # low-level API
 
     def init(self, *itfs, **kwargs):
@@ -126,6 +184,31 @@ class _Device:
             builtin_driver = _usbd.BUILTIN_DEFAULT if builtin_driver else _usbd.BUILTIN_NONE
         _usbd.builtin_driver = builtin_driver
 
+        # Reuse the descriptors built last time if nothing changed, so
+        # re-initialising the same device doesn't rebuild them.
+        key = (
+            itfs,
+            builtin_driver,
+            manufacturer_str,
+            product_str,
+            serial_str,
+            configuration_str,
+            id_vendor,
+            id_product,
+            bcd_device,
+            device_class,
+            device_subclass,
+            device_protocol,
+            config_str,
+            max_power_ma,
+            remote_wakeup,
+        )
+        cfg = self._cfg
+        if cfg and cfg[0] == key:
+            self._itfs = cfg[4]
+            self._usbd_config(cfg[1], cfg[2], cfg[3])
+            return
+
         # Putting None for any strings that should fall back to the "built-in" value
         # Indexes in this list depends on _USB_STR_MANUF, _USB_STR_PRODUCT, _USB_STR_SERIAL
         strs = [None, manufacturer_str, product_str, serial_str]
@@ -171,6 +254,7 @@ class _Device:
         initial_cfg = builtin_driver.desc_cfg or (b"\x00" * _STD_DESC_CONFIG_LEN)
 
         self._itfs = {}
+        self._clear_eps()
 
         # Determine the total length of the configuration descriptor, by making dummy
         # calls to build the config descriptor
@@ -233,9 +317,13 @@ class _Device:
             max_power_ma,
         )
 
-        _usbd.config(
+        self._cfg = (key, desc_dev, desc.b, strs, self._itfs)
+        self._usbd_config(desc_dev, desc.b, strs)
+
+    def _usbd_config(self, desc_dev, desc_cfg, strs):
+        self._usbd.config(
             desc_dev,
-            desc.b,
+            desc_cfg,
             strs,
             self._open_itf_cb,
             self._reset_cb,
@@ -243,6 +331,14 @@ class _Device:
             self._xfer_cb,
         )
 
+    def invalidate_config(self):
+        # Drop the cached descriptors, so the next config() call rebuilds them.
+        #
+        # Only needed if an interface object passed to config() changes
+        # something that affects its descriptors (the cache is keyed on the
+        # interface objects and config() arguments, not their contents.)
+        self._cfg = None
+
     def active(self, *optional_value):
         # Thin wrapper around the USBDevice active() function.
         #
@@ -264,7 +360,7 @@ class _Device:
         itf = self._itfs[itf_num]
 
         # Scan the full descriptor:
-        # - Build _eps and _ep_addr from the endpoint descriptors
+        # - Fill _ep_itfs from the endpoint descriptors
         # - Find the highest numbered interface provided to the callback
         #   (which will be the first interface, unless we're scanning
         #   multiple interfaces inside an IAD.)
@@ -275,12 +371,16 @@ class _Device:
             dt = desc[offs + _DESC_OFFSET_TYPE]
             if dt == _STD_DESC_ENDPOINT_TYPE:
                 ep_addr = desc[offs + _DESC_OFFSET_ENDPOINT_NUM]
-                self._eps[ep_addr] = itf
-                self._ep_cbs[ep_addr] = None
+                i = ep_slot(ep_addr)
+                self._ep_itfs[i] = itf
+                self._ep_cbs[i] = None
+                ep_pending[i] = 0
             elif dt == _STD_DESC_INTERFACE_TYPE:
                 max_itf = max(max_itf, desc[offs + _DESC_OFFSET_INTERFACE_NUM])
             offs += dl
 
+        self.opens += 1
+
         # If 'desc' is not the inside of an Interface Association Descriptor but
         # 'itf' object still represents multiple USB interfaces (i.e. MIDI),
         # defer calling 'itf.on_open()' until this callback fires for the
@@ -293,52 +393,92 @@ class _Device:
 
     def _reset_cb(self):
         # TinyUSB lower layer callback when the USB device is reset by the host
+        self.resets += 1
 
         # Allow interfaces to respond to the reset
         for itf in self._itfs.values():
             itf.on_reset()
 
-        # Rebuilt when host re-enumerates
-        self._eps = {}
-        self._ep_cbs = {}
+        # Outstanding transfers are cancelled. The endpoint to interface map is
+        # kept, as the configuration (and so the endpoints) doesn't change and
+        # the host will re-open the same interfaces.
+        self._clear_xfers()
+
+    def _clear_xfers(self):
+        # Cleared in place so references to ep_pending held by interfaces stay valid
+        cbs = self._ep_cbs
+        for i in range(_EP_SLOTS):
+            cbs[i] = None
+            ep_pending[i] = 0
+
+    def _clear_eps(self):
+        itfs = self._ep_itfs
+        for i in range(_EP_SLOTS):
+            itfs[i] = None
+        self._clear_xfers()
 
     def _submit_xfer(self, ep_addr, data, done_cb=None):
         # Submit a USB transfer (of any type except control) to TinyUSB lower layer.
         #
         # Generally, drivers should call Interface.submit_xfer() instead. See
         # that function for documentation about the possible parameter values.
-        if ep_addr not in self._eps:
+        i = ep_slot(ep_addr)
+        if self._ep_itfs[i] is None:
             raise ValueError("ep_addr")
         if self._xfer_pending(ep_addr):
             raise RuntimeError("xfer_pending")
 
         # USBDevice callback may be called immediately, before Python execution
         # continues, so set it first.
-        #
-        # To allow xfer_pending checks to work, store True instead of None.
-        self._ep_cbs[ep_addr] = done_cb or True
-        return self._usbd.submit_xfer(ep_addr, data)
+        self._ep_cbs[i] = done_cb
+        ep_pending[i] = 1
+        _ep_len[i] = len(data)
+        _ep_t0[i] = time.ticks_us()
+        s = i * EP_STATS
+        if self._usbd.submit_xfer(ep_addr, data):
+            ep_stats_data[s + EP_SUBMITTED] += 1
+            return True
+        # Not queued, so no callback will arrive to clear the pending state
+        self._ep_cbs[i] = None
+        ep_pending[i] = 0
+        ep_stats_data[s + EP_FAILED] += 1
+        return False
 
     def _xfer_pending(self, ep_addr):
         # Returns True if a transfer is pending on this endpoint.
         #
         # Generally, drivers should call Interface.xfer_pending() instead. See that
         # function for more documentation.
-        return self._ep_cbs[ep_addr] or (self._cb_ep == ep_addr and self._cb_thread != get_ident())
+        return ep_pending[ep_slot(ep_addr)] or (
+            self._cb_ep == ep_addr and self._cb_thread != get_ident()
+        )
 
     def _xfer_cb(self, ep_addr, result, xferred_bytes):
         # Callback from TinyUSB lower layer when a transfer completes.
-        cb = self._ep_cbs.get(ep_addr, None)
+        i = ep_slot(ep_addr)
+        cb = self._ep_cbs[i]
         self._cb_thread = get_ident()
         self._cb_ep = ep_addr  # Track while callback is running
-        self._ep_cbs[ep_addr] = None
-
-        # In most cases, 'cb' is a callback function for the transfer. Can also be:
-        # - True (for a transfer with no callback)
-        # - None (TinyUSB callback arrived for invalid endpoint, or no transfer.
-        #   Generally unlikely, but may happen in transient states.)
+        self._ep_cbs[i] = None
+        ep_pending[i] = 0
+
+        s = i * EP_STATS
+        ep_stats_data[s + EP_COMPLETED] += 1
+        if result != _XFER_RESULT_SUCCESS:
+            ep_stats_data[s + EP_FAILED] += 1
+        elif xferred_bytes < _ep_len[i]:
+            ep_stats_data[s + EP_SHORT] += 1
+        dt = time.ticks_diff(time.ticks_us(), _ep_t0[i])
+        if dt < ep_stats_data[s + EP_FLIGHT_MIN_US] or not ep_stats_data[s + EP_FLIGHT_MIN_US]:
+            ep_stats_data[s + EP_FLIGHT_MIN_US] = dt
+        if dt > ep_stats_data[s + EP_FLIGHT_MAX_US]:
+            ep_stats_data[s + EP_FLIGHT_MAX_US] = dt
+
+        # 'cb' is None for a transfer with no callback, or if TinyUSB callback
+        # arrived for an invalid endpoint or no transfer (generally unlikely,
+        # but may happen in transient states.)
         try:
-            if callable(cb):
+            if cb is not None:
                 cb(ep_addr, result, xferred_bytes)
         finally:
             self._cb_ep = None
@@ -368,8 +508,7 @@ class _Device:
             if itf:
                 result = itf.on_interface_control_xfer(stage, request)
         elif recipient == _REQ_RECIPIENT_ENDPOINT:
-            ep_num = wIndex & 0xFFFF
-            itf = self._eps.get(ep_num, None)
+            itf = self._ep_itfs[ep_slot(wIndex & 0xFF)]
             if itf:
                 result = itf.on_endpoint_control_xfer(stage, request)
 
@@ -563,6 +702,27 @@ class Interface:
         # completion callback.
         return _dev and _dev._xfer_pending(ep_addr)
 
+    def wait_xfer(self, ep_addr, timeout_ms=100):
+        # Wait until no transfer is pending on ep_addr, calling machine.idle()
+        # in between and counting each spin in the endpoint's EP_SPINS stat.
+        #
+        # Returns False if timeout_ms passed first. Also returns True if the
+        # interface is closed while waiting, so callers should check is_open()
+        # before submitting.
+        #
+        # Reads ep_pending directly rather than calling xfer_pending(), as this
+        # is the hot path of every interrupt IN report.
+        slot = ep_slot(ep_addr)
+        if not (self._open and ep_pending[slot]):
+            return True
+        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+        while self._open and ep_pending[slot]:
+            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                return False
+            ep_stats_data[slot * EP_STATS + EP_SPINS] += 1
+            machine.idle()
+        return True
+
     def submit_xfer(self, ep_addr, data, done_cb=None):
         # Submit a USB transfer (of any type except control)
         #
@@ -613,7 +773,7 @@ class Interface:
         # Generally endpoint STALL is handled automatically, but there are some
         # device classes that need to explicitly stall or un-stall an endpoint
         # under certain conditions.
-        if not self._open or ep_addr not in self._eps:
+        if not self._open or _dev._ep_itfs[ep_slot(ep_addr)] is not self:
             raise RuntimeError
         _dev._usbd.stall(ep_addr, *args)
 
@@ -756,12 +916,11 @@ def split_bmRequestType(bmRequestType):
 
 
 class Buffer:
-    # An interrupt-safe producer/consumer buffer that wraps a bytearray object.
+    # An interrupt-safe producer/consumer ring buffer that wraps a bytearray object.
     #
-    # Kind of like a ring buffer, but supports the idea of returning a
-    # memoryview for either read or write of multiple bytes (suitable for
-    # passing to a buffer function without needing to allocate another buffer to
-    # read into.)
+    # Supports the idea of returning a memoryview for either read or write of
+    # multiple bytes (suitable for passing to a buffer function without needing
+    # to allocate another buffer to read into.)
     #
     # Consumer can call pend_read() to get a memoryview to read from, and then
     # finish_read(n) when done to indicate it read 'n' bytes from the
@@ -777,109 +936,137 @@ class Buffer:
     #   called more than once without a corresponding finish_x() call if necessary
     #   (provided only one thread does this, as per the previous point.)
     #
-    # - Calling finish_write() and finish_read() is hard interrupt safe (does
-    #   not allocate). pend_read() and pend_write() each allocate 1 block for
-    #   the memoryview that is returned.
+    # - pend_read() and pend_write() allocate 1 block for the returned
+    #   memoryview. For an allocation-free path use the whole-buffer view in
+    #   .buf together with read_offset()/pend_read_len() and
+    #   write_offset()/pend_write_len(), which return plain ints.
     #
-    # The buffer contents are always laid out as:
+    # - finish_write(), finish_read(), write() and readinto() don't allocate,
+    #   so they are hard interrupt safe. write() and readinto() copy byte by
+    #   byte for this reason; bulk transfers should read or write .buf directly.
     #
-    # - Slice [:_n] = bytes of valid data waiting to read
-    # - Slice [_n:_w] = unused space
-    # - Slice [_w:] = bytes of pending write buffer waiting to be written
+    # The read index _r and write index _w both run from 0 to 2*len-1, so a
+    # full buffer (_w - _r == len) can be told apart from an empty one
+    # (_w == _r) without a separate counter. _r is only updated by the
+    # consumer and _w only by the producer, each with a single assignment, so
+    # no critical section is needed and data is never moved once written.
     #
-    # This buffer should be fast when most reads and writes are balanced and use
-    # the whole buffer. When this doesn't happen, performance degrades to
-    # approximate a Python-based single byte ringbuffer.
+    # When the readable or writable region wraps around the end of the
+    # bytearray, only the first contiguous segment is pended. The second
+    # segment (from index 0) is pended by the next call after
+    # finish_read()/finish_write(). readinto() and write() handle both
+    # segments.
     #
     def __init__(self, length):
-        self._b = memoryview(bytearray(length))
-        # number of bytes in buffer read to read, starting at index 0. Updated
-        # by both producer & consumer.
-        self._n = 0
-        # start index of a pending write into the buffer, if any. equals
-        # len(self._b) if no write is pending. Updated by producer only.
-        self._w = length
+        # memoryview of the whole underlying bytearray
+        self.buf = memoryview(bytearray(length))
+        self._len = length
+        # read index, updated by the consumer only
+        self._r = 0
+        # write index, updated by the producer only
+        self._w = 0
+
+    def _used(self):
+        n = self._w - self._r
+        return n if n >= 0 else n + 2 * self._len
 
     def writable(self):
         # Number of writable bytes in the buffer. Assumes no pending write is outstanding.
-        return len(self._b) - self._n
+        return self._len - self._used()
 
     def readable(self):
         # Number of readable bytes in the buffer. Assumes no pending read is outstanding.
-        return self._n
+        return self._used()
+
+    def write_offset(self):
+        # Index into .buf where the producer writes next.
+        w = self._w
+        return w - self._len if w >= self._len else w
+
+    def pend_write_len(self, wmax=None):
+        # Number of bytes the producer can write into .buf starting at
+        # write_offset(), without wrapping. If wmax is set, at most wmax.
+        n = self._len - self._used()
+        contiguous = self._len - self.write_offset()
+        if n > contiguous:
+            n = contiguous
+        if wmax and n > wmax:
+            n = wmax
+        return n
 
     def pend_write(self, wmax=None):
-        # Returns a memoryview that the producer can write bytes into.
-        # start the write at self._n, the end of data waiting to read
+        # Returns a memoryview that the producer can write bytes into, starting
+        # at the write index. This is the first contiguous free segment only.
         #
         # If wmax is set then the memoryview is pre-sliced to be at most
         # this many bytes long.
-        #
-        # (No critical section needed as self._w is only updated by the producer.)
-        self._w = self._n
-        end = (self._w + wmax) if wmax else len(self._b)
-        return self._b[self._w : end]
+        start = self.write_offset()
+        return self.buf[start : start + self.pend_write_len(wmax)]
 
     def finish_write(self, nbytes):
         # Called by the producer to indicate it wrote nbytes into the buffer.
-        ist = machine.disable_irq()
-        try:
-            assert nbytes <= len(self._b) - self._w  # can't say we wrote more than was pended
-            if self._n == self._w:
-                # no data was read while the write was happening, so the buffer is already in place
-                # (this is the fast path)
-                self._n += nbytes
-            else:
-                # Slow path: data was read while the write was happening, so
-                # shuffle the newly written bytes back towards index 0 to avoid fragmentation
-                #
-                # As this updates self._n we have to do it in the critical
-                # section, so do it byte by byte to avoid allocating.
-                while nbytes > 0:
-                    self._b[self._n] = self._b[self._w]
-                    self._n += 1
-                    self._w += 1
-                    nbytes -= 1
-
-            self._w = len(self._b)
-        finally:
-            machine.enable_irq(ist)
+        assert nbytes <= self.pend_write_len()  # can't say we wrote more than was pended
+        w = self._w + nbytes
+        if w >= 2 * self._len:
+            w -= 2 * self._len
+        self._w = w
 
     def write(self, w):
         # Helper method for the producer to write into the buffer in one call
-        pw = self.pend_write()
-        to_w = min(len(w), len(pw))
-        if to_w:
-            pw[:to_w] = w[:to_w]
+        buf = self.buf
+        total = 0
+        while total < len(w):
+            start = self.write_offset()
+            to_w = self.pend_write_len(len(w) - total)
+            if not to_w:
+                break
+            for i in range(to_w):
+                buf[start + i] = w[total + i]
             self.finish_write(to_w)
-        return to_w
+            total += to_w
+        return total
+
+    def read_offset(self):
+        # Index into .buf where the consumer reads next.
+        r = self._r
+        return r - self._len if r >= self._len else r
+
+    def pend_read_len(self):
+        # Number of bytes the consumer can read from .buf starting at
+        # read_offset(), without wrapping.
+        n = self._used()
+        contiguous = self._len - self.read_offset()
+        return n if n <= contiguous else contiguous
 
     def pend_read(self):
-        # Return a memoryview slice that the consumer can read bytes from
-        return self._b[: self._n]
+        # Return a memoryview slice that the consumer can read bytes from.
+        # This is the first contiguous segment of readable data only.
+        start = self.read_offset()
+        return self.buf[start : start + self.pend_read_len()]
 
     def finish_read(self, nbytes):
         # Called by the consumer to indicate it read nbytes from the buffer.
         if not nbytes:
             return
-        ist = machine.disable_irq()
-        try:
-            assert nbytes <= self._n  # can't say we read more than was available
-            i = 0
-            self._n -= nbytes
-            while i < self._n:
-                # consumer only read part of the buffer, so shuffle remaining
-                # read data back towards index 0 to avoid fragmentation
-                self._b[i] = self._b[i + nbytes]
-                i += 1
-        finally:
-            machine.enable_irq(ist)
+        assert nbytes <= self.pend_read_len()  # can't say we read more than was pended
+        r = self._r + nbytes
+        if r >= 2 * self._len:
+            r -= 2 * self._len
+        self._r = r
 
     def readinto(self, b):
         # Helper method for the consumer to read out of the buffer in one call
-        pr = self.pend_read()
-        to_r = min(len(pr), len(b))
-        if to_r:
-            b[:to_r] = pr[:to_r]
+        buf = self.buf
+        total = 0
+        while total < len(b):
+            start = self.read_offset()
+            to_r = self.pend_read_len()
+            if to_r > len(b) - total:
+                to_r = len(b) - total
+            if not to_r:
+                break
+            for i in range(to_r):
+                b[total + i] = buf[start + i]
             self.finish_read(to_r)
-        return to_r
+            total += to_r
+        return total
@@ -5,10 +5,14 @@
 #
 # MIT license; Copyright (c) 2023 Angus Gratton
 from micropython import const
-import machine
 import struct
-import time
-from .core import Interface, Descriptor, split_bmRequestType
+from .core import (
+    Interface,
+    Descriptor,
+    split_bmRequestType,
+    ep_pending,
+    ep_slot,
+)
 
 _EP_IN_FLAG = const(1 << 7)
 
@@ -89,13 +93,30 @@ class HIDInterface(Interface):
         self.report_descriptor = report_descriptor
         self.extra_descriptors = extra_descriptors
         self._set_report_buf = set_report_buf
-        self.protocol = protocol
+        self.interface_protocol = protocol
         self.interface_str = interface_str
 
+        self.idle_rate = 0
+
+        # Tracks boot protocol status, 0 for boot protocol, 1 for report protocol.
+        # According to Device Class Definition for Human Interface Devices (HID) v1.11
+        # Appendix F.5, the device comes up in non-boot mode by default.
+        self.protocol = 1
+
         self._int_ep = None  # set during enumeration
+        self._int_slot = 0  # ep_slot(self._int_ep)
 
-    def get_report(self):
-        return False
+    def get_report(self, report_id, report_type):
+        # Override this function in order to handle GET REPORT requests from the host.
+        #
+        # report_type is 1 for Input, 2 for Output, 3 for Feature (HID v1.11
+        # section 7.2.1 Get_Report Request, p51).
+        #
+        # Return a buffer holding the report (starting with the report ID byte
+        # if the report descriptor uses report IDs), or None to stall the
+        # request. This is called from the USB control transfer callback, so
+        # return a preallocated buffer rather than building one here.
+        return None
 
     def on_set_report(self, report_data, report_id, report_type):
         # Override this function in order to handle SET REPORT requests from the host,
@@ -109,7 +130,10 @@ class HIDInterface(Interface):
 
     def busy(self):
         # Returns True if the interrupt endpoint is busy (i.e. existing transfer is pending)
-        return self.is_open() and self.xfer_pending(self._int_ep)
+        #
+        # Reads the endpoint's pending flag directly, as this is called in a
+        # tight loop from send_report().
+        return self._open and ep_pending[self._int_slot] != 0
 
     def send_report(self, report_data, timeout_ms=100):
         # Helper function to send a HID report in the typical USB interrupt
@@ -117,16 +141,16 @@ class HIDInterface(Interface):
         #
         # Returns True if successful, False if HID device is not active or timeout
         # is reached without being able to queue the report for sending.
-        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
-        while self.busy():
-            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
-                return False
-            machine.idle()
-        if not self.is_open():
+        if not self.wait_idle(timeout_ms) or not self.is_open():
             return False
         self.submit_xfer(self._int_ep, report_data)
         return True
 
+    def wait_idle(self, timeout_ms=100):
+        # Wait until no transfer is pending on the interrupt IN endpoint.
+        # Returns False if timeout_ms passed first. See Interface.wait_xfer().
+        return self.wait_xfer(self._int_ep, timeout_ms)
+
     def desc_cfg(self, desc, itf_num, ep_num, strs):
         # Add the standard interface descriptor
         desc.interface(
@@ -134,9 +158,9 @@ class HIDInterface(Interface):
             1,
             _INTERFACE_CLASS,
             _INTERFACE_SUBCLASS_NONE
-            if self.protocol == _INTERFACE_PROTOCOL_NONE
+            if self.interface_protocol == _INTERFACE_PROTOCOL_NONE
             else _INTERFACE_SUBCLASS_BOOT,
-            self.protocol,
+            self.interface_protocol,
             len(strs) if self.interface_str else 0,
         )
 
@@ -150,14 +174,13 @@ class HIDInterface(Interface):
         # Add the typical single USB interrupt endpoint descriptor associated
         # with a HID interface.
         self._int_ep = ep_num | _EP_IN_FLAG
+        self._int_slot = ep_slot(self._int_ep)
         desc.endpoint(self._int_ep, "interrupt", 8, 8)
 
+    def on_reset(self):
+        super().on_reset()
+        # Back to the power-on defaults, see __init__()
         self.idle_rate = 0
-
-        # This variable is reused to track boot protocol status.
-        # 0 for boot protocol, 1 for report protocol
-        # According to Device Class Definition for Human Interface Devices (HID) v1.11
-        # Appendix F.5, the device comes up in non-boot mode by default.
         self.protocol = 1
 
     def num_eps(self):
@@ -213,8 +236,10 @@ class HIDInterface(Interface):
             elif req_type == _REQ_TYPE_CLASS:
                 # HID Spec p50: 7.2 Class-Specific Requests
                 if bRequest == _REQ_CONTROL_GET_REPORT:
-                    print("GET_REPORT?")
-                    return False  # Unsupported for now
+                    report = self.get_report(wValue & 0xFF, wValue >> 8)
+                    if report is None:
+                        return False  # Unsupported report ID
+                    return report
                 if bRequest == _REQ_CONTROL_GET_IDLE:
                     return bytes([self.idle_rate])
                 if bRequest == _REQ_CONTROL_GET_PROTOCOL:
@@ -0,0 +1,31 @@
+# RP2040 USB 总线状态：挂起检测和远程唤醒
+#
+# machine.USBDevice 不提供这两样，这里直接读写 RP2040 USB 控制器 (USBCTRL) 的
+# 寄存器，只适用于 RP2040。
+#
+# 远程唤醒只有主机允许 (SET_FEATURE DEVICE_REMOTE_WAKEUP) 才能发，但这个请求由
+# TinyUSB 处理，读不到允许状态，所以调用方要自己决定是否启用 (hitbox.REMOTE_WAKEUP)。
+from micropython import const
+from machine import mem32
+
+_SIE_CTRL = const(0x5011004C)
+_SIE_STATUS = const(0x50110050)
+_REG_ALIAS_SET = const(0x2000)  # 外设寄存器的原子置位别名
+_SIE_CTRL_RESUME = const(1 << 12)
+_SIE_STATUS_SUSPENDED = const(1 << 4)
+
+
+def suspended() -> bool:
+    """主机挂起了总线 (3ms 没有 SOF)，这时提交的传输要等恢复后才发出"""
+    return (mem32[_SIE_STATUS] & _SIE_STATUS_SUSPENDED) != 0
+
+
+def remote_wakeup() -> bool:
+    """总线挂起时发出恢复信号请求主机唤醒，返回是否发出了
+
+    RESUME 位在控制器发完恢复信号后自己清零。
+    """
+    if not suspended():
+        return False
+    mem32[_SIE_CTRL | _REG_ALIAS_SET] = _SIE_CTRL_RESUME
+    return True
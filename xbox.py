@@ -3,10 +3,16 @@ from micropython import const
 import time
 import usb.device
 from usb.device.hid import HIDInterface
-import math
+from perfstats import TELEMETRY_REPORT_ID
+from tuning import SETTINGS_REPORT_ID
 
 _INTERFACE_PROTOCOL_NONE = const(0x00)
 
+_REPORT_TYPE_FEATURE = const(3)
+
+# 最大的特性报告 (含 Report ID) 的字节数，SET_REPORT 写入的缓冲区按这个分配
+_FEATURE_REPORT_MAX = const(32)
+
 class KeyCode:
     A = const(1)
     B = const(2)
@@ -32,6 +38,8 @@ class KeyCode:
 
 def gamepad_demo():
     """通用游戏手柄示例主函数"""
+    # 只有示例用到，不在导入 xbox 时加载
+    import math
 
     # 实例化新的手柄接口
     gamepad = Xbox360Interface()
@@ -101,10 +109,17 @@ def gamepad_demo():
 class Xbox360Interface(HIDInterface):
     """基于自定义描述符的游戏手柄接口类"""
 
+    # 报告里按钮字段的位置和字节数，扫描内核直接写这里
+    BUTTONS_OFFSET = 1
+    BUTTONS_SIZE = 2
+
+    # 传给 usb.device.get().init() 的参数，保留内建的 USB 串口
+    USB_CONFIG = {"builtin_driver": True}
+
     def __init__(self):
         super().__init__(
             _GAMEPAD_REPORT_DESC,
-            set_report_buf=bytearray(0),
+            set_report_buf=bytearray(_FEATURE_REPORT_MAX),
             protocol=_INTERFACE_PROTOCOL_NONE,
             interface_str="Generic Gamepad",
         )
@@ -120,6 +135,57 @@ class Xbox360Interface(HIDInterface):
         # **重要**: 根据描述符 0x85 0x04，报告的第一个字节必须是 ID 4
         self.report[0] = 0x04
 
+        # 发送缓冲区：提交的是 report 的副本，传输完成前控制器可能还在读它，
+        # 这期间扫描内核照常改 report，主机不会收到改到一半的报告
+        self._tx = bytearray(len(self.report))
+
+        # 成功提交的报告数，用于统计报告率
+        self.report_count = 0
+
+        # 特性报告：Report ID -> 提供者。提供者的 report 属性是 GET_REPORT
+        # 返回的缓冲区，有 receive(data) 方法的还接受 SET_REPORT。
+        # 5 是遥测 (perfstats.PerfStats)，6 是运行时设置 (tuning.Tuning)
+        self.features = {}
+
+    def send_report(self, report_data, timeout_ms=100):
+        # 端点空闲后才把报告拷进发送缓冲区再交给 HIDInterface.send_report()，
+        # 在途的那份数据不会被改动。长度不同的缓冲区原样提交
+        if not self.wait_idle(timeout_ms):
+            return False
+        tx = self._tx
+        if len(report_data) == len(tx):
+            tx[:] = report_data
+            report_data = tx
+        if not super().send_report(report_data, 0):
+            return False
+        self.report_count += 1
+        return True
+
+    def get_report(self, report_id, report_type):
+        # USB 控制传输回调里调用，直接返回已经打包好的缓冲区
+        if report_type == _REPORT_TYPE_FEATURE:
+            provider = self.features.get(report_id)
+            if provider is not None:
+                return provider.report
+        return None
+
+    def on_set_report(self, report_data, report_id, report_type):
+        # 同样在回调里调用，提供者只暂存数据，由扫描循环在两次扫描之间生效
+        if report_type == _REPORT_TYPE_FEATURE:
+            provider = self.features.get(report_id)
+            if provider is not None and hasattr(provider, "receive"):
+                return provider.receive(report_data)
+        return False
+
+    @staticmethod
+    def key_mask(button_num):
+        """按钮在按钮字段里对应的掩码"""
+        return 1 << (button_num - 1)
+
+    def buttons(self):
+        """当前按钮状态 (按钮 n 对应第 n-1 位)"""
+        return self.report[1] | (self.report[2] << 8)
+
     def press_button(self, button_num):
         """按下指定按钮 (1-16)"""
         if 1 <= button_num <= 16:
@@ -148,6 +214,12 @@ class Xbox360Interface(HIDInterface):
             self.report[i] = 0
         self.send_report(self.report)
 
+    def set_buttons(self, buttons):
+        """只设置按钮 (保留摇杆状态)，按钮 n 对应第 n-1 位"""
+        self.report[1] = buttons & 0xFF
+        self.report[2] = (buttons >> 8) & 0xFF
+        self.send_report(self.report)
+
     def move_left_stick(self, x, y):
         """移动左摇杆 (对应描述符中的 X, Y)
         范围: -127 到 127
@@ -217,6 +289,18 @@ _GAMEPAD_REPORT_DESC = bytes((
     0x75, 0x08,        #   Report Size (8)
     0x95, 0x04,        #   Report Count (4) -> 4 bytes
     0x81, 0x02,        #   Input (Data,Var,Abs)
+    0x85, TELEMETRY_REPORT_ID,  # Report ID (5)  <-- 遥测特性报告，格式见 perfstats.py
+    0x06, 0x00, 0xFF,  #   Usage Page (Vendor Defined 0xFF00)
+    0x09, 0x01,        #   Usage (0x01)
+    0x15, 0x00,        #   Logical Minimum (0)
+    0x26, 0xFF, 0x00,  #   Logical Maximum (255)
+    0x75, 0x08,        #   Report Size (8)
+    0x95, 0x1F,        #   Report Count (31) -> 加上 Report ID 共 32 字节
+    0xB1, 0x02,        #   Feature (Data,Var,Abs)
+    0x85, SETTINGS_REPORT_ID,  #  Report ID (6)  <-- 运行时设置特性报告，格式见 tuning.py
+    0x09, 0x02,        #   Usage (0x02)
+    0x95, 0x0F,        #   Report Count (15) -> 加上 Report ID 共 16 字节
+    0xB1, 0x02,        #   Feature (Data,Var,Abs)
     0xC0               # End Collection
 ))
 
@@ -0,0 +1,235 @@
+# XInput 兼容的手柄接口
+#
+# 和 Xbox 360 有线手柄一样的厂商自定义接口 (class 0xFF / subclass 0x5D /
+# protocol 0x01)，Windows 直接用自带的 XInput 驱动 (xusb22)，不经过 HID 到
+# DirectInput 的转换。需要配合 USB_CONFIG 里的 VID/PID 使用，驱动按它们匹配。
+#
+# 对外的方法和 xbox.Xbox360Interface 一样，按钮编号也沿用 xbox.KeyCode，
+# 所以 Hitbox 换模式时扫描路径不用改。
+from micropython import const
+from usb.device.core import Interface, ep_pending, ep_slot
+
+_EP_IN_FLAG = const(1 << 7)
+
+_INTERFACE_CLASS_VENDOR = const(0xFF)
+_INTERFACE_SUBCLASS_XINPUT = const(0x5D)
+_INTERFACE_PROTOCOL_XINPUT = const(0x01)
+
+_REPORT_LEN = const(20)
+_EP_PACKET = const(32)
+
+# 输出消息类型 (主机 -> 手柄)
+_OUT_RUMBLE = const(0x00)
+_OUT_LED = const(0x01)
+
+# 按钮编号 (xbox.KeyCode，从 1 开始) -> (报告里的字节索引, 该字节里的位)
+# 报告字节 2~3 是 16 个数字按钮，字节 4/5 是 LT/RT 扳机 (0~255)，
+# 扳机当作数字按钮处理：按下就是满行程
+_KEYS = (
+    (3, 0x10),  # A
+    (3, 0x20),  # B
+    (3, 0x40),  # X
+    (3, 0x80),  # Y
+    (3, 0x01),  # LB
+    (3, 0x02),  # RB
+    (4, 0xFF),  # LT
+    (5, 0xFF),  # RT
+    (2, 0x20),  # BACK
+    (2, 0x10),  # START
+    (2, 0x40),  # LS
+    (2, 0x80),  # RS
+    (2, 0x01),  # UP
+    (2, 0x02),  # DOWN
+    (2, 0x04),  # LEFT
+    (2, 0x08),  # RIGHT
+)
+
+
+def _axis(v):
+    """-127~127 换算成 XInput 的 16 位有符号轴值"""
+    v = max(-127, min(127, v)) * 258
+    return max(-32768, min(32767, v))
+
+
+class XInputInterface(Interface):
+    """XInput (Xbox 360 有线手柄协议) 接口类"""
+
+    # 报告里按钮字段的位置和字节数，扫描内核直接写这里 (含两个扳机字节)
+    BUTTONS_OFFSET = 2
+    BUTTONS_SIZE = 4
+
+    # 传给 usb.device.get().init() 的参数。XInput 驱动按 VID/PID 匹配整个设备，
+    # 不能和内建的 CDC 串口组成复合设备，所以这个模式下没有 USB 串口 REPL
+    USB_CONFIG = {
+        "builtin_driver": False,
+        "id_vendor": 0x045E,
+        "id_product": 0x028E,
+        "bcd_device": 0x0114,
+        "device_class": 0xFF,
+        "device_subclass": 0xFF,
+        "device_protocol": 0xFF,
+        "manufacturer_str": "Microsoft",
+        "product_str": "Controller",
+    }
+
+    def __init__(self):
+        super().__init__()
+
+        # 输入报告：类型 0x00，长度 20，之后是按钮、扳机、四个 16 位轴和保留字节
+        self.report = bytearray(_REPORT_LEN)
+        self.report[1] = _REPORT_LEN
+        # 发送缓冲区，见 Xbox360Interface
+        self._tx = bytearray(_REPORT_LEN)
+
+        # 成功提交的报告数，用于统计报告率
+        self.report_count = 0
+
+        # 主机发来的震动强度 (左, 右马达 0~255) 和 LED 模式
+        self.rumble_left = 0
+        self.rumble_right = 0
+        self.led = 0
+
+        self._in_ep = None  # 枚举时设置
+        self._out_ep = None
+        self._in_slot = 0
+        self._out_buf = bytearray(_EP_PACKET)
+        # 预先取好绑定方法，重新提交 OUT 传输时不用再分配
+        self._out_cb = self._on_out
+
+    def desc_cfg(self, desc, itf_num, ep_num, strs):
+        self._in_ep = ep_num | _EP_IN_FLAG
+        self._out_ep = ep_num
+        self._in_slot = ep_slot(self._in_ep)
+
+        desc.interface(
+            itf_num,
+            2,
+            _INTERFACE_CLASS_VENDOR,
+            _INTERFACE_SUBCLASS_XINPUT,
+            _INTERFACE_PROTOCOL_XINPUT,
+        )
+        # 厂商自定义描述符 (类型 0x21)，内容照抄 360 有线手柄，只替换端点地址
+        desc.extend(
+            bytes(
+                (
+                    0x11, 0x21, 0x00, 0x01, 0x01, 0x25,
+                    self._in_ep, 0x14, 0x00, 0x00, 0x00, 0x00, 0x13,
+                    self._out_ep, 0x08, 0x00, 0x00,
+                )
+            )
+        )
+        desc.endpoint(self._in_ep, "interrupt", _EP_PACKET, 1)
+        desc.endpoint(self._out_ep, "interrupt", _EP_PACKET, 1)
+
+    def num_eps(self):
+        return 1
+
+    def on_open(self):
+        super().on_open()
+        self._submit_out()
+
+    def _submit_out(self):
+        if self._open and not ep_pending[ep_slot(self._out_ep)]:
+            self.submit_xfer(self._out_ep, self._out_buf, self._out_cb)
+
+    def _on_out(self, ep, result, xferred_bytes):
+        b = self._out_buf
+        if result == 0 and xferred_bytes >= 3:
+            if b[0] == _OUT_RUMBLE and xferred_bytes >= 5:
+                self.rumble_left = b[3]
+                self.rumble_right = b[4]
+            elif b[0] == _OUT_LED:
+                self.led = b[2]
+        self._submit_out()
+
+    def busy(self):
+        # 和 HIDInterface.busy() 一样直接读端点的挂起标志
+        return self._open and ep_pending[self._in_slot] != 0
+
+    def send_report(self, report_data, timeout_ms=100):
+        """提交一个输入报告，返回 False 表示未连接或等待超时"""
+        if not self.wait_xfer(self._in_ep, timeout_ms) or not self._open:
+            return False
+        tx = self._tx
+        if len(report_data) == _REPORT_LEN:
+            tx[:] = report_data
+            report_data = tx
+        self.submit_xfer(self._in_ep, report_data)
+        self.report_count += 1
+        return True
+
+    @staticmethod
+    def key_mask(button_num):
+        """按钮在按钮字段 (从报告字节 2 开始) 里对应的掩码"""
+        idx, bits = _KEYS[button_num - 1]
+        return bits << (8 * (idx - 2))
+
+    def buttons(self):
+        """当前按钮状态，和 Xbox360Interface 一样按钮 n 对应第 n-1 位"""
+        r = self.report
+        out = 0
+        for i in range(16):
+            idx, bits = _KEYS[i]
+            if r[idx] & bits:
+                out |= 1 << i
+        return out
+
+    def _write_buttons(self, buttons):
+        r = self.report
+        r[2] = r[3] = r[4] = r[5] = 0
+        for i in range(16):
+            if buttons & (1 << i):
+                idx, bits = _KEYS[i]
+                r[idx] |= bits
+
+    def press_button(self, button_num):
+        """按下指定按钮 (1-16)"""
+        if 1 <= button_num <= 16:
+            idx, bits = _KEYS[button_num - 1]
+            self.report[idx] |= bits
+            self.send_report(self.report)
+
+    def release_button(self, button_num):
+        """释放指定按钮 (1-16)"""
+        if 1 <= button_num <= 16:
+            idx, bits = _KEYS[button_num - 1]
+            self.report[idx] &= ~bits
+            self.send_report(self.report)
+
+    def release_all(self):
+        """重置所有状态"""
+        for i in range(2, _REPORT_LEN):
+            self.report[i] = 0
+        self.send_report(self.report)
+
+    def set_buttons(self, buttons):
+        """只设置按钮 (保留摇杆状态)，按钮 n 对应第 n-1 位"""
+        self._write_buttons(buttons)
+        self.send_report(self.report)
+
+    def _set_stick(self, offset, x, y):
+        # HID 的 Y 轴向下为正，XInput 向上为正
+        x = _axis(x)
+        y = _axis(-y)
+        r = self.report
+        r[offset] = x & 0xFF
+        r[offset + 1] = (x >> 8) & 0xFF
+        r[offset + 2] = y & 0xFF
+        r[offset + 3] = (y >> 8) & 0xFF
+
+    def move_left_stick(self, x, y):
+        """移动左摇杆，范围和 Xbox360Interface 一样是 -127 到 127"""
+        self._set_stick(6, x, y)
+        self.send_report(self.report)
+
+    def move_right_stick(self, z, rz):
+        """移动右摇杆，范围 -127 到 127"""
+        self._set_stick(10, z, rz)
+        self.send_report(self.report)
+
+    def set_state(self, buttons=0, x=0, y=0, z=0, rz=0):
+        """一次性设置所有状态"""
+        self._write_buttons(buttons)
+        self._set_stick(6, x, y)
+        self._set_stick(10, z, rz)
+        self.send_report(self.report)